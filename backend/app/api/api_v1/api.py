@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import auth, business, transactions, qr, demo, nft, simple_nft, nft_collection, simple_demo, nft_pictures, simple_pictures, qr_nft_integration, receipts, coffee_nft
+from app.api.api_v1.endpoints import auth, business, transactions, qr, demo, nft, simple_nft, nft_collection, simple_demo, nft_pictures, simple_pictures, qr_nft_integration, receipts, coffee_nft, collections
 
 router = APIRouter()
 
@@ -18,3 +18,4 @@ router.include_router(simple_pictures.router, prefix="/simple-pictures", tags=["
 router.include_router(qr_nft_integration.router, prefix="/qr-nft", tags=["qr-nft-integration"])
 router.include_router(receipts.router, prefix="/receipts", tags=["receipts"])
 router.include_router(coffee_nft.router, prefix="/coffee-nft", tags=["coffee-nft"])
+router.include_router(collections.router, prefix="/collections", tags=["collections"])
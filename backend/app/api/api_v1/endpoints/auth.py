@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, UserLogin
 from app.services.solana_service import SolanaService
@@ -96,9 +97,9 @@ async def login_user(
     }
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Получение текущего пользователя из JWT токена"""
     try:
@@ -115,7 +116,7 @@ def get_current_user(
                 detail="Неверный токен"
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if user is None:
             raise HTTPException(
                 status_code=404,
@@ -131,6 +132,21 @@ def get_current_user(
         )
 
 
+async def get_current_admin(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """Текущий пользователь, если его кошелек указан в admin_wallets"""
+    admin_wallets = {wallet.strip() for wallet in settings.admin_wallets.split(",") if wallet.strip()}
+    
+    if current_user.wallet_address not in admin_wallets:
+        raise HTTPException(
+            status_code=403,
+            detail="Недостаточно прав"
+        )
+    
+    return current_user
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_me(
     current_user: User = Depends(get_current_user)
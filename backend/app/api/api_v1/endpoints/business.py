@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.business import Business
 from app.models.user import User
 from app.schemas.business import BusinessCreate, BusinessResponse, BusinessUpdate, BusinessAnalytics
+from app.schemas.pagination import Page
 from app.api.api_v1.endpoints.auth import get_current_user
+from app.api.pagination import PageParams, paginate
+from app.services.analytics_service import AnalyticsService
+from app.services.business_cache import business_cache
 import uuid
 
 router = APIRouter()
+analytics_service = AnalyticsService()
 
 
 @router.post("/register", response_model=BusinessResponse)
@@ -32,12 +37,15 @@ async def register_business(
     db.commit()
     db.refresh(business)
     
+    # Сбрасываем кеш настроек бизнеса
+    business_cache.invalidate(business.id)
+    
     return business
 
 
 @router.get("/my", response_model=list[BusinessResponse])
 async def get_my_businesses(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получение списка бизнесов текущего пользователя"""
@@ -51,7 +59,7 @@ async def get_my_businesses(
 @router.get("/{business_id}", response_model=BusinessResponse)
 async def get_business(
     business_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение информации о бизнесе"""
     business = db.query(Business).filter(
@@ -95,16 +103,20 @@ async def update_business(
     db.commit()
     db.refresh(business)
     
+    # Сбрасываем кеш настроек бизнеса
+    business_cache.invalidate(business.id)
+    
     return business
 
 
 @router.get("/{business_id}/analytics", response_model=BusinessAnalytics)
 async def get_business_analytics(
     business_id: str,
-    db: Session = Depends(get_db),
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Аналитика для бизнеса"""
+    """Аналитика для бизнеса за последние days дней (из дневных агрегатов)"""
     business = db.query(Business).filter(
         Business.id == business_id,
         Business.owner_wallet == current_user.wallet_address
@@ -116,31 +128,21 @@ async def get_business_analytics(
             detail="Бизнес не найден"
         )
     
-    # Здесь будет реальная аналитика
-    # Пока возвращаем заглушку
-    analytics = BusinessAnalytics(
-        active_customers=0,
-        tokens_issued=0,
-        tokens_redeemed=0,
-        total_transactions=0,
-        roi_percentage=0.0,
-        transactions_chart=[],
-        customer_segments={}
-    )
+    analytics = analytics_service.get_analytics(db, business_id, days)
     
-    return analytics
+    return BusinessAnalytics(**analytics)
 
 
-@router.get("/", response_model=list[BusinessResponse])
+@router.get("/", response_model=Page[BusinessResponse])
 async def get_all_businesses(
     category: str = None,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
 ):
-    """Получение списка всех активных бизнесов"""
+    """Получение списка всех активных бизнесов (постранично, от новых к старым)"""
     query = db.query(Business).filter(Business.is_active == True)
     
     if category:
         query = query.filter(Business.category == category)
     
-    businesses = query.all()
-    return businesses
+    return paginate(query, Business, page)
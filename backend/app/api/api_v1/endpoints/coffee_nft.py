@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_async_read_db
 from app.services.nft_service import NFTService
 from app.models.nft import Achievement
+from app.services.nft_catalog import COFFEE_SHOP_COLLECTION
+from app.services.collection_service import collection_service
 import uuid
 
 router = APIRouter()
@@ -114,55 +117,16 @@ async def init_coffee_collection(db: Session = Depends(get_db)):
 @router.get("/coffee-collection/{wallet_address}")
 async def get_coffee_collection(
     wallet_address: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Получение коллекции кофейни для пользователя"""
     try:
-        # Получаем все пазлы кофейни
-        from app.models.nft import NFTPuzzle, UserNFT
-        
-        coffee_puzzles = db.query(NFTPuzzle).filter(
-            NFTPuzzle.puzzle_name.like('coffee_%') |
-            NFTPuzzle.puzzle_name.like('espresso_%') |
-            NFTPuzzle.puzzle_name.like('latte_%')
-        ).all()
-        
-        # Получаем NFT пользователя
-        user_nfts = db.query(UserNFT).filter(
-            UserNFT.user_wallet == wallet_address
-        ).all()
-        
-        owned_puzzle_ids = [nft.puzzle_id for nft in user_nfts]
-        
-        # Формируем ответ
-        owned_puzzles = []
-        missing_puzzles = []
-        
-        for puzzle in coffee_puzzles:
-            puzzle_data = {
-                "id": puzzle.id,
-                "name": puzzle.puzzle_name,
-                "image_url": puzzle.image_url,
-                "rarity": puzzle.rarity,
-                "position_x": puzzle.position_x,
-                "position_y": puzzle.position_y
-            }
-            
-            if puzzle.id in owned_puzzle_ids:
-                owned_puzzles.append(puzzle_data)
-            else:
-                missing_puzzles.append(puzzle_data)
-        
-        completion_percentage = (len(owned_puzzles) / len(coffee_puzzles)) * 100 if coffee_puzzles else 0
+        # Пазлы коллекции кофейни и карта пользователя в ней
+        view = await collection_service.get_view_async(db, wallet_address, collection=COFFEE_SHOP_COLLECTION)
         
         return {
-            "owned_puzzles": owned_puzzles,
-            "missing_puzzles": missing_puzzles,
-            "total_puzzles": len(coffee_puzzles),
-            "owned_count": len(owned_puzzles),
-            "missing_count": len(missing_puzzles),
-            "completion_percentage": completion_percentage,
-            "can_complete_collection": len(missing_puzzles) == 0
+            **view.as_dict("puzzles"),
+            "can_complete_collection": view.is_complete
         }
         
     except Exception as e:
@@ -0,0 +1,124 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.db.session import get_db, get_read_db
+from app.models.business import Business
+from app.models.nft import Collection
+from app.models.user import User
+from app.schemas.nft import CollectionCreate, CollectionResponse, CollectionDetailResponse
+from app.api.api_v1.endpoints.auth import get_current_admin
+from app.services.nft_catalog import CatalogSnapshot, nft_catalog
+from app.services.collection_ownership import collection_ownership_service
+from app.services.collection_service import collection_service
+
+router = APIRouter()
+
+
+def _get_collection(catalog: CatalogSnapshot, collection_id: str):
+    collection = catalog.get_collection(collection_id)
+    
+    if not collection or not collection.is_active:
+        raise HTTPException(
+            status_code=404,
+            detail="Коллекция не найдена"
+        )
+    
+    return collection
+
+
+@router.get("/", response_model=list[CollectionResponse])
+async def get_collections(
+    business_id: Optional[str] = Query(None, description="Только коллекции этого бизнеса"),
+    db: Session = Depends(get_read_db)
+):
+    """Активные коллекции (все или одного бизнеса)"""
+    return [
+        collection for collection in (await nft_catalog.get_async()).collections
+        if collection.is_active and (business_id is None or collection.business_id == business_id)
+    ]
+
+
+@router.post("/", response_model=CollectionResponse, status_code=status.HTTP_201_CREATED)
+async def create_collection(
+    collection_data: CollectionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Создание коллекции; пазлы привязываются к ней через collection_id"""
+    if db.query(Collection).filter(Collection.id == collection_data.id).first():
+        raise HTTPException(
+            status_code=400,
+            detail="Коллекция уже существует"
+        )
+    
+    if collection_data.business_id and not db.query(Business).filter(
+        Business.id == collection_data.business_id
+    ).first():
+        raise HTTPException(
+            status_code=404,
+            detail="Бизнес не найден"
+        )
+    
+    collection = Collection(**collection_data.model_dump())
+    db.add(collection)
+    db.commit()
+    db.refresh(collection)
+    nft_catalog.invalidate()
+    
+    return collection
+
+
+@router.get("/{collection_id}", response_model=CollectionDetailResponse)
+async def get_collection(
+    collection_id: str,
+    db: Session = Depends(get_read_db)
+):
+    """Коллекция и ее активные пазлы"""
+    catalog = await nft_catalog.get_async()
+    collection = _get_collection(catalog, collection_id)
+    
+    return CollectionDetailResponse(
+        **CollectionResponse.model_validate(collection).model_dump(),
+        puzzles=list(catalog.collection_puzzles(collection_id))
+    )
+
+
+@router.get("/{collection_id}/wallets/{user_wallet}")
+async def get_wallet_collection(
+    collection_id: str,
+    user_wallet: str,
+    db: Session = Depends(get_read_db)
+):
+    """Коллекция пользователя: полученные и недостающие пазлы"""
+    catalog = await nft_catalog.get_async()
+    collection = _get_collection(catalog, collection_id)
+    view = collection_service.get_view(db, user_wallet, catalog.collection_puzzles(collection_id), collection_id)
+    
+    return {
+        **view.as_dict("puzzles"),
+        "collection_id": collection.id,
+        "collection_name": collection.name,
+        "grid_width": collection.grid_width,
+        "grid_height": collection.grid_height,
+        "can_complete_collection": view.is_complete,
+        "completion_reward": collection.completion_reward if view.is_complete else None
+    }
+
+
+@router.get("/{collection_id}/near-completion")
+async def get_collection_near_completion(
+    collection_id: str,
+    missing: int = Query(1, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    """Сколько пользователей собрали все пазлы коллекции, кроме ровно missing"""
+    catalog = await nft_catalog.get_async()
+    _get_collection(catalog, collection_id)
+    puzzles = catalog.collection_puzzles(collection_id)
+    
+    return {
+        "collection_id": collection_id,
+        "missing": missing,
+        "total_puzzles": len(puzzles),
+        "users": collection_ownership_service.count_near_completion(db, puzzles, missing, collection_id)
+    }
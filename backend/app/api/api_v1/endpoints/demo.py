@@ -5,6 +5,11 @@ from app.models.user import User
 from app.models.business import Business
 from app.models.transaction import Transaction
 from app.models.nft import NFTPuzzle, Achievement
+from app.services.balance_service import BalanceService
+from app.services.analytics_service import AnalyticsService
+from app.services.wallet_stats_service import WalletStatsService
+from app.services.nft_catalog import ESPRESSO_DAY_COLLECTION, nft_catalog
+from app.db.partitions import ensure_partitions
 # from app.services.nft_service import NFTService
 from decimal import Decimal
 import uuid
@@ -104,6 +109,9 @@ async def seed_demo_data(db: Session = Depends(get_db)):
         created_users = db.query(User).all()
         created_businesses = db.query(Business).all()
         
+        # Демо-транзакции датированы до 30 дней назад: нужна секция прошлого месяца
+        ensure_partitions(db, months_back=1)
+        
         # Создаем демо-транзакции
         transactions = []
         
@@ -185,6 +193,12 @@ async def seed_demo_data(db: Session = Depends(get_db)):
         
         for transaction in transactions:
             db.add(transaction)
+        db.flush()
+        
+        # Балансы, счетчики достижений и дневные агрегаты пересчитываем по вставленным транзакциям
+        BalanceService().rebuild(db)
+        WalletStatsService().rebuild(db)
+        AnalyticsService().rebuild(db)
         
         # Создаем NFT пазлы ESPRESSO DAY напрямую
         puzzle_ids = []
@@ -254,6 +268,7 @@ async def seed_demo_data(db: Session = Depends(get_db)):
                 position_x=puzzle_data["position_x"],
                 position_y=puzzle_data["position_y"],
                 rarity=puzzle_data["rarity"],
+                collection_id=ESPRESSO_DAY_COLLECTION,
                 required_achievements=puzzle_data["required_achievements"]
             )
             
@@ -263,6 +278,7 @@ async def seed_demo_data(db: Session = Depends(get_db)):
         # Пропускаем создание достижений пока
         
         db.commit()
+        nft_catalog.invalidate()
         
         return {
             "message": "Демо-данные успешно созданы!",
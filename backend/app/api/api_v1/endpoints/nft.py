@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.nft import NFTPuzzle, UserNFT, Achievement, UserAchievement
+from app.db.session import get_db, get_read_db
+from app.models.nft import UserNFT, Achievement, UserAchievement
 from app.models.user import User
 from app.schemas.nft import (
     NFTPuzzleResponse, UserNFTResponse, AchievementResponse,
-    PuzzleCollectionResponse, AchievementProgressResponse
+    PuzzleCollectionResponse, AchievementProgressResponse, EligibleWalletsResponse,
+    AchievementBackfillRequest, AchievementBackfillJobResponse, NFTMintStatusResponse
 )
-from app.api.api_v1.endpoints.auth import get_current_user
+from app.api.api_v1.endpoints.auth import get_current_user, get_current_admin
+from app.models.backfill import AchievementBackfillJob
 from app.services.nft_service import NFTService
+from app.services.nft_catalog import nft_catalog
+from app.services.collection_ownership import collection_ownership_service
+from app.services.collection_service import collection_service
+from app.services.achievement_backfill import achievement_backfill_service
+from app.services.nft_mint_queue import MINT_PENDING, nft_mint_queue
 import uuid
 
 router = APIRouter()
@@ -17,38 +24,59 @@ nft_service = NFTService()
 
 @router.get("/puzzles", response_model=list[NFTPuzzleResponse])
 async def get_all_puzzles(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение всех доступных пазлов"""
-    puzzles = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
-    return puzzles
+    return list((await nft_catalog.get_async()).active)
+
+
+@router.get("/puzzles/{puzzle_id}/eligible-wallets", response_model=EligibleWalletsResponse)
+async def get_eligible_wallets(
+    puzzle_id: str,
+    limit: int = Query(1000, ge=0, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """Кошельки, выполняющие условия получения пазла (по счетчикам wallet_stats)"""
+    puzzle = (await nft_catalog.get_async()).get(puzzle_id)
+    
+    if not puzzle:
+        raise HTTPException(
+            status_code=404,
+            detail="Пазл не найден"
+        )
+    
+    eligible_count, wallets = nft_service.find_eligible_wallets(
+        db, puzzle.required_achievements, limit
+    )
+    
+    return EligibleWalletsResponse(
+        puzzle_id=puzzle_id,
+        eligible_count=eligible_count,
+        wallets=wallets
+    )
 
 
 @router.get("/collection/{user_wallet}", response_model=PuzzleCollectionResponse)
 async def get_user_collection(
     user_wallet: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение коллекции пазлов пользователя"""
-    # Получаем все пазлы пользователя
-    owned_puzzles = db.query(UserNFT).filter(
-        UserNFT.user_wallet == user_wallet
-    ).all()
-    
-    # Получаем все доступные пазлы
-    all_puzzles = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
+    # Недостающие пазлы и прогресс — по битовой карте пользователя
+    view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
     
-    # Находим недостающие пазлы
-    owned_puzzle_ids = {puzzle.puzzle_id for puzzle in owned_puzzles}
-    missing_puzzles = [puzzle for puzzle in all_puzzles if puzzle.id not in owned_puzzle_ids]
-    
-    # Рассчитываем процент завершения
-    total_puzzles = len(all_puzzles)
-    owned_count = len(owned_puzzles)
-    completion_percentage = (owned_count / total_puzzles * 100) if total_puzzles > 0 else 0
+    # Строки NFT читаются только для пазлов, которые есть в карте, и только если они есть
+    owned_puzzles = []
+    if view.owned:
+        owned_puzzles = db.query(UserNFT).filter(
+            UserNFT.user_wallet == user_wallet,
+            UserNFT.puzzle_id.in_([puzzle.id for puzzle in view.owned])
+        ).all()
+    missing_puzzles = view.missing
+    completion_percentage = view.completion_percentage
     
     # Проверяем, можно ли собрать картинку (все пазлы есть)
-    can_complete_picture = len(missing_puzzles) == 0
+    can_complete_picture = view.is_complete
     
     return PuzzleCollectionResponse(
         user_wallet=user_wallet,
@@ -67,10 +95,7 @@ async def mint_puzzle_nft(
 ):
     """Чеканка NFT пазла для пользователя"""
     # Проверяем существование пазла
-    puzzle = db.query(NFTPuzzle).filter(
-        NFTPuzzle.id == puzzle_id,
-        NFTPuzzle.is_active == True
-    ).first()
+    puzzle = (await nft_catalog.get_async()).get(puzzle_id, active_only=True)
     
     if not puzzle:
         raise HTTPException(
@@ -104,7 +129,7 @@ async def mint_puzzle_nft(
                 detail="Не выполнены условия для получения этого пазла"
             )
     
-    # Чеканим NFT (заглушка для MVP)
+    # Метаданные NFT; чеканка - в фоне (nft_mint_queue)
     nft_metadata = {
         "name": f"ESPRESSO DAY Puzzle - {puzzle.puzzle_name}",
         "description": f"Фрагмент #{puzzle.position_x},{puzzle.position_y} коллекции ESPRESSO DAY",
@@ -116,40 +141,107 @@ async def mint_puzzle_nft(
         ]
     }
     
-    solana_signature = await nft_service.mint_nft(
-        current_user.wallet_address,
-        nft_metadata
-    )
-    
-    # Создаем запись в БД
+    # Создаем запись в БД со статусом "pending"
     user_nft = UserNFT(
         id=str(uuid.uuid4()),
         user_wallet=current_user.wallet_address,
         puzzle_id=puzzle_id,
         nft_metadata=nft_metadata,
-        solana_signature=solana_signature
+        mint_status=MINT_PENDING
     )
     
     db.add(user_nft)
+    collection_ownership_service.record_mint(db, current_user.wallet_address, puzzle)
     db.commit()
     db.refresh(user_nft)
+    nft_mint_queue.notify()
+    
+    return user_nft
+
+
+@router.get("/mints/{nft_id}", response_model=NFTMintStatusResponse)
+async def get_mint_status(
+    nft_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Статус чеканки NFT (для опроса клиентом после сканирования чека)"""
+    user_nft = db.query(UserNFT).filter(
+        UserNFT.id == nft_id,
+        UserNFT.user_wallet == current_user.wallet_address
+    ).first()
+    
+    if not user_nft:
+        raise HTTPException(
+            status_code=404,
+            detail="NFT не найден"
+        )
     
     return user_nft
 
 
 @router.get("/achievements", response_model=list[AchievementResponse])
 async def get_all_achievements(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение всех достижений"""
     achievements = db.query(Achievement).filter(Achievement.is_active == True).all()
     return achievements
 
 
+@router.post(
+    "/achievements/backfill",
+    response_model=AchievementBackfillJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def start_achievement_backfill(
+    request: AchievementBackfillRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Пересчет достижений всех кошельков (после добавления или изменения достижения).
+
+    Задание выполняется отдельным процессом backfill_achievements.py; прогресс - через GET.
+    """
+    if request.achievement_ids:
+        found = db.query(Achievement.id).filter(Achievement.id.in_(request.achievement_ids)).count()
+        if found != len(set(request.achievement_ids)):
+            raise HTTPException(
+                status_code=404,
+                detail="Достижение не найдено"
+            )
+    
+    job = achievement_backfill_service.create_job(db, request.achievement_ids, request.chunk_size)
+    db.commit()
+    db.refresh(job)
+    
+    achievement_backfill_service.launch(job.id)
+    
+    return job
+
+
+@router.get("/achievements/backfill/{job_id}", response_model=AchievementBackfillJobResponse)
+async def get_achievement_backfill(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Состояние задания пересчета достижений"""
+    job = db.query(AchievementBackfillJob).filter(AchievementBackfillJob.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Задание не найдено"
+        )
+    
+    return job
+
+
 @router.get("/achievements/{user_wallet}", response_model=AchievementProgressResponse)
 async def get_user_achievements(
     user_wallet: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение достижений пользователя с прогрессом"""
     # Получаем все достижения
@@ -207,7 +299,7 @@ async def check_user_achievements(
 @router.get("/picture/{user_wallet}")
 async def get_completed_picture(
     user_wallet: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Получение собранной картинки (если все пазлы есть)"""
     collection = await get_user_collection(user_wallet, db)
@@ -2,6 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.nft import NFTPuzzle, UserNFT
+from app.services.nft_catalog import COFFEE_SHOP_COLLECTION, nft_catalog
+from app.services.collection_ownership import collection_ownership_service
+from app.services.collection_service import collection_service
 import uuid
 import json
 
@@ -43,6 +46,7 @@ async def create_picture_collection(db: Session = Depends(get_db)):
                 position_x=picture_data["position_x"],
                 position_y=picture_data["position_y"],
                 rarity=picture_data["rarity"],
+                collection_id=COFFEE_SHOP_COLLECTION,
                 required_achievements={"price_tokens": picture_data["price_tokens"]},
                 is_active=True
             )
@@ -57,6 +61,7 @@ async def create_picture_collection(db: Session = Depends(get_db)):
             })
         
         db.commit()
+        nft_catalog.invalidate()
         
         return {
             "message": f"Создано {len(created_pictures)} картинок для коллекции!",
@@ -72,7 +77,7 @@ async def create_picture_collection(db: Session = Depends(get_db)):
 @router.get("/pictures")
 async def get_all_pictures(db: Session = Depends(get_db)):
     """Получение всех доступных картинок"""
-    pictures = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
+    pictures = (await nft_catalog.get_async()).active
     
     return [
         {
@@ -82,7 +87,7 @@ async def get_all_pictures(db: Session = Depends(get_db)):
             "position_x": picture.position_x,
             "position_y": picture.position_y,
             "rarity": picture.rarity,
-            "price_tokens": picture.required_achievements.get("price_tokens", 0) if picture.required_achievements else 0
+            "price_tokens": picture.price_tokens
         }
         for picture in pictures
     ]
@@ -97,7 +102,7 @@ async def buy_picture(
     """Покупка картинки за токены"""
     try:
         # Находим картинку
-        picture = db.query(NFTPuzzle).filter(NFTPuzzle.id == picture_id).first()
+        picture = (await nft_catalog.get_async()).get(picture_id)
         if not picture:
             raise HTTPException(status_code=404, detail="Картинка не найдена")
         
@@ -111,7 +116,7 @@ async def buy_picture(
             raise HTTPException(status_code=400, detail="У вас уже есть эта картинка")
         
         # Получаем цену в токенах
-        price_tokens = picture.required_achievements.get("price_tokens", 0) if picture.required_achievements else 0
+        price_tokens = picture.price_tokens
         
         if price_tokens <= 0:
             raise HTTPException(status_code=400, detail="Картинка недоступна для покупки")
@@ -141,6 +146,7 @@ async def buy_picture(
         )
         
         db.add(user_nft)
+        collection_ownership_service.record_mint(db, user_wallet, picture)
         db.commit()
         
         return {
@@ -163,77 +169,32 @@ async def buy_picture(
 @router.get("/collection/{user_wallet}")
 async def get_user_collection(user_wallet: str, db: Session = Depends(get_db)):
     """Получение коллекции пользователя"""
-    # Получаем все картинки
-    all_pictures = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
-    
-    # Получаем картинки пользователя
-    user_nfts = db.query(UserNFT).filter(UserNFT.user_wallet == user_wallet).all()
-    owned_picture_ids = {nft.puzzle_id for nft in user_nfts}
-    
-    # Разделяем на собранные и недостающие
-    owned_pictures = []
-    missing_pictures = []
-    
-    for picture in all_pictures:
-        if picture.id in owned_picture_ids:
-            owned_pictures.append({
-                "id": picture.id,
-                "name": picture.puzzle_name,
-                "position_x": picture.position_x,
-                "position_y": picture.position_y,
-                "rarity": picture.rarity,
-                "image_url": picture.image_url,
-                "price_tokens": picture.required_achievements.get("price_tokens", 0) if picture.required_achievements else 0
-            })
-        else:
-            missing_pictures.append({
-                "id": picture.id,
-                "name": picture.puzzle_name,
-                "position_x": picture.position_x,
-                "position_y": picture.position_y,
-                "rarity": picture.rarity,
-                "image_url": picture.image_url,
-                "price_tokens": picture.required_achievements.get("price_tokens", 0) if picture.required_achievements else 0
-            })
-    
-    # Рассчитываем прогресс
-    total_pictures = len(all_pictures)
-    owned_count = len(owned_pictures)
-    completion_percentage = (owned_count / total_pictures * 100) if total_pictures > 0 else 0
-    
-    # Проверяем, можно ли собрать коллекцию
-    can_complete_collection = len(missing_pictures) == 0
+    view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
     
     return {
-        "user_wallet": user_wallet,
-        "owned_pictures": owned_pictures,
-        "missing_pictures": missing_pictures,
-        "completion_percentage": completion_percentage,
-        "can_complete_collection": can_complete_collection,
-        "total_pictures": total_pictures,
-        "owned_count": owned_count,
-        "missing_count": len(missing_pictures)
+        **view.as_dict("pictures"),
+        "can_complete_collection": view.is_complete
     }
 
 
 @router.get("/collection-status/{user_wallet}")
 async def get_collection_status(user_wallet: str, db: Session = Depends(get_db)):
     """Получение статуса коллекции с сообщениями"""
-    collection = await get_user_collection(user_wallet, db)
+    view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
     
-    if collection["can_complete_collection"]:
+    if view.is_complete:
         return {
             "complete": True,
             "message": "🎉 Поздравляем! Вы собрали полную коллекцию ESPRESSO DAY!",
             "prize": "Вы получили эксклюзивный приз - бесплатный кофе в любой кофейне партнера!",
             "completion_percentage": 100.0,
-            "owned_count": collection["owned_count"],
-            "total_pictures": collection["total_pictures"]
+            "owned_count": view.owned_count,
+            "total_pictures": view.total
         }
     else:
-        missing_count = collection["missing_count"]
-        owned_count = collection["owned_count"]
-        total_pictures = collection["total_pictures"]
+        missing_count = view.missing_count
+        owned_count = view.owned_count
+        total_pictures = view.total
         
         # Разные сообщения в зависимости от прогресса
         if missing_count == 1:
@@ -248,7 +209,7 @@ async def get_collection_status(user_wallet: str, db: Session = Depends(get_db))
         return {
             "complete": False,
             "message": message,
-            "completion_percentage": collection["completion_percentage"],
+            "completion_percentage": view.completion_percentage,
             "owned_count": owned_count,
             "total_pictures": total_pictures,
             "missing_count": missing_count
@@ -260,7 +221,7 @@ async def test_buy_all_pictures(user_wallet: str, db: Session = Depends(get_db))
     """Тестовая функция - покупает все картинки для пользователя"""
     try:
         # Получаем все картинки
-        all_pictures = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
+        all_pictures = (await nft_catalog.get_async()).active
         
         bought_pictures = []
         
@@ -275,7 +236,7 @@ async def test_buy_all_pictures(user_wallet: str, db: Session = Depends(get_db))
                 continue  # Уже есть
             
             # Создаем NFT
-            price_tokens = picture.required_achievements.get("price_tokens", 0) if picture.required_achievements else 0
+            price_tokens = picture.price_tokens
             
             nft_metadata = {
                 "name": f"ESPRESSO DAY Picture - {picture.puzzle_name}",
@@ -298,6 +259,7 @@ async def test_buy_all_pictures(user_wallet: str, db: Session = Depends(get_db))
             )
             
             db.add(user_nft)
+            collection_ownership_service.record_mint(db, user_wallet, picture)
             bought_pictures.append({
                 "name": picture.puzzle_name,
                 "price_tokens": price_tokens
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.business import Business
 from app.models.user import User
 from app.schemas.qr import QRCodeGenerate, QRCodeScan, QRCodeResponse, QRCodeData
-from app.api.api_v1.endpoints.auth import get_current_user
+from app.api.api_v1.endpoints.auth import get_current_user, get_current_admin
 from app.services.qr_service import QRService
+from app.services.business_cache import business_cache
+from app.services.qr_payload import qr_payload_codec, KIND_PURCHASE, QRPayloadError
 import qrcode
 import io
 import base64
@@ -14,6 +15,16 @@ from datetime import datetime, timedelta
 router = APIRouter()
 qr_service = QRService()
 
+QR_CODE_TTL_SECONDS = 900  # 15 минут
+
+
+def parse_qr_code_data(text: str) -> QRCodeData:
+    """Данные QR-кода: только подписанный компактный формат, подпись и срок проверяются без БД.
+
+    JSON без подписи не принимается: такие коды истекли через QR_CODE_TTL_SECONDS после выпуска.
+    """
+    return QRCodeData(**qr_payload_codec.decode(text, KIND_PURCHASE, QR_CODE_TTL_SECONDS))
+
 
 @router.post("/generate", response_model=QRCodeResponse)
 async def generate_qr_code(
@@ -23,12 +34,9 @@ async def generate_qr_code(
 ):
     """Генерация QR кода для бизнеса"""
     # Проверяем существование бизнеса
-    business = db.query(Business).filter(
-        Business.id == qr_data.business_id,
-        Business.owner_wallet == current_user.wallet_address
-    ).first()
+    business = business_cache.get_business(db, qr_data.business_id, active_only=False)
     
-    if not business:
+    if not business or business.owner_wallet != current_user.wallet_address:
         raise HTTPException(
             status_code=404,
             detail="Бизнес не найден"
@@ -43,16 +51,39 @@ async def generate_qr_code(
         transaction_type=qr_data.transaction_type
     )
     
-    # Генерируем QR код
-    qr_code_image = qr_service.generate_qr_code(qr_data_obj.dict())
+    # Генерируем QR код с компактными подписанными данными
+    try:
+        qr_payload = qr_payload_codec.encode_purchase(qr_data_obj.dict())
+    except QRPayloadError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неверные данные для QR кода: {str(e)}"
+        )
+    qr_code_image = await qr_service.generate_qr_code(
+        qr_payload,
+        format=qr_data.format,
+        box_size=qr_data.box_size,
+        border=qr_data.border,
+        error_correction=qr_data.error_correction
+    )
     
     return QRCodeResponse(
         qr_code=qr_code_image,
+        qr_code_format=qr_data.format,
+        qr_payload=qr_payload,
         qr_data=qr_data_obj,
-        expires_at=datetime.now() + timedelta(minutes=15)
+        expires_at=datetime.now() + timedelta(seconds=QR_CODE_TTL_SECONDS)
     )
 
 
+@router.get("/cache-stats")
+async def get_qr_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Статистика кеша QR-изображений: доля попаданий и время рендера"""
+    return qr_service.stats()
+
+
 @router.post("/scan")
 async def scan_qr_code(
     scan_data: QRCodeScan,
@@ -61,21 +92,11 @@ async def scan_qr_code(
 ):
     """Сканирование QR кода"""
     try:
-        # Парсим данные QR кода
-        qr_data = QRCodeData.parse_raw(scan_data.qr_data)
-        
-        # Проверяем, что QR код не истек
-        if datetime.now().timestamp() - qr_data.timestamp > 900:  # 15 минут
-            raise HTTPException(
-                status_code=400,
-                detail="QR код истек"
-            )
+        # Парсим данные QR кода (подпись и срок действия)
+        qr_data = parse_qr_code_data(scan_data.qr_data)
         
         # Проверяем существование бизнеса
-        business = db.query(Business).filter(
-            Business.id == qr_data.business_id,
-            Business.is_active == True
-        ).first()
+        business = business_cache.get_business(db, qr_data.business_id)
         
         if not business:
             raise HTTPException(
@@ -104,20 +125,20 @@ async def scan_qr_code(
         )
 
 
-@router.get("/validate/{qr_data}")
+@router.get("/validate")
 async def validate_qr_code(
-    qr_data: str,
+    qr_data: str = Query(..., description="Строка из QR-кода, percent-encoded (содержит /, пробел, %, +)"),
     db: Session = Depends(get_db)
 ):
-    """Валидация QR кода без сканирования"""
+    """Валидация QR кода без сканирования.
+
+    Данные передаются query-параметром: в base45 есть "/", поэтому в пути они не помещаются.
+    """
     try:
-        qr_data_obj = QRCodeData.parse_raw(qr_data)
+        qr_data_obj = parse_qr_code_data(qr_data)
         
         # Проверяем существование бизнеса
-        business = db.query(Business).filter(
-            Business.id == qr_data_obj.business_id,
-            Business.is_active == True
-        ).first()
+        business = business_cache.get_business(db, qr_data_obj.business_id)
         
         if not business:
             raise HTTPException(
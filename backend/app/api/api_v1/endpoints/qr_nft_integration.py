@@ -2,14 +2,20 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.transaction import Transaction
-from app.models.business import Business
-from app.models.nft import NFTPuzzle, UserNFT
+from app.models.nft import UserNFT
 from app.schemas.qr import QRCodeScan
+from app.services.balance_service import BalanceService
+from app.services.transaction_events import record_transaction
+from app.services.business_cache import business_cache
+from app.services.nft_catalog import nft_catalog
+from app.services.collection_service import collection_service
+from app.services.nft_purchase import nft_purchase_service, ALREADY_OWNED, INSUFFICIENT_BALANCE
 import uuid
 import json
 from decimal import Decimal
 
 router = APIRouter()
+balance_service = BalanceService()
 
 
 @router.post("/scan-and-earn")
@@ -43,10 +49,7 @@ async def scan_qr_and_earn_tokens(
         transaction_type = qr_info["transaction_type"]
         
         # Находим бизнес
-        business = db.query(Business).filter(
-            Business.id == business_id,
-            Business.is_active == True
-        ).first()
+        business = business_cache.get_business(db, business_id)
         
         if not business:
             raise HTTPException(status_code=404, detail="Бизнес не найден")
@@ -67,13 +70,12 @@ async def scan_qr_and_earn_tokens(
         )
         
         db.add(transaction)
+        record_transaction(db, transaction)
         db.commit()
         db.refresh(transaction)
         
         # Получаем доступные NFT картинки для покупки
-        available_pictures = db.query(NFTPuzzle).filter(
-            NFTPuzzle.is_active == True
-        ).all()
+        available_pictures = (await nft_catalog.get_async()).active
         
         # Фильтруем картинки, которые пользователь еще не купил
         user_nfts = db.query(UserNFT).filter(UserNFT.user_wallet == customer_wallet).all()
@@ -81,42 +83,22 @@ async def scan_qr_and_earn_tokens(
         
         available_for_purchase = []
         for picture in available_pictures:
-            if picture.id not in owned_picture_ids:
-                try:
-                    price_tokens = 0
-                    if picture.required_achievements:
-                        if isinstance(picture.required_achievements, str):
-                            price_tokens = json.loads(picture.required_achievements).get("price_tokens", 0)
-                        else:
-                            price_tokens = picture.required_achievements.get("price_tokens", 0)
-                except:
-                    price_tokens = 0
-                
-                if price_tokens > 0:  # Только картинки с ценой
-                    available_for_purchase.append({
-                        "id": picture.id,
-                        "name": picture.puzzle_name,
-                        "image_url": picture.image_url,
-                        "position_x": picture.position_x,
-                        "position_y": picture.position_y,
-                        "rarity": picture.rarity,
-                        "price_tokens": price_tokens
-                    })
-        
-        # Получаем текущий баланс пользователя
-        earned_transactions = db.query(Transaction).filter(
-            Transaction.customer_wallet == customer_wallet,
-            Transaction.transaction_type == "EARN"
-        ).all()
-        
-        spent_transactions = db.query(Transaction).filter(
-            Transaction.customer_wallet == customer_wallet,
-            Transaction.transaction_type == "REDEEM"
-        ).all()
-        
-        total_earned = sum(t.tokens_amount for t in earned_transactions)
-        total_spent = sum(t.tokens_amount for t in spent_transactions)
-        current_balance = total_earned - total_spent
+            if picture.id not in owned_picture_ids and picture.price_tokens > 0:  # Только картинки с ценой
+                available_for_purchase.append({
+                    "id": picture.id,
+                    "name": picture.puzzle_name,
+                    "image_url": picture.image_url,
+                    "position_x": picture.position_x,
+                    "position_y": picture.position_y,
+                    "rarity": picture.rarity,
+                    "price_tokens": picture.price_tokens
+                })
+        
+        # Получаем текущий баланс пользователя (уже включает эту транзакцию)
+        balance = balance_service.get_balance(db, customer_wallet)
+        total_earned = balance["total_earned"]
+        total_spent = balance["total_spent"]
+        current_balance = balance["current_balance"]
         
         return {
             "message": f"QR код успешно отсканирован! Получено {tokens_amount} токенов",
@@ -150,97 +132,32 @@ async def buy_nft_after_qr_scan(
     """Покупка NFT картинки после сканирования QR (с проверкой баланса)"""
     try:
         # Находим картинку
-        picture = db.query(NFTPuzzle).filter(NFTPuzzle.id == picture_id).first()
+        picture = (await nft_catalog.get_async()).get(picture_id)
         if not picture:
             raise HTTPException(status_code=404, detail="Картинка не найдена")
         
-        # Проверяем, есть ли уже эта картинка у пользователя
-        existing_nft = db.query(UserNFT).filter(
-            UserNFT.user_wallet == user_wallet,
-            UserNFT.puzzle_id == picture_id
-        ).first()
-        
-        if existing_nft:
-            raise HTTPException(status_code=400, detail="У вас уже есть эта картинка")
-        
         # Получаем цену в токенах
-        price_tokens = 0
-        if picture.required_achievements:
-            try:
-                if isinstance(picture.required_achievements, str):
-                    price_tokens = json.loads(picture.required_achievements).get("price_tokens", 0)
-                else:
-                    price_tokens = picture.required_achievements.get("price_tokens", 0)
-            except:
-                price_tokens = 0
+        price_tokens = picture.price_tokens
         
         if price_tokens <= 0:
             raise HTTPException(status_code=400, detail="Картинка недоступна для покупки")
         
-        # Проверяем баланс пользователя
-        earned_transactions = db.query(Transaction).filter(
-            Transaction.customer_wallet == user_wallet,
-            Transaction.transaction_type == "EARN"
-        ).all()
-        
-        spent_transactions = db.query(Transaction).filter(
-            Transaction.customer_wallet == user_wallet,
-            Transaction.transaction_type == "REDEEM"
-        ).all()
+        # Списание, NFT и транзакция траты - одной DB-транзакцией
+        result = nft_purchase_service.purchase(db, user_wallet, picture)
         
-        total_earned = sum(t.tokens_amount for t in earned_transactions)
-        total_spent = sum(t.tokens_amount for t in spent_transactions)
-        current_balance = total_earned - total_spent
+        if result.status == ALREADY_OWNED:
+            raise HTTPException(status_code=400, detail="У вас уже есть эта картинка")
         
-        if current_balance < price_tokens:
+        if result.status == INSUFFICIENT_BALANCE:
+            current_balance = balance_service.get_balance(db, user_wallet)["current_balance"]
             raise HTTPException(
                 status_code=400, 
                 detail=f"Недостаточно токенов. Нужно: {price_tokens}, у вас: {current_balance}"
             )
         
-        # Создаем NFT
-        nft_metadata = {
-            "name": f"ESPRESSO DAY Picture - {picture.puzzle_name}",
-            "description": f"Картинка #{picture.position_x},{picture.position_y} коллекции ESPRESSO DAY",
-            "image": picture.image_url,
-            "attributes": [
-                {"trait_type": "Rarity", "value": picture.rarity},
-                {"trait_type": "Position", "value": f"{picture.position_x},{picture.position_y}"},
-                {"trait_type": "Collection", "value": "ESPRESSO DAY"},
-                {"trait_type": "Price", "value": f"{price_tokens} tokens"}
-            ]
-        }
-        
-        user_nft = UserNFT(
-            id=str(uuid.uuid4()),
-            user_wallet=user_wallet,
-            puzzle_id=picture_id,
-            nft_metadata=json.dumps(nft_metadata),
-            solana_signature=f"nft_{uuid.uuid4().hex[:16]}"
-        )
-        
-        # Создаем транзакцию траты токенов
-        spend_transaction = Transaction(
-            id=str(uuid.uuid4()),
-            customer_wallet=user_wallet,
-            business_id="nft_purchase",  # Специальный ID для покупки NFT
-            transaction_type="REDEEM",
-            amount_usd=Decimal("0.00"),
-            tokens_amount=price_tokens,
-            solana_signature=f"nft_purchase_{uuid.uuid4().hex[:16]}",
-            transaction_metadata={"nft_purchase": True, "picture_id": picture_id}
-        )
-        
-        db.add(user_nft)
-        db.add(spend_transaction)
-        db.commit()
-        
-        # Получаем обновленный баланс
-        new_balance = current_balance - price_tokens
-        
         return {
             "message": f"Картинка {picture.puzzle_name} успешно куплена за {price_tokens} токенов!",
-            "nft_id": user_nft.id,
+            "nft_id": result.nft_id,
             "picture": {
                 "id": picture.id,
                 "name": picture.puzzle_name,
@@ -248,10 +165,12 @@ async def buy_nft_after_qr_scan(
                 "rarity": picture.rarity,
                 "price_tokens": price_tokens
             },
-            "balance_after_purchase": new_balance,
+            "balance_after_purchase": result.balance_after,
             "tokens_spent": price_tokens
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка покупки NFT: {str(e)}")
@@ -274,14 +193,11 @@ async def get_qr_scan_summary(user_wallet: str, db: Session = Depends(get_db)):
         total_spent = sum(t.tokens_amount for t in spent_transactions)
         current_balance = total_earned - total_spent
         
-        # Получаем коллекцию NFT
-        user_nfts = db.query(UserNFT).filter(UserNFT.user_wallet == user_wallet).all()
-        owned_picture_ids = {nft.puzzle_id for nft in user_nfts}
-        
-        all_pictures = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
-        owned_count = len([p for p in all_pictures if p.id in owned_picture_ids])
-        total_pictures = len(all_pictures)
-        completion_percentage = (owned_count / total_pictures * 100) if total_pictures > 0 else 0
+        # Прогресс коллекции NFT по битовой карте пользователя
+        view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
+        owned_count = view.owned_count
+        total_pictures = view.total
+        completion_percentage = view.completion_percentage
         
         # Статистика по QR сканированию
         qr_scans = [t for t in earned_transactions if t.transaction_metadata and t.transaction_metadata.get("qr_scan")]
@@ -301,7 +217,7 @@ async def get_qr_scan_summary(user_wallet: str, db: Session = Depends(get_db)):
                 "owned_pictures": owned_count,
                 "total_pictures": total_pictures,
                 "completion_percentage": completion_percentage,
-                "can_complete": owned_count == total_pictures
+                "can_complete": view.is_complete
             },
             "recent_transactions": [
                 {
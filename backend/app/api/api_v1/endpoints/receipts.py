@@ -1,26 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_read_db, get_async_db, run_in_session
+from app.core.config import settings
 from app.models.transaction import Receipt
 from app.models.transaction import Transaction
 from app.models.business import Business
 from app.models.user import User
 from app.schemas.transaction import (
-    ReceiptCreate, ReceiptResponse, ReceiptScanRequest, ReceiptScanResponse
+    ReceiptCreate, ReceiptResponse, ReceiptScanRequest, ReceiptScanResponse, ReceiptBatchCreate
 )
+from app.schemas.pagination import Page
 from app.api.api_v1.endpoints.auth import get_current_user
+from app.api.pagination import PageParams, paginate
 from app.services.qr_service import QRService
 from app.services.solana_service import SolanaService
 from app.services.nft_service import NFTService
+from app.services.nft_mint_queue import MINT_PENDING
+from app.services.transaction_events import record_transaction
+from app.services.business_cache import business_cache
+from app.services.qr_payload import qr_payload_codec, KIND_RECEIPT, QRPayloadError
+from app.services.receipt_bundle import ReceiptBundleService
 import uuid
 import qrcode
 import io
 import base64
 import json
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter()
 qr_service = QRService()
+receipt_bundle_service = ReceiptBundleService(qr_service)
 solana_service = SolanaService()
 nft_service = NFTService()
 
@@ -67,9 +80,6 @@ async def generate_receipt(
         "type": "receipt_scan"
     }
     
-    # Генерируем QR-код
-    qr_code_image = qr_service.generate_qr_code(qr_data)
-    
     # Создаем чек в БД
     receipt = Receipt(
         id=qr_data["receipt_id"],
@@ -78,8 +88,7 @@ async def generate_receipt(
         customer_wallet=receipt_data.customer_wallet,
         amount_usd=receipt_data.amount_usd,
         qr_code_data=json.dumps(qr_data),
-        qr_code_image=qr_code_image,
-        expires_at=datetime.now() + timedelta(days=7)  # Чек действителен 7 дней
+        expires_at=datetime.now() + timedelta(days=settings.receipt_ttl_days)
     )
     
     db.add(receipt)
@@ -89,16 +98,87 @@ async def generate_receipt(
     return receipt
 
 
+@router.post("/batch")
+async def generate_receipts_batch(
+    batch_data: ReceiptBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Пакетная генерация чеков для печати: один коммит, QR-коды потоковым ZIP с manifest.csv.
+
+    Подписанные строки всех чеков кодируются до коммита; ошибки рендера после коммита
+    отражаются в колонке error манифеста, а не обрывают архив.
+    """
+    if len(batch_data.receipts) > settings.receipt_batch_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {settings.receipt_batch_max_size} чеков за запрос"
+        )
+    
+    # Проверяем права доступа (только владелец бизнеса может генерировать чеки)
+    business = business_cache.get_business(db, batch_data.business_id, active_only=False)
+    
+    if not business or business.owner_wallet != current_user.wallet_address:
+        raise HTTPException(
+            status_code=403,
+            detail="Нет прав для генерации чека"
+        )
+    
+    try:
+        qr_datas, expires_at = receipt_bundle_service.create_receipts(
+            db, batch_data.business_id, batch_data.receipts
+        )
+    except QRPayloadError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неверные данные для QR кода: {str(e)}"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    
+    options = {
+        "format": batch_data.format,
+        "box_size": batch_data.box_size,
+        "border": batch_data.border,
+        "error_correction": batch_data.error_correction
+    }
+    
+    return StreamingResponse(
+        receipt_bundle_service.iter_zip(qr_datas, expires_at, **options),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="receipts_{batch_data.business_id}_{int(expires_at.timestamp())}.zip"'
+        }
+    )
+
+
 @router.post("/scan", response_model=ReceiptScanResponse)
 async def scan_receipt(
     scan_data: ReceiptScanRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Сканирование чека клиентом для получения токенов и NFT"""
     try:
-        # Парсим данные QR-кода
-        qr_data = json.loads(scan_data.qr_code_data)
+        # Парсим данные QR-кода: компактный код отклоняется по подписи и сроку до запросов к БД.
+        # JSON без подписи принимается только до receipt_legacy_json_until
+        legacy_until = settings.receipt_legacy_json_until
+        if qr_payload_codec.is_compact(scan_data.qr_code_data):
+            qr_data = qr_payload_codec.decode(
+                scan_data.qr_code_data,
+                KIND_RECEIPT,
+                settings.receipt_ttl_days * 24 * 3600
+            )
+        elif legacy_until is not None and datetime.now() < legacy_until:
+            qr_data = json.loads(scan_data.qr_code_data)
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail="QR-код чека без подписи не принимается"
+            )
         
         # Проверяем тип QR-кода
         if qr_data.get("type") != "receipt_scan":
@@ -107,11 +187,15 @@ async def scan_receipt(
                 detail="Неверный тип QR-кода"
             )
         
-        # Находим чек в БД
-        receipt = db.query(Receipt).filter(
-            Receipt.id == qr_data["receipt_id"],
-            Receipt.customer_wallet == current_user.wallet_address
-        ).first()
+        # Находим чек в БД (блокируем строку: параллельные сканы одного чека ждут коммита).
+        # Граница по created_at отсекает секции старше срока действия чека
+        receipt = (await db.execute(
+            select(Receipt).where(
+                Receipt.id == qr_data["receipt_id"],
+                Receipt.customer_wallet == current_user.wallet_address,
+                Receipt.created_at >= datetime.now() - timedelta(days=settings.receipt_ttl_days + 1)
+            ).with_for_update()
+        )).scalars().first()
         
         if not receipt:
             raise HTTPException(
@@ -134,9 +218,7 @@ async def scan_receipt(
             )
         
         # Получаем информацию о бизнесе
-        business = db.query(Business).filter(
-            Business.id == receipt.business_id
-        ).first()
+        business = await business_cache.get_business_async(db, receipt.business_id, active_only=False)
         
         if not business:
             raise HTTPException(
@@ -170,7 +252,8 @@ async def scan_receipt(
         )
         
         db.add(transaction)
-        db.commit()
+        await run_in_session(db, record_transaction, transaction)
+        await db.commit()
         
         # Проверяем достижения и начисляем NFT
         nft_earned = None
@@ -190,6 +273,7 @@ async def scan_receipt(
             message=f"Получено {tokens_amount} токенов!",
             tokens_earned=tokens_amount,
             nft_earned=nft_earned,
+            nft_mint_status=MINT_PENDING if nft_earned else None,
             transaction_id=transaction.id
         )
         
@@ -205,23 +289,25 @@ async def scan_receipt(
         )
 
 
-@router.get("/my", response_model=list[ReceiptResponse])
+@router.get("/my", response_model=Page[ReceiptResponse])
 async def get_my_receipts(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Получение чеков текущего пользователя"""
-    receipts = db.query(Receipt).filter(
+    """Получение чеков текущего пользователя (постранично, от новых к старым)"""
+    query = db.query(Receipt).filter(
         Receipt.customer_wallet == current_user.wallet_address
-    ).order_by(Receipt.created_at.desc()).all()
+    )
     
-    return receipts
+    return paginate(query, Receipt, page)
 
 
-@router.get("/business/{business_id}", response_model=list[ReceiptResponse])
+@router.get("/business/{business_id}", response_model=Page[ReceiptResponse])
 async def get_business_receipts(
     business_id: str,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получение чеков конкретного бизнеса"""
@@ -237,8 +323,77 @@ async def get_business_receipts(
             detail="Бизнес не найден"
         )
     
-    receipts = db.query(Receipt).filter(
+    query = db.query(Receipt).filter(
         Receipt.business_id == business_id
-    ).order_by(Receipt.created_at.desc()).all()
+    )
+    
+    return paginate(query, Receipt, page)
+
+
+@router.get("/{receipt_id}/qr.{extension}")
+async def get_receipt_qr_image(
+    receipt_id: str,
+    extension: str,
+    request: Request,
+    one_bit: bool = Query(False, description="1-битный PNG для термопринтеров"),
+    box_size: Optional[int] = Query(None, ge=1, le=40),
+    border: Optional[int] = Query(None, ge=0, le=10),
+    error_correction: Optional[str] = Query(None, pattern="^[LMQH]$"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """QR-код чека (qr.png или qr.svg); рендерится из qr_code_data по запросу"""
+    if extension not in ("png", "svg"):
+        raise HTTPException(
+            status_code=404,
+            detail="Неизвестный формат изображения"
+        )
+    
+    # Граница по created_at, как у /scan: просматриваются только секции в пределах срока действия чека
+    receipt = db.query(Receipt).filter(
+        Receipt.id == receipt_id,
+        Receipt.created_at >= datetime.now() - timedelta(days=settings.receipt_ttl_days + 1)
+    ).first()
+    
+    if not receipt:
+        raise HTTPException(
+            status_code=404,
+            detail="Чек не найден"
+        )
+    
+    # Изображение доступно клиенту чека и владельцу бизнеса
+    if receipt.customer_wallet != current_user.wallet_address:
+        business = business_cache.get_business(db, receipt.business_id, active_only=False)
+        if not business or business.owner_wallet != current_user.wallet_address:
+            raise HTTPException(
+                status_code=404,
+                detail="Чек не найден"
+            )
+    
+    options = {
+        "format": "png-1bit" if extension == "png" and one_bit else extension,
+        "box_size": box_size,
+        "border": border,
+        "error_correction": error_correction
+    }
+    
+    # Данные чека не меняются, подпись детерминирована: изображение определяется данными и параметрами рендера
+    try:
+        qr_payload = qr_payload_codec.encode_receipt(json.loads(receipt.qr_code_data))
+    except (KeyError, QRPayloadError) as e:
+        # Демо-чеки без полных данных или значения, не помещающиеся в формат
+        raise HTTPException(
+            status_code=400,
+            detail=f"QR-код для этого чека недоступен: {str(e)}"
+        )
+    etag = f'"{qr_service.image_key(qr_payload, **options)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable"
+    }
+    
+    if etag in [value.strip() for value in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
     
-    return receipts
+    image = await qr_service.generate_qr_image(qr_payload, **options)
+    return Response(content=image, media_type=qr_service.media_type(**options), headers=headers)
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_read_db, get_async_read_db, run_in_session
 from app.models.business import Business
 from app.models.user import User
 from app.models.transaction import Transaction
+from app.services.balance_service import BalanceService
+from app.services.transaction_events import record_transaction
 import uuid
 from decimal import Decimal
 
 router = APIRouter()
+balance_service = BalanceService()
 
 
 @router.post("/seed-basic")
@@ -89,7 +93,7 @@ async def seed_basic_demo_data(db: Session = Depends(get_db)):
 
 
 @router.get("/businesses")
-async def get_demo_businesses(db: Session = Depends(get_db)):
+async def get_demo_businesses(db: Session = Depends(get_read_db)):
     """Получение всех демо-бизнесов"""
     businesses = db.query(Business).filter(Business.is_active == True).all()
     
@@ -135,6 +139,7 @@ async def test_purchase(
         )
         
         db.add(transaction)
+        record_transaction(db, transaction)
         db.commit()
         db.refresh(transaction)
         
@@ -151,28 +156,15 @@ async def test_purchase(
 
 
 @router.get("/user-balance/{wallet}")
-async def get_user_balance(wallet: str, db: Session = Depends(get_db)):
+async def get_user_balance(wallet: str, db: AsyncSession = Depends(get_async_read_db)):
     """Получение баланса токенов пользователя"""
-    # Считаем заработанные токены
-    earned_transactions = db.query(Transaction).filter(
-        Transaction.customer_wallet == wallet,
-        Transaction.transaction_type == "EARN"
-    ).all()
-    
-    # Считаем потраченные токены
-    spent_transactions = db.query(Transaction).filter(
-        Transaction.customer_wallet == wallet,
-        Transaction.transaction_type == "REDEEM"
-    ).all()
-    
-    total_earned = sum(t.tokens_amount for t in earned_transactions)
-    total_spent = sum(t.tokens_amount for t in spent_transactions)
-    current_balance = total_earned - total_spent
+    # Баланс материализован в wallet_balances - одно чтение по ключу
+    balance = await run_in_session(db, balance_service.get_balance, wallet)
     
     return {
         "wallet": wallet,
-        "total_earned": total_earned,
-        "total_spent": total_spent,
-        "current_balance": current_balance,
-        "transactions_count": len(earned_transactions) + len(spent_transactions)
+        "total_earned": balance["total_earned"],
+        "total_spent": balance["total_spent"],
+        "current_balance": balance["current_balance"],
+        "transactions_count": balance["transactions_count"]
     }
@@ -4,6 +4,9 @@ from app.db.session import get_db
 from app.models.nft import NFTPuzzle, UserNFT
 from app.models.user import User
 from app.api.api_v1.endpoints.auth import get_current_user
+from app.services.nft_catalog import ESPRESSO_DAY_COLLECTION, nft_catalog
+from app.services.collection_ownership import collection_ownership_service
+from app.services.collection_service import collection_service
 import uuid
 import json
 
@@ -17,7 +20,9 @@ async def create_puzzles(db: Session = Depends(get_db)):
         # Очищаем существующие пазлы
         db.query(NFTPuzzle).delete()
         db.query(UserNFT).delete()
+        collection_ownership_service.clear(db)
         db.commit()
+        nft_catalog.invalidate()
         
         # Создаем 9 пазлов (3x3 сетка)
         puzzles_data = [
@@ -41,6 +46,7 @@ async def create_puzzles(db: Session = Depends(get_db)):
                 position_x=puzzle_data["x"],
                 position_y=puzzle_data["y"],
                 rarity=puzzle_data["rarity"],
+                collection_id=ESPRESSO_DAY_COLLECTION,
                 required_achievements=json.dumps({
                     "min_transactions": puzzle_data.get("min_tx", 0),
                     "min_spent_usd": puzzle_data.get("min_spent", 0)
@@ -51,6 +57,7 @@ async def create_puzzles(db: Session = Depends(get_db)):
             created_puzzles.append(puzzle)
         
         db.commit()
+        nft_catalog.invalidate()
         
         return {
             "message": "Пазлы созданы успешно!",
@@ -66,7 +73,7 @@ async def create_puzzles(db: Session = Depends(get_db)):
 @router.get("/puzzles")
 async def get_puzzles(db: Session = Depends(get_db)):
     """Получение всех пазлов"""
-    puzzles = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
+    puzzles = (await nft_catalog.get_async()).active
     return [{
         "id": p.id,
         "name": p.puzzle_name,
@@ -74,60 +81,18 @@ async def get_puzzles(db: Session = Depends(get_db)):
         "position_y": p.position_y,
         "rarity": p.rarity,
         "image_url": p.image_url,
-        "required_achievements": json.loads(p.required_achievements) if p.required_achievements else {}
+        "required_achievements": p.required_achievements
     } for p in puzzles]
 
 
 @router.get("/collection/{user_wallet}")
 async def get_user_collection(user_wallet: str, db: Session = Depends(get_db)):
     """Получение коллекции пользователя"""
-    # Получаем все пазлы
-    all_puzzles = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
-    
-    # Получаем пазлы пользователя
-    user_nfts = db.query(UserNFT).filter(UserNFT.user_wallet == user_wallet).all()
-    owned_puzzle_ids = {nft.puzzle_id for nft in user_nfts}
-    
-    # Разделяем на собранные и недостающие
-    owned_puzzles = []
-    missing_puzzles = []
-    
-    for puzzle in all_puzzles:
-        if puzzle.id in owned_puzzle_ids:
-            owned_puzzles.append({
-                "id": puzzle.id,
-                "name": puzzle.puzzle_name,
-                "position_x": puzzle.position_x,
-                "position_y": puzzle.position_y,
-                "rarity": puzzle.rarity,
-                "image_url": puzzle.image_url
-            })
-        else:
-            missing_puzzles.append({
-                "id": puzzle.id,
-                "name": puzzle.puzzle_name,
-                "position_x": puzzle.position_x,
-                "position_y": puzzle.position_y,
-                "rarity": puzzle.rarity,
-                "image_url": puzzle.image_url
-            })
-    
-    # Рассчитываем прогресс
-    total_puzzles = len(all_puzzles)
-    owned_count = len(owned_puzzles)
-    completion_percentage = (owned_count / total_puzzles * 100) if total_puzzles > 0 else 0
-    
-    # Проверяем, можно ли собрать картинку
-    can_complete_picture = len(missing_puzzles) == 0
+    view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
     
     return {
-        "user_wallet": user_wallet,
-        "owned_puzzles": owned_puzzles,
-        "missing_puzzles": missing_puzzles,
-        "completion_percentage": completion_percentage,
-        "can_complete_picture": can_complete_picture,
-        "total_puzzles": total_puzzles,
-        "owned_count": owned_count
+        **view.as_dict("puzzles"),
+        "can_complete_picture": view.is_complete
     }
 
 
@@ -140,7 +105,7 @@ async def award_puzzle(
     """Выдача пазла пользователю"""
     try:
         # Проверяем существование пазла
-        puzzle = db.query(NFTPuzzle).filter(NFTPuzzle.id == puzzle_id).first()
+        puzzle = (await nft_catalog.get_async()).get(puzzle_id)
         if not puzzle:
             raise HTTPException(status_code=404, detail="Пазл не найден")
         
@@ -174,6 +139,7 @@ async def award_puzzle(
         )
         
         db.add(user_nft)
+        collection_ownership_service.record_mint(db, user_wallet, puzzle)
         db.commit()
         
         return {
@@ -195,9 +161,9 @@ async def award_puzzle(
 @router.get("/complete-picture/{user_wallet}")
 async def check_complete_picture(user_wallet: str, db: Session = Depends(get_db)):
     """Проверка завершения картинки"""
-    collection = await get_user_collection(user_wallet, db)
+    view = collection_service.get_view(db, user_wallet, (await nft_catalog.get_async()).active)
     
-    if collection["can_complete_picture"]:
+    if view.is_complete:
         return {
             "complete": True,
             "message": "🎉 Поздравляем! Вы собрали полную картинку ESPRESSO DAY!",
@@ -205,11 +171,11 @@ async def check_complete_picture(user_wallet: str, db: Session = Depends(get_db)
             "completion_percentage": 100.0
         }
     else:
-        missing_count = len(collection["missing_puzzles"])
+        missing_count = view.missing_count
     return {
         "complete": False,
         "message": f"Осталось собрать {missing_count} пазлов",
-        "completion_percentage": collection["completion_percentage"]
+        "completion_percentage": view.completion_percentage
     }
 
 
@@ -218,7 +184,7 @@ async def test_award_all_puzzles(user_wallet: str, db: Session = Depends(get_db)
     """Тестовая функция - выдает все пазлы пользователю"""
     try:
         # Получаем все пазлы
-        all_puzzles = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True).all()
+        all_puzzles = (await nft_catalog.get_async()).active
         
         awarded_puzzles = []
         
@@ -253,6 +219,7 @@ async def test_award_all_puzzles(user_wallet: str, db: Session = Depends(get_db)
             )
             
             db.add(user_nft)
+            collection_ownership_service.record_mint(db, user_wallet, puzzle)
             awarded_puzzles.append(puzzle.puzzle_name)
         
         db.commit()
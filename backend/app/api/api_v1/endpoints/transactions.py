@@ -1,35 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.transaction import Transaction
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_read_db, get_async_db, run_in_session
+from app.core.config import settings
+from app.models.transaction import Transaction, Receipt
 from app.models.business import Business
 from app.models.user import User
 # NFT логика временно отключена
 from app.schemas.transaction import (
     PurchaseCreate, RedemptionCreate, TransactionResponse, RedemptionResponse
 )
+from app.schemas.pagination import Page
 from app.api.api_v1.endpoints.auth import get_current_user
+from app.api.pagination import PageParams, paginate
 from app.services.solana_service import SolanaService
+from app.services.transaction_events import record_transaction
+from app.services.export_service import ExportService
+from app.services.business_cache import business_cache
 # NFT сервис временно отключен
 import uuid
+import json
 from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter()
 solana_service = SolanaService()
+export_service = ExportService()
 # nft_service = NFTService()  # Временно отключен
 
 
 @router.post("/purchase", response_model=TransactionResponse)
 async def create_purchase(
     purchase_data: PurchaseCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создание покупки и начисление токенов"""
-    # Проверяем существование бизнеса
-    business = db.query(Business).filter(
-        Business.id == purchase_data.business_id,
-        Business.is_active == True
-    ).first()
+    # Проверяем существование бизнеса (настройки берутся из кеша)
+    business = await business_cache.get_business_async(db, purchase_data.business_id)
     
     if not business:
         raise HTTPException(
@@ -59,16 +68,7 @@ async def create_purchase(
     )
     
     db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
-    
-    # Создаем чек для клиента
-    from app.models.receipt import Receipt
-    from app.services.qr_service import QRService
-    import json
-    from datetime import datetime, timedelta
-    
-    qr_service = QRService()
+    await run_in_session(db, record_transaction, transaction)
     
     # Создаем данные для QR-кода чека
     qr_data = {
@@ -81,9 +81,6 @@ async def create_purchase(
         "type": "receipt_scan"
     }
     
-    # Генерируем QR-код
-    qr_code_image = qr_service.generate_qr_code(qr_data)
-    
     # Создаем чек
     receipt = Receipt(
         id=qr_data["receipt_id"],
@@ -92,12 +89,13 @@ async def create_purchase(
         customer_wallet=purchase_data.customer_wallet,
         amount_usd=purchase_data.amount_usd,
         qr_code_data=json.dumps(qr_data),
-        qr_code_image=qr_code_image,
-        expires_at=datetime.now() + timedelta(days=7)  # Чек действителен 7 дней
+        expires_at=datetime.now() + timedelta(days=settings.receipt_ttl_days)
     )
     
+    # Транзакция, баланс и чек фиксируются одним коммитом
     db.add(receipt)
-    db.commit()
+    await db.commit()
+    await db.refresh(transaction)
     
     return transaction
 
@@ -110,10 +108,7 @@ async def redeem_tokens(
 ):
     """Обмен токенов на скидку"""
     # Проверяем существование бизнеса
-    business = db.query(Business).filter(
-        Business.id == redemption_data.business_id,
-        Business.is_active == True
-    ).first()
+    business = business_cache.get_business(db, redemption_data.business_id)
     
     if not business:
         raise HTTPException(
@@ -160,6 +155,7 @@ async def redeem_tokens(
     )
     
     db.add(transaction)
+    record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
@@ -180,23 +176,25 @@ async def redeem_tokens(
     )
 
 
-@router.get("/my", response_model=list[TransactionResponse])
+@router.get("/my", response_model=Page[TransactionResponse])
 async def get_my_transactions(
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Получение транзакций текущего пользователя"""
-    transactions = db.query(Transaction).filter(
+    """Получение транзакций текущего пользователя (постранично, от новых к старым)"""
+    query = db.query(Transaction).filter(
         Transaction.customer_wallet == current_user.wallet_address
-    ).order_by(Transaction.created_at.desc()).all()
+    )
     
-    return transactions
+    return paginate(query, Transaction, page)
 
 
-@router.get("/business/{business_id}", response_model=list[TransactionResponse])
+@router.get("/business/{business_id}", response_model=Page[TransactionResponse])
 async def get_business_transactions(
     business_id: str,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получение транзакций конкретного бизнеса"""
@@ -212,8 +210,48 @@ async def get_business_transactions(
             detail="Бизнес не найден"
         )
     
-    transactions = db.query(Transaction).filter(
+    query = db.query(Transaction).filter(
         Transaction.business_id == business_id
-    ).order_by(Transaction.created_at.desc()).all()
+    )
     
-    return transactions
+    return paginate(query, Transaction, page)
+
+
+@router.get("/business/{business_id}/export")
+async def export_business_transactions(
+    business_id: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    date_from: Optional[datetime] = Query(None, description="Начало периода (включительно)"),
+    date_to: Optional[datetime] = Query(None, description="Конец периода (не включительно)"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Потоковая выгрузка истории транзакций бизнеса в CSV или NDJSON"""
+    # Проверяем права доступа
+    business = db.query(Business).filter(
+        Business.id == business_id,
+        Business.owner_wallet == current_user.wallet_address
+    ).first()
+    
+    if not business:
+        raise HTTPException(
+            status_code=404,
+            detail="Бизнес не найден"
+        )
+    
+    rows = export_service.iter_business_transactions(business_id, date_from, date_to)
+    
+    if format == "ndjson":
+        body = export_service.to_ndjson(rows)
+        media_type = "application/x-ndjson"
+    else:
+        body = export_service.to_csv(rows)
+        media_type = "text/csv; charset=utf-8"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions_{business_id}.{format}"'
+        }
+    )
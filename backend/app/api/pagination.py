@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query as ORMQuery
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PageParams:
+    """Параметры keyset-пагинации: курсор предыдущей страницы и размер страницы"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="next_cursor из предыдущего ответа"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Неверный курсор пагинации")
+
+
+def paginate(query: ORMQuery, model, page: PageParams) -> dict:
+    """Keyset-пагинация по (created_at, id) в порядке от новых к старым.
+
+    Запрос опирается на индексы (..., created_at, id) и не использует OFFSET,
+    поэтому стоимость страницы не зависит от ее номера.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if page.cursor:
+        created_at, row_id = decode_cursor(page.cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    rows = query.limit(page.limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return {"items": rows, "next_cursor": next_cursor}
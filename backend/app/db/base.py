@@ -2,6 +2,10 @@ from app.db.base_class import Base
 from app.models.user import User  # noqa
 from app.models.business import Business  # noqa
 from app.models.transaction import Transaction, Receipt  # noqa
-from app.models.nft import NFTPuzzle, UserNFT, Achievement, UserAchievement  # noqa
+from app.models.nft import Collection, NFTPuzzle, UserNFT, Achievement, UserAchievement, CollectionOwnership  # noqa
+from app.models.balance import WalletBalance  # noqa
+from app.models.analytics import BusinessDailyStats, BusinessDailyCustomer  # noqa
+from app.models.wallet_stats import WalletStats, CategoryBit  # noqa
 
 
+from app.models.backfill import AchievementBackfillJob, AchievementBackfillChunk  # noqa
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def get_alembic_config() -> Config:
+    """Конфигурация Alembic с абсолютным путем к миграциям"""
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    return config
+
+
+def check_schema_revision(engine: Engine) -> None:
+    """Проверка, что база находится на последней ревизии миграций.
+
+    DDL при старте больше не выполняется: схему обновляет `alembic upgrade head`.
+    """
+    expected = set(ScriptDirectory.from_config(get_alembic_config()).get_heads())
+
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+
+    if current != expected:
+        raise RuntimeError(
+            f"Схема базы данных устарела: ревизия {sorted(current) or 'нет'}, "
+            f"ожидается {sorted(expected)}. Выполните `alembic upgrade head`"
+        )
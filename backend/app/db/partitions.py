@@ -0,0 +1,149 @@
+import asyncio
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+
+
+# Таблицы с помесячным секционированием по created_at
+PARTITIONED_TABLES = ("transactions", "receipts")
+
+# Схема, в которую переносятся отсоединенные секции
+ARCHIVE_SCHEMA = "archive"
+
+# Ключ advisory-блокировки: процессы API и cron не создают секции одновременно
+ENSURE_PARTITIONS_LOCK = 7_300_501
+
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+def month_start(day: date) -> date:
+    """Первое число месяца"""
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Сдвиг первого числа месяца на months месяцев"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Имя секции за месяц: transactions_y2026m10"""
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def list_partitions(db, table: str) -> List[str]:
+    """Имена секций таблицы (db - Session или Connection)"""
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = CAST(:table AS regclass)
+    """), {"table": table})
+    return sorted(row[0] for row in rows)
+
+
+def create_partition(db, table: str, month: date) -> str:
+    """Секция таблицы за месяц [month, month + 1)"""
+    name = partition_name(table, month)
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(
+    db,
+    months_ahead: int = 3,
+    months_back: int = 0,
+    today: Optional[date] = None
+) -> List[str]:
+    """Создание недостающих секций от months_back месяцев назад до months_ahead вперед.
+
+    Секции по умолчанию нет: вставка за пределами созданных месяцев завершится ошибкой,
+    поэтому API вызывает функцию периодически (run_partition_maintenance), а
+    maintain_partitions.py - при старте контейнера и по cron.
+    Возвращает имена созданных секций. Коммит остается за вызывающим.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ENSURE_PARTITIONS_LOCK})
+
+    current = month_start(today or date.today())
+    created = []
+
+    for table in PARTITIONED_TABLES:
+        existing = set(list_partitions(db, table))
+
+        for offset in range(-months_back, months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(table, month) not in existing:
+                created.append(create_partition(db, table, month))
+
+    return created
+
+
+async def run_partition_maintenance(interval_seconds: int, months_ahead: int) -> None:
+    """Фоновая задача API: создание будущих секций раз в interval_seconds; выполняется до отмены"""
+    # Импорт здесь: модуль используется миграциями, которым движок приложения не нужен
+    from app.db.session import SessionLocal
+
+    def ensure() -> List[str]:
+        db = SessionLocal()
+        try:
+            created = ensure_partitions(db, months_ahead=months_ahead)
+            db.commit()
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    while True:
+        try:
+            created = await asyncio.to_thread(ensure)
+            if created:
+                print(f"Созданы секции: {created}")
+        except Exception as e:
+            print(f"Ошибка создания секций: {e}")
+
+        await asyncio.sleep(interval_seconds)
+
+
+def detach_old_partitions(
+    db,
+    table: str,
+    retention_months: int,
+    today: Optional[date] = None
+) -> List[str]:
+    """Отсоединение секций старше retention_months месяцев и перенос в схему archive.
+
+    Данные не удаляются: секция остается обычной таблицей archive.<имя>, ее можно
+    выгрузить и удалить отдельно. Возвращает имена отсоединенных секций.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Таблица {table} не секционирована")
+
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    detached = []
+
+    for name in list_partitions(db, table):
+        match = PARTITION_NAME.match(name)
+        if not match or match["table"] != table:
+            continue
+
+        month = date(int(match["year"]), int(match["month"]), 1)
+        # Секция целиком старше границы хранения
+        if add_months(month, 1) > cutoff:
+            continue
+
+        if not detached:
+            db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+
+        db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        db.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+        detached.append(name)
+
+    return detached
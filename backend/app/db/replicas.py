@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import time
+from typing import Iterable, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+
+
+# Таймаут обращений к Redis за отметками записи: чтение не должно ждать Redis
+PIN_REDIS_TIMEOUT = 0.1
+
+PIN_KEY_PREFIX = "rw-pin:"
+
+# Размер локального словаря отметок, после которого из него удаляются истекшие
+PIN_LOCAL_LIMIT = 10000
+
+
+def wallet_pin_key(wallet: Optional[str]) -> Optional[str]:
+    return f"wallet:{wallet}" if wallet else None
+
+
+def business_pin_key(business_id: Optional[str]) -> Optional[str]:
+    return f"business:{business_id}" if business_id else None
+
+
+def to_async_url(url: str) -> str:
+    """URL с драйвером asyncpg вместо psycopg2"""
+    return url.replace("+psycopg2", "+asyncpg")
+
+
+class ReadReplica:
+    """Реплика для чтения: синхронный и асинхронный движки к одному серверу"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = create_async_engine(
+            to_async_url(url),
+            pool_pre_ping=True,
+            pool_size=settings.async_db_pool_size,
+            max_overflow=settings.async_db_max_overflow,
+        )
+        self.AsyncSessionLocal = async_sessionmaker(
+            self.async_engine, autoflush=False, expire_on_commit=False
+        )
+        self.healthy = True
+
+    async def _ping(self) -> None:
+        async with self.async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def check(self) -> bool:
+        """SELECT 1 с таймаутом; результат сохраняется в healthy"""
+        try:
+            await asyncio.wait_for(self._ping(), timeout=settings.replica_health_check_timeout)
+            healthy = True
+        except Exception as e:
+            healthy = False
+            if self.healthy:
+                print(f"Реплика {self.async_engine.url.host} недоступна: {e}")
+
+        self.healthy = healthy
+        return healthy
+
+
+class ReplicaPool:
+    """Round-robin по исправным репликам"""
+
+    def __init__(self, urls: Iterable[str]):
+        self.replicas: List[ReadReplica] = [ReadReplica(url) for url in urls]
+        self._counter = itertools.count()
+
+    def choose(self) -> Optional[ReadReplica]:
+        """Следующая исправная реплика или None (читать с primary)"""
+        count = len(self.replicas)
+        start = next(self._counter)
+
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.healthy:
+                return replica
+
+        return None
+
+    async def run_health_checks(self) -> None:
+        """Фоновая проверка реплик каждые replica_health_check_interval секунд"""
+        while True:
+            await asyncio.gather(*(replica.check() for replica in self.replicas))
+            await asyncio.sleep(settings.replica_health_check_interval)
+
+
+class WritePins:
+    """Отметки недавней записи для read-your-writes.
+
+    После коммита транзакции кошелька (и бизнеса) чтения по этому ключу в течение
+    read_your_writes_seconds идут на primary, пока реплики догоняют.
+    Отметки хранятся локально и в Redis (общие для всех воркеров);
+    если Redis недоступен, чтение считается закрепленным за primary.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._local = {}
+        self._redis = redis.Redis.from_url(
+            redis_url, socket_timeout=PIN_REDIS_TIMEOUT, socket_connect_timeout=PIN_REDIS_TIMEOUT
+        )
+        self._aioredis = aioredis.Redis.from_url(
+            redis_url, socket_timeout=PIN_REDIS_TIMEOUT, socket_connect_timeout=PIN_REDIS_TIMEOUT
+        )
+
+    def pin(self, keys: Iterable[str]) -> None:
+        keys = [key for key in keys if key]
+        if not keys or self.ttl_seconds <= 0:
+            return
+
+        now = time.monotonic()
+        if len(self._local) > PIN_LOCAL_LIMIT:
+            self._local = {key: expires for key, expires in self._local.items() if expires > now}
+
+        expires = now + self.ttl_seconds
+        for key in keys:
+            self._local[key] = expires
+
+        try:
+            pipeline = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipeline.set(PIN_KEY_PREFIX + key, 1, ex=self.ttl_seconds)
+            pipeline.execute()
+        except redis.RedisError as e:
+            print(f"Ошибка записи отметки read-your-writes в Redis: {e}")
+
+    def _pinned_locally(self, keys: List[str]) -> bool:
+        now = time.monotonic()
+        for key in keys:
+            expires = self._local.get(key)
+            if expires is None:
+                continue
+            if expires > now:
+                return True
+            self._local.pop(key, None)
+        return False
+
+    def is_pinned(self, keys: Iterable[str]) -> bool:
+        keys = [key for key in keys if key]
+        if not keys:
+            return False
+        if self._pinned_locally(keys):
+            return True
+
+        try:
+            return bool(self._redis.exists(*(PIN_KEY_PREFIX + key for key in keys)))
+        except redis.RedisError:
+            return True
+
+    async def is_pinned_async(self, keys: Iterable[str]) -> bool:
+        keys = [key for key in keys if key]
+        if not keys:
+            return False
+        if self._pinned_locally(keys):
+            return True
+
+        try:
+            return bool(await self._aioredis.exists(*(PIN_KEY_PREFIX + key for key in keys)))
+        except redis.RedisError:
+            return True
+
+
+read_replicas = ReplicaPool(url.strip() for url in settings.read_replica_urls.split(",") if url.strip())
+write_pins = WritePins(settings.redis_url, settings.read_your_writes_seconds)
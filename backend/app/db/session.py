@@ -1,12 +1,29 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Any, Callable, List, Optional, Union
+
+import jwt
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.replicas import (
+    read_replicas, write_pins, to_async_url, wallet_pin_key, business_pin_key
+)
 
 
 engine = create_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для горячих эндпоинтов: запросы к БД не блокируют event loop
+async_engine = create_async_engine(
+    settings.async_database_url or to_async_url(settings.database_url),
+    pool_pre_ping=True,
+    pool_size=settings.async_db_pool_size,
+    max_overflow=settings.async_db_max_overflow,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -16,3 +33,109 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Ключ в Session.info: отметки read-your-writes, которые ставятся после коммита
+PENDING_PINS = "pending_write_pins"
+
+# Параметры пути с кошельком запроса
+WALLET_PATH_PARAMS = ("wallet", "wallet_address", "user_wallet")
+
+
+def _read_pin_keys(request: Request) -> List[Optional[str]]:
+    """Кошелек и бизнес запроса: из параметров пути и claim wallet_address токена"""
+    keys = [
+        wallet_pin_key(request.path_params.get(name)) for name in WALLET_PATH_PARAMS
+    ]
+    keys.append(business_pin_key(request.path_params.get("business_id")))
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+            keys.append(wallet_pin_key(payload.get("wallet_address")))
+        except jwt.PyJWTError:
+            pass
+
+    return keys
+
+
+def get_read_db(request: Request):
+    """Сессия для read-only эндпоинтов: реплика (round-robin по исправным) или primary.
+
+    Если кошелек или бизнес запроса недавно записывал данные, чтение идет на primary.
+    """
+    replica = None
+    if read_replicas.replicas and not write_pins.is_pinned(_read_pin_keys(request)):
+        replica = read_replicas.choose()
+
+    db = replica.SessionLocal() if replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Асинхронный вариант get_read_db"""
+    replica = None
+    if read_replicas.replicas and not await write_pins.is_pinned_async(_read_pin_keys(request)):
+        replica = read_replicas.choose()
+
+    session_factory = replica.AsyncSessionLocal if replica else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+def open_read_session() -> Session:
+    """Сессия на следующей исправной реплике (без учета read-your-writes) или на primary"""
+    replica = read_replicas.choose()
+    return replica.SessionLocal() if replica else SessionLocal()
+
+
+def mark_written(db: Union[Session, AsyncSession], *keys: Optional[str]) -> None:
+    """Отметка записи для read-your-writes; применяется только после коммита db"""
+    if not read_replicas.replicas:
+        return
+    if isinstance(db, AsyncSession):
+        db = db.sync_session
+    db.info.setdefault(PENDING_PINS, set()).update(key for key in keys if key)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_write_pins(session: Session) -> None:
+    keys = session.info.pop(PENDING_PINS, None)
+    if keys:
+        write_pins.pin(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write_pins(session: Session) -> None:
+    session.info.pop(PENDING_PINS, None)
+
+
+async def run_in_session(db: Union[Session, AsyncSession], fn: Callable[..., Any], *args: Any) -> Any:
+    """Вызов синхронной функции fn(session, *args) для Session и AsyncSession.
+
+    Позволяет сервисам с синхронным API работать из асинхронных эндпоинтов.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return fn(db, *args)
+
+
+async def commit_session(db: Union[Session, AsyncSession]) -> None:
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        db.commit()
+
+
+async def rollback_session(db: Union[Session, AsyncSession]) -> None:
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        db.rollback()
@@ -1,8 +1,15 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.config import settings
 from app.api.api_v1.api import router as api_router
 from app.db.session import engine
-from app.db.base import Base
+from app.db.migrations import check_schema_revision
+from app.db.replicas import read_replicas
+from app.db.partitions import run_partition_maintenance
+from app.services.nft_mint_queue import nft_mint_queue
+from app.services.qr_service import qr_render_pool
 
 app = FastAPI(
     title="Loyalty Platform API",
@@ -27,8 +34,32 @@ async def health() -> dict:
 app.include_router(api_router, prefix="/api/v1")
 
 
+# Фоновые задачи приложения, отменяются при остановке
+background_tasks = []
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+    check_schema_revision(engine)
+
+    if read_replicas.replicas:
+        background_tasks.append(asyncio.create_task(read_replicas.run_health_checks()))
+
+    # Без секции по умолчанию вставки за пределами созданных месяцев падают: держим запас
+    if settings.partition_maintenance_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(run_partition_maintenance(
+            settings.partition_maintenance_interval_seconds, settings.partition_months_ahead
+        )))
+
+    if settings.nft_mint_workers > 0:
+        background_tasks.append(asyncio.create_task(nft_mint_queue.run_workers()))
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in background_tasks:
+        task.cancel()
+
+    qr_render_pool.shutdown()
 
 
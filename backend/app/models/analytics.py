@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Date, DateTime, Integer, Numeric, func
+
+from app.db.base_class import Base
+
+
+class BusinessDailyStats(Base):
+    """Дневной агрегат по бизнесу (обновляется вместе с каждой транзакцией)"""
+    __tablename__ = "business_daily_stats"
+
+    business_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    tokens_issued = Column(Integer, nullable=False, default=0)
+    tokens_redeemed = Column(Integer, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    distinct_customers = Column(Integer, nullable=False, default=0)
+    volume_usd = Column(Numeric(14, 2), nullable=False, default=0)  # Сумма покупок (EARN)
+    redeemed_usd = Column(Numeric(14, 2), nullable=False, default=0)  # Сумма скидок (REDEEM)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class BusinessDailyCustomer(Base):
+    """Покупатели бизнеса за день - для подсчета уникальных клиентов без сканирования transactions"""
+    __tablename__ = "business_daily_customers"
+
+    business_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    customer_wallet = Column(String, primary_key=True)
+    transaction_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, DateTime, Integer, JSON, ForeignKey, func
+
+from app.db.base_class import Base
+
+
+class AchievementBackfillJob(Base):
+    """Пересчет UserAchievement для всех кошельков, разбитый на диапазоны кошельков"""
+    __tablename__ = "achievement_backfill_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    achievement_ids = Column(JSON, nullable=True)  # None - все активные достижения
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer, nullable=False, default=0)
+    done_chunks = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AchievementBackfillChunk(Base):
+    """Диапазон кошельков (wallet_from, wallet_to] задания; None - открытая граница"""
+    __tablename__ = "achievement_backfill_chunks"
+
+    job_id = Column(String, ForeignKey("achievement_backfill_jobs.id", ondelete="CASCADE"), primary_key=True)
+    chunk_no = Column(Integer, primary_key=True)
+    wallet_from = Column(String, nullable=True)
+    wallet_to = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending, done
+    attempts = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    finished_at = Column(DateTime, nullable=True)
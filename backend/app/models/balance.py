@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime, Integer, func
+
+from app.db.base_class import Base
+
+
+class WalletBalance(Base):
+    """Материализованный баланс токенов кошелька (обновляется вместе с каждой транзакцией)"""
+    __tablename__ = "wallet_balances"
+
+    wallet = Column(String, primary_key=True)
+    total_earned = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Integer, nullable=False, default=0)
+    current_balance = Column(Integer, nullable=False, default=0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0)  # Растет при каждом изменении
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, func
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Index, func, text
 
 from app.db.base_class import Base
 
@@ -16,4 +16,11 @@ class Business(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        Index("ix_businesses_owner_wallet", "owner_wallet"),
+        # Каталог активных бизнесов (keyset-пагинация, в том числе с фильтром по категории)
+        Index("ix_businesses_active_created", "created_at", "id", postgresql_where=text("is_active")),
+        Index("ix_businesses_active_category", "category", "created_at", "id", postgresql_where=text("is_active")),
+    )
+
 
@@ -1,7 +1,21 @@
-from sqlalchemy import Column, String, DateTime, Integer, Boolean, ForeignKey, JSON, func
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, ForeignKey, JSON, Index, LargeBinary, Sequence, func, text
 from app.db.base_class import Base
 
 
+class Collection(Base):
+    """Коллекция пазлов (картинка бренда), собираемая на сетке grid_width x grid_height"""
+    __tablename__ = "collections"
+
+    id = Column(String, primary_key=True)  # "espresso_day", "coffee_shop"
+    name = Column(String, nullable=False)
+    business_id = Column(String, ForeignKey("businesses.id"), nullable=True)  # Бизнес-владелец
+    grid_width = Column(Integer, nullable=False, default=3)
+    grid_height = Column(Integer, nullable=False, default=3)
+    completion_reward = Column(String, nullable=True)  # Приз за сбор всей коллекции
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=func.now())
+
+
 class NFTPuzzle(Base):
     """NFT пазл - отдельный фрагмент картинки"""
     __tablename__ = "nft_puzzles"
@@ -13,9 +27,16 @@ class NFTPuzzle(Base):
     position_y = Column(Integer, nullable=False)  # Позиция Y в сетке
     rarity = Column(String, nullable=False)  # "common", "rare", "epic", "legendary"
     required_achievements = Column(JSON, nullable=True)  # Условия получения
+    collection_id = Column(String, ForeignKey("collections.id"), nullable=True)
+    # Номер бита пазла в CollectionOwnership.bitmap (назначается при создании, не меняется)
+    slot = Column(Integer, Sequence("nft_puzzles_slot_seq", start=0, minvalue=0), unique=True, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        Index("ix_nft_puzzles_collection_id", "collection_id"),
+    )
+
 
 class UserNFT(Base):
     """NFT пользователя"""
@@ -26,7 +47,39 @@ class UserNFT(Base):
     puzzle_id = Column(String, ForeignKey("nft_puzzles.id"), nullable=False)
     nft_metadata = Column(JSON, nullable=True)  # Метаданные NFT
     minted_at = Column(DateTime, default=func.now())
-    solana_signature = Column(String, unique=True, nullable=True)
+    solana_signature = Column(String, unique=True, nullable=True)  # Появляется после чеканки
+    # "pending" - в очереди на чеканку (nft_mint_queue), "minted", "failed"
+    mint_status = Column(String, nullable=False, default="minted", server_default="minted")
+    mint_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    mint_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Один пазл на кошелек; индекс также обслуживает выборку коллекции кошелька
+        Index("uq_user_nfts_wallet_puzzle", "user_wallet", "puzzle_id", unique=True),
+        # Очередь чеканки: только ожидающие NFT, в порядке поступления
+        Index("ix_user_nfts_mint_pending", "minted_at", postgresql_where=text("mint_status = 'pending'")),
+    )
+
+
+class CollectionOwnership(Base):
+    """Битовая карта пазлов кошелька в коллекции: бит NFTPuzzle.slot установлен - пазл получен.
+
+    bitmap - байты little-endian (бит slot находится в байте slot // 8, разряд slot % 8),
+    как у get_bit/set_bit в PostgreSQL и int.from_bytes(bitmap, "little") в Python.
+    """
+    __tablename__ = "collection_ownership"
+
+    wallet = Column(String, primary_key=True)
+    collection = Column(String, primary_key=True)  # "all" - все пазлы, иначе Collection.id
+    bitmap = Column(LargeBinary, nullable=False)
+    owned_count = Column(Integer, nullable=False, default=0)  # Установленных битов
+    version = Column(Integer, nullable=False, default=0)  # Растет при каждом изменении
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Выборки "сколько пользователей в шаге от завершения"
+        Index("ix_collection_ownership_collection_count", "collection", "owned_count"),
+    )
 
 
 class Achievement(Base):
@@ -52,3 +105,7 @@ class UserAchievement(Base):
     achievement_id = Column(String, ForeignKey("achievements.id"), nullable=False)
     completed_at = Column(DateTime, default=func.now())
     progress = Column(Integer, default=0)  # Прогресс выполнения (0-100)
+
+    __table_args__ = (
+        Index("uq_user_achievements_wallet_achievement", "user_wallet", "achievement_id", unique=True),
+    )
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, JSON, func, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, JSON, Index, func, Boolean, text
+from sqlalchemy.orm import deferred
 
 from app.db.base_class import Base
 
@@ -12,9 +13,29 @@ class Transaction(Base):
     transaction_type = Column(String, nullable=False)  # EARN, REDEEM
     amount_usd = Column(Numeric(10, 2), nullable=False)
     tokens_amount = Column(Integer, nullable=False)
-    solana_signature = Column(String, unique=True)
+    solana_signature = Column(String)
     transaction_metadata = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    # Ключ секционирования входит в первичный ключ (требование PostgreSQL)
+    created_at = Column(DateTime, primary_key=True, nullable=False, default=func.now())
+
+    __table_args__ = (
+        # Уникальный индекс на секционированной таблице обязан включать created_at,
+        # поэтому подпись Solana индексируется без уникальности
+        Index("ix_transactions_signature", "solana_signature"),
+        # Баланс и достижения кошелька (EARN/REDEEM)
+        Index("ix_transactions_wallet_type", "customer_wallet", "transaction_type"),
+        # Keyset-пагинация истории кошелька и бизнеса по (created_at, id)
+        Index("ix_transactions_wallet_created", "customer_wallet", "created_at", "id"),
+        Index("ix_transactions_business_created", "business_id", "created_at", "id"),
+        # Агрегаты достижений по покупкам кошелька без обращения к таблице
+        Index(
+            "ix_transactions_wallet_earn", "customer_wallet",
+            postgresql_where=text("transaction_type = 'EARN'"),
+            postgresql_include=["amount_usd", "business_id"]
+        ),
+        # Помесячные секции, см. app/db/partitions.py
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 class Receipt(Base):
@@ -22,15 +43,26 @@ class Receipt(Base):
     __tablename__ = "receipts"
     
     id = Column(String, primary_key=True)
-    transaction_id = Column(String, ForeignKey("transactions.id"), nullable=False)
+    # Без внешнего ключа: у секционированной transactions нет уникального индекса по одному id
+    transaction_id = Column(String, nullable=False)
     business_id = Column(String, ForeignKey("businesses.id"), nullable=False)
     customer_wallet = Column(String, nullable=False)
     amount_usd = Column(Numeric(10, 2), nullable=False)
     qr_code_data = Column(String, nullable=False)  # Данные для QR-кода
-    qr_code_image = Column(String, nullable=True)  # Base64 изображение QR-кода
+    # Устарело: изображение рендерится по запросу (GET /receipts/{id}/qr.png), колонка только у старых чеков.
+    # Отложенная загрузка: списки чеков ее не читают
+    qr_code_image = deferred(Column(String, nullable=True))
     is_scanned = Column(Boolean, default=False)  # Был ли чек отсканирован
     scanned_at = Column(DateTime, nullable=True)
     expires_at = Column(DateTime, nullable=False)  # Время истечения чека
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, primary_key=True, nullable=False, default=func.now())
+
+    __table_args__ = (
+        Index("ix_receipts_wallet_created", "customer_wallet", "created_at", "id"),
+        Index("ix_receipts_business_created", "business_id", "created_at", "id"),
+        # Только неотсканированные чеки участвуют в проверке срока действия
+        Index("ix_receipts_pending_expires", "expires_at", postgresql_where=text("NOT is_scanned")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
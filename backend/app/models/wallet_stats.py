@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Numeric, func
+
+from app.db.base_class import Base
+
+
+class WalletStats(Base):
+    """Счетчики покупок (EARN) кошелька для прогресса достижений (обновляются с каждой транзакцией)"""
+    __tablename__ = "wallet_stats"
+
+    wallet = Column(String, primary_key=True)
+    earn_count = Column(Integer, nullable=False, default=0)
+    spent_usd = Column(Numeric(14, 2), nullable=False, default=0)
+    category_mask = Column(BigInteger, nullable=False, default=0)  # Биты из category_bits
+    version = Column(Integer, nullable=False, default=0)  # Растет при каждом изменении
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class CategoryBit(Base):
+    """Номер бита категории бизнеса в WalletStats.category_mask (назначается один раз)"""
+    __tablename__ = "category_bits"
+
+    category = Column(String, primary_key=True)
+    bit = Column(Integer, nullable=False, unique=True)
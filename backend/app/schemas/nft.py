@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -18,6 +18,7 @@ class NFTPuzzleCreate(NFTPuzzleBase):
 
 class NFTPuzzleResponse(NFTPuzzleBase):
     id: str
+    collection_id: Optional[str] = None
     is_active: bool
     created_at: datetime
 
@@ -25,6 +26,32 @@ class NFTPuzzleResponse(NFTPuzzleBase):
         from_attributes = True
 
 
+class CollectionBase(BaseModel):
+    name: str
+    business_id: Optional[str] = None
+    grid_width: int = Field(3, ge=1, le=16)
+    grid_height: int = Field(3, ge=1, le=16)
+    completion_reward: Optional[str] = None
+
+
+class CollectionCreate(CollectionBase):
+    id: str = Field(..., pattern=r"^[a-z0-9_]+$", max_length=64)
+
+
+class CollectionResponse(CollectionBase):
+    id: str
+    is_active: bool
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CollectionDetailResponse(CollectionResponse):
+    """Коллекция с активными пазлами"""
+    puzzles: List[NFTPuzzleResponse]
+
+
 class UserNFTBase(BaseModel):
     user_wallet: str
     puzzle_id: str
@@ -39,6 +66,20 @@ class UserNFTResponse(UserNFTBase):
     id: str
     minted_at: datetime
     solana_signature: Optional[str] = None
+    mint_status: str = "minted"
+
+    class Config:
+        from_attributes = True
+
+
+class NFTMintStatusResponse(BaseModel):
+    """Статус чеканки NFT: pending, minted или failed"""
+    id: str
+    puzzle_id: str
+    mint_status: str
+    solana_signature: Optional[str] = None
+    mint_attempts: int
+    mint_error: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -98,3 +139,33 @@ class AchievementProgressResponse(BaseModel):
     achievements: List[dict]  # achievement + progress
     total_achievements: int
     completed_achievements: int
+
+
+class EligibleWalletsResponse(BaseModel):
+    """Кошельки, выполняющие условия получения пазла"""
+    puzzle_id: str
+    eligible_count: int
+    wallets: List[str]  # Первые limit кошельков
+
+
+class AchievementBackfillRequest(BaseModel):
+    """Пересчет достижений всех кошельков"""
+    achievement_ids: Optional[List[str]] = None  # None - все активные достижения
+    chunk_size: int = Field(10000, ge=100, le=100000)  # Кошельков в диапазоне
+
+
+class AchievementBackfillJobResponse(BaseModel):
+    id: str
+    status: str
+    achievement_ids: Optional[List[str]] = None
+    chunk_size: int
+    total_chunks: int
+    done_chunks: int
+    rows_written: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
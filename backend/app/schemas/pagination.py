@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """Страница списка с курсором на следующую страницу"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from datetime import datetime
 
 
@@ -13,16 +13,23 @@ class QRCodeData(BaseModel):
 
 class QRCodeGenerate(BaseModel):
     business_id: str
-    amount_usd: float
+    amount_usd: float = Field(..., gt=0)
     transaction_type: str
+    # Параметры изображения; по умолчанию PNG с box_size=10, border=4, коррекцией L
+    format: Literal["png", "png-1bit", "svg"] = "png"
+    box_size: Optional[int] = Field(None, ge=1, le=40)
+    border: Optional[int] = Field(None, ge=0, le=10)
+    error_correction: Optional[Literal["L", "M", "Q", "H"]] = None
 
 
 class QRCodeScan(BaseModel):
-    qr_data: str
+    qr_data: str  # Строка из QR-кода: компактный подписанный формат или JSON QRCodeData
     scanner_wallet: str  # Business wallet scanning the QR
 
 
 class QRCodeResponse(BaseModel):
     qr_code: str  # Base64 encoded QR code image
+    qr_code_format: str = "png"
+    qr_payload: str  # Строка в QR-коде: компактный подписанный формат (qr_payload)
     qr_data: QRCodeData
     expires_at: datetime
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, computed_field
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 from decimal import Decimal
+import json
+from app.services.qr_payload import qr_payload_codec
 
 
 class TransactionBase(BaseModel):
@@ -29,7 +31,7 @@ class TransactionResponse(TransactionBase):
 
 class PurchaseCreate(BaseModel):
     business_id: str
-    amount_usd: Decimal
+    amount_usd: Decimal = Field(..., gt=0)
     customer_wallet: str
 
 
@@ -51,7 +53,7 @@ class ReceiptCreate(BaseModel):
     transaction_id: str
     business_id: str
     customer_wallet: str
-    amount_usd: Decimal
+    amount_usd: Decimal = Field(..., gt=0)
 
 
 class ReceiptResponse(BaseModel):
@@ -60,17 +62,42 @@ class ReceiptResponse(BaseModel):
     business_id: str
     customer_wallet: str
     amount_usd: Decimal
-    qr_code_data: str
-    qr_code_image: Optional[str]
+    qr_code_data: str  # Изображение: GET /receipts/{id}/qr.png
     is_scanned: bool
     scanned_at: Optional[datetime]
     expires_at: datetime
     created_at: datetime
 
+    @computed_field
+    @property
+    def qr_payload(self) -> Optional[str]:
+        """Подписанная строка для QR-кода чека (ее принимает /receipts/scan)"""
+        try:
+            return qr_payload_codec.encode_receipt(json.loads(self.qr_code_data))
+        except (KeyError, TypeError, ValueError):
+            # Демо-чеки без полных данных
+            return None
+
     class Config:
         from_attributes = True
 
 
+class ReceiptBatchItem(BaseModel):
+    transaction_id: str
+    customer_wallet: str
+    amount_usd: Decimal = Field(..., gt=0)
+
+
+class ReceiptBatchCreate(BaseModel):
+    business_id: str
+    receipts: List[ReceiptBatchItem] = Field(..., min_length=1)
+    # Параметры изображений, как у /qr/generate
+    format: Literal["png", "png-1bit", "svg"] = "png"
+    box_size: Optional[int] = Field(None, ge=1, le=40)
+    border: Optional[int] = Field(None, ge=0, le=10)
+    error_correction: Optional[Literal["L", "M", "Q", "H"]] = None
+
+
 class ReceiptScanRequest(BaseModel):
     qr_code_data: str
     scanner_wallet: str
@@ -80,5 +107,6 @@ class ReceiptScanResponse(BaseModel):
     success: bool
     message: str
     tokens_earned: int
-    nft_earned: Optional[str]  # ID полученного NFT
+    nft_earned: Optional[str]  # ID полученного NFT (чеканится в фоне)
+    nft_mint_status: Optional[str] = None  # "pending" - статус через GET /nft/mints/{nft_earned}
     transaction_id: str
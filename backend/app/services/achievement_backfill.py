@@ -0,0 +1,306 @@
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, List, Optional
+
+from sqlalchemy import String, and_, case, cast, func, literal, select, text, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.db.migrations import BACKEND_DIR
+from app.db.session import SessionLocal, engine
+from app.models.backfill import AchievementBackfillJob, AchievementBackfillChunk
+from app.models.nft import Achievement, UserAchievement
+from app.models.user import User
+from app.models.wallet_stats import WalletStats
+from app.services.achievement_rules import rule_compiler
+from app.services.transaction_events import wallet_stats_service
+
+
+# Кошельков в одном диапазоне: один upsert и один коммит на диапазон
+BACKFILL_CHUNK_SIZE = 10000
+
+BACKFILL_WORKERS = 4
+
+# Повторы диапазона при дедлоке с пересчетом на горячем пути
+CHUNK_MAX_ATTEMPTS = 3
+
+BACKFILL_SCRIPT = BACKEND_DIR / "backfill_achievements.py"
+
+UNFINISHED_STATUSES = ("pending", "running", "failed")
+
+
+class AchievementBackfillService:
+    """Пересчет UserAchievement для всех кошельков вне пути запроса.
+
+    Задание разбивается на диапазоны кошельков (wallet_from, wallet_to]; каждый диапазон
+    пересчитывается одним INSERT ... SELECT по wallet_stats в отдельном процессе и
+    коммитится вместе с отметкой о выполнении, поэтому после сбоя задание продолжается
+    с невыполненных диапазонов.
+    """
+
+    def create_job(
+        self,
+        db: Session,
+        achievement_ids: Optional[List[str]] = None,
+        chunk_size: int = BACKFILL_CHUNK_SIZE
+    ) -> AchievementBackfillJob:
+        """Задание с диапазонами по chunk_size кошельков. Коммит остается за вызывающим"""
+        # Каждый chunk_size-й адрес по порядку - граница диапазона (один проход по индексу)
+        boundaries = list(db.execute(text("""
+            SELECT wallet_address
+            FROM (
+                SELECT wallet_address, row_number() OVER (ORDER BY wallet_address) AS rn
+                FROM users
+            ) AS numbered
+            WHERE rn % :chunk_size = 0
+            ORDER BY wallet_address
+        """), {"chunk_size": chunk_size}).scalars())
+
+        job = AchievementBackfillJob(
+            id=str(uuid.uuid4()),
+            status="pending",
+            achievement_ids=achievement_ids,
+            chunk_size=chunk_size,
+            total_chunks=len(boundaries) + 1,
+            done_chunks=0,
+            rows_written=0
+        )
+        db.add(job)
+        db.flush()
+
+        edges = [None] + boundaries + [None]
+        db.execute(insert(AchievementBackfillChunk), [
+            {
+                "job_id": job.id,
+                "chunk_no": chunk_no,
+                "wallet_from": edges[chunk_no],
+                "wallet_to": edges[chunk_no + 1],
+                "status": "pending",
+                "attempts": 0,
+                "rows_written": 0
+            }
+            for chunk_no in range(len(edges) - 1)
+        ])
+
+        return job
+
+    def latest_unfinished_job(self, db: Session) -> Optional[AchievementBackfillJob]:
+        return db.query(AchievementBackfillJob).filter(
+            AchievementBackfillJob.status.in_(UNFINISHED_STATUSES)
+        ).order_by(AchievementBackfillJob.created_at.desc()).first()
+
+    def launch(self, job_id: str) -> None:
+        """Запуск задания отдельным процессом backfill_achievements.py (не в воркере API)"""
+        subprocess.Popen(
+            [sys.executable, str(BACKFILL_SCRIPT), "--job", job_id],
+            cwd=str(BACKEND_DIR),
+            start_new_session=True
+        )
+
+    def run_job(
+        self,
+        job_id: str,
+        workers: int = BACKFILL_WORKERS,
+        progress: Optional[Callable[[AchievementBackfillJob], None]] = None
+    ) -> AchievementBackfillJob:
+        """Выполнение невыполненных диапазонов задания в пуле процессов"""
+        # Session-level advisory lock на отдельном соединении: второй запуск того же
+        # задания не стартует, а при падении процесса блокировка снимается сама
+        lock = engine.connect()
+        db = SessionLocal()
+        locked = False
+
+        try:
+            locked = lock.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": job_id}).scalar()
+            lock.commit()
+            if not locked:
+                raise RuntimeError(f"Задание {job_id} уже выполняется")
+
+            job = db.get(AchievementBackfillJob, job_id)
+            if job is None:
+                raise ValueError(f"Задание {job_id} не найдено")
+
+            job.status = "running"
+            job.error = None
+            job.started_at = job.started_at or datetime.now()
+            db.commit()
+
+            pending = db.execute(
+                select(AchievementBackfillChunk.chunk_no).where(
+                    AchievementBackfillChunk.job_id == job_id,
+                    AchievementBackfillChunk.status != "done"
+                ).order_by(AchievementBackfillChunk.chunk_no)
+            ).scalars().all()
+
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    futures = [pool.submit(_process_chunk, job_id, chunk_no) for chunk_no in pending]
+
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception:
+                            pool.shutdown(cancel_futures=True)
+                            raise
+
+                        if progress is not None:
+                            db.expire_all()
+                            progress(db.get(AchievementBackfillJob, job_id))
+
+            except Exception as e:
+                db.rollback()
+                db.execute(
+                    update(AchievementBackfillJob)
+                    .where(AchievementBackfillJob.id == job_id)
+                    .values(status="failed", error=str(e)[:1000])
+                )
+                db.commit()
+                raise
+
+            db.expire_all()
+            job = db.get(AchievementBackfillJob, job_id)
+            job.status = "done"
+            job.finished_at = datetime.now()
+            db.commit()
+
+            return job
+
+        finally:
+            db.close()
+            if locked:
+                lock.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": job_id})
+            lock.close()
+
+    def backfill_range(
+        self,
+        db: Session,
+        achievements: List[Achievement],
+        wallet_from: Optional[str],
+        wallet_to: Optional[str]
+    ) -> int:
+        """Пересчет достижений кошельков диапазона одним upsert.
+
+        Прогресс считается в БД скомпилированными правилами (progress_sql) по счетчикам
+        wallet_stats; пользователи без покупок получают нули. Строки с неизменным
+        прогрессом не переписываются. Возвращает количество записанных строк.
+        """
+        if not achievements:
+            return 0
+
+        category_bits = wallet_stats_service.category_bits(db)
+        stats = SimpleNamespace(
+            earn_count=func.coalesce(WalletStats.earn_count, 0),
+            spent_usd=func.coalesce(WalletStats.spent_usd, 0),
+            category_mask=func.coalesce(WalletStats.category_mask, 0)
+        )
+
+        in_range = []
+        if wallet_from is not None:
+            in_range.append(User.wallet_address > wallet_from)
+        if wallet_to is not None:
+            in_range.append(User.wallet_address <= wallet_to)
+
+        selects = []
+        for achievement in achievements:
+            rule = rule_compiler.compile_condition(achievement.required_condition, category_bits)
+            selects.append(
+                select(
+                    cast(func.gen_random_uuid(), String),
+                    User.wallet_address,
+                    literal(achievement.id, String),
+                    rule.progress_sql(stats),
+                    func.now()
+                ).select_from(User).outerjoin(
+                    WalletStats, WalletStats.wallet == User.wallet_address
+                ).where(*in_range)
+            )
+
+        stmt = insert(UserAchievement).from_select(
+            [
+                UserAchievement.id,
+                UserAchievement.user_wallet,
+                UserAchievement.achievement_id,
+                UserAchievement.progress,
+                UserAchievement.completed_at
+            ],
+            union_all(*selects)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserAchievement.user_wallet, UserAchievement.achievement_id],
+            set_={
+                "progress": stmt.excluded.progress,
+                "completed_at": case(
+                    (and_(stmt.excluded.progress >= 100, UserAchievement.progress < 100), func.now()),
+                    else_=UserAchievement.completed_at
+                )
+            },
+            where=UserAchievement.progress.is_distinct_from(stmt.excluded.progress)
+        )
+        return db.execute(stmt).rowcount
+
+    def job_achievements(self, db: Session, job: AchievementBackfillJob) -> List[Achievement]:
+        query = db.query(Achievement).filter(Achievement.is_active == True)
+        if job.achievement_ids:
+            query = query.filter(Achievement.id.in_(job.achievement_ids))
+        return query.all()
+
+
+achievement_backfill_service = AchievementBackfillService()
+
+
+def _init_worker() -> None:
+    """Соединения пула, унаследованные от родителя при fork, не используются в дочернем процессе"""
+    engine.dispose(close=False)
+
+
+def _process_chunk(job_id: str, chunk_no: int) -> int:
+    """Пересчет одного диапазона в процессе пула (коммит вместе с отметкой о выполнении)"""
+    db = SessionLocal()
+
+    try:
+        for attempt in range(1, CHUNK_MAX_ATTEMPTS + 1):
+            chunk = db.get(AchievementBackfillChunk, (job_id, chunk_no))
+            if chunk.status == "done":
+                return 0
+
+            job = db.get(AchievementBackfillJob, job_id)
+            chunk.attempts += 1
+            db.commit()
+
+            try:
+                rows = achievement_backfill_service.backfill_range(
+                    db,
+                    achievement_backfill_service.job_achievements(db, job),
+                    chunk.wallet_from,
+                    chunk.wallet_to
+                )
+
+                chunk.status = "done"
+                chunk.rows_written = rows
+                chunk.finished_at = datetime.now()
+                db.execute(
+                    update(AchievementBackfillJob)
+                    .where(AchievementBackfillJob.id == job_id)
+                    .values(
+                        done_chunks=AchievementBackfillJob.done_chunks + 1,
+                        rows_written=AchievementBackfillJob.rows_written + rows
+                    )
+                )
+                db.commit()
+                return rows
+
+            except OperationalError as e:
+                db.rollback()
+                if attempt == CHUNK_MAX_ATTEMPTS:
+                    raise
+                print(f"Повтор диапазона {chunk_no} задания {job_id}: {e}")
+
+        return 0
+
+    finally:
+        db.close()
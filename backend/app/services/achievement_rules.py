@@ -0,0 +1,253 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, Integer, case, cast, func, literal
+
+
+# category_mask - BIGINT со знаком: доступны биты 0..62
+MAX_CATEGORY_BITS = 63
+
+
+@dataclass
+class WalletAggregates:
+    """Колоночные агрегаты покупок (EARN) для набора кошельков"""
+    wallets: np.ndarray  # object: адреса кошельков
+    transaction_count: np.ndarray  # int64
+    spent_amount: np.ndarray  # float64, USD
+    category_mask: np.ndarray  # int64, биты из category_bits
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[str, int, Any, int]]) -> "WalletAggregates":
+        """Из строк (wallet, earn_count, spent_usd, category_mask)"""
+        if not rows:
+            return cls.empty()
+
+        wallets, counts, spent, masks = zip(*rows)
+        return cls(
+            wallets=np.array(wallets, dtype=object),
+            transaction_count=np.array(counts, dtype=np.int64),
+            spent_amount=np.array([float(value) for value in spent], dtype=np.float64),
+            category_mask=np.array(masks, dtype=np.int64),
+        )
+
+    @classmethod
+    def empty(cls) -> "WalletAggregates":
+        return cls(
+            wallets=np.array([], dtype=object),
+            transaction_count=np.array([], dtype=np.int64),
+            spent_amount=np.array([], dtype=np.float64),
+            category_mask=np.array([], dtype=np.int64),
+        )
+
+
+class Clause:
+    """Одно условие правила: прогресс 0-100 и выполнение для массива кошельков"""
+
+    def progress(self, aggregates: WalletAggregates) -> np.ndarray:
+        raise NotImplementedError
+
+    def satisfied(self, aggregates: WalletAggregates) -> np.ndarray:
+        raise NotImplementedError
+
+    def progress_sql(self, stats):
+        """SQL-выражение прогресса над колонками earn_count, spent_usd, category_mask"""
+        raise NotImplementedError
+
+
+class ConstantClause(Clause):
+    """Условие с фиксированным прогрессом (неизвестный тип или некорректный порог)"""
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def progress(self, aggregates: WalletAggregates) -> np.ndarray:
+        return np.full(len(aggregates), self.value, dtype=np.int64)
+
+    def satisfied(self, aggregates: WalletAggregates) -> np.ndarray:
+        return np.full(len(aggregates), self.value >= 100, dtype=bool)
+
+    def progress_sql(self, stats):
+        return literal(self.value)
+
+
+class TransactionCountClause(Clause):
+    def __init__(self, required: int):
+        self.required = required
+
+    def progress(self, aggregates: WalletAggregates) -> np.ndarray:
+        return np.minimum(100, np.floor(aggregates.transaction_count * 100 / self.required)).astype(np.int64)
+
+    def satisfied(self, aggregates: WalletAggregates) -> np.ndarray:
+        return aggregates.transaction_count >= self.required
+
+    def progress_sql(self, stats):
+        return func.least(100, func.floor(cast(stats.earn_count, Float) * 100 / self.required))
+
+
+class SpentAmountClause(Clause):
+    def __init__(self, required: float):
+        self.required = required
+
+    def progress(self, aggregates: WalletAggregates) -> np.ndarray:
+        return np.minimum(100, np.floor(aggregates.spent_amount / self.required * 100)).astype(np.int64)
+
+    def satisfied(self, aggregates: WalletAggregates) -> np.ndarray:
+        return aggregates.spent_amount >= self.required
+
+    def progress_sql(self, stats):
+        # float8, как и в NumPy: прогресс на границах совпадает с progress()
+        return func.least(100, func.floor(cast(stats.spent_usd, Float) / self.required * 100))
+
+
+class CategoriesClause(Clause):
+    """Покупки во всех перечисленных категориях; категория без бита не встречалась ни у кого"""
+
+    def __init__(self, masks: List[int]):
+        self.masks = np.array(masks, dtype=np.int64)
+
+    def _completed(self, aggregates: WalletAggregates) -> np.ndarray:
+        # (кошельки x категории) -> количество категорий с покупками
+        hits = (aggregates.category_mask[:, None] & self.masks[None, :]) != 0
+        return hits.sum(axis=1)
+
+    def progress(self, aggregates: WalletAggregates) -> np.ndarray:
+        return self._completed(aggregates) * 100 // len(self.masks)
+
+    def satisfied(self, aggregates: WalletAggregates) -> np.ndarray:
+        return self._completed(aggregates) == len(self.masks)
+
+    def progress_sql(self, stats):
+        completed = sum(
+            case((stats.category_mask.op("&")(int(mask)) != 0, 1), else_=0) for mask in self.masks
+        )
+        return completed * 100 / len(self.masks)
+
+
+class CompiledRule:
+    """Скомпилированное JSON-условие: все условия должны выполняться"""
+
+    def __init__(self, clauses: List[Clause], rule_hash: str):
+        self.clauses = clauses
+        self.rule_hash = rule_hash
+
+    def evaluate(self, aggregates: WalletAggregates) -> np.ndarray:
+        """Маска кошельков, выполнивших правило"""
+        result = np.ones(len(aggregates), dtype=bool)
+        for clause in self.clauses:
+            result &= clause.satisfied(aggregates)
+        return result
+
+    def progress_batch(self, aggregates: WalletAggregates) -> np.ndarray:
+        """Прогресс 0-100 по каждому кошельку (минимум по условиям)"""
+        result = np.full(len(aggregates), 100, dtype=np.int64)
+        for clause in self.clauses:
+            result = np.minimum(result, clause.progress(aggregates))
+        return np.clip(result, 0, 100)
+
+    def progress_sql(self, stats):
+        """То же, что progress_batch, одним SQL-выражением (для пересчета на стороне БД)"""
+        result = literal(100)
+        for clause in self.clauses:
+            result = func.least(result, clause.progress_sql(stats))
+        return cast(func.greatest(0, result), Integer)
+
+
+def rule_hash(rule: Any) -> str:
+    """Хеш канонического JSON правила"""
+    if isinstance(rule, str):
+        rule = json.loads(rule)
+    canonical = json.dumps(rule or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class RuleCompiler:
+    """Компиляция JSON-условий в CompiledRule с кешем.
+
+    Ключ кеша - хеш правила и биты упомянутых в нем категорий: когда категории
+    назначается бит, правило компилируется заново.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str, Tuple], CompiledRule] = {}
+        self._lock = threading.Lock()
+
+    def compile_condition(self, condition: Any, category_bits: Mapping[str, int]) -> CompiledRule:
+        """Achievement.required_condition: {"type": ..., "value"/"categories": ...}"""
+        return self._compile("condition", condition, category_bits)
+
+    def compile_requirements(self, requirements: Any, category_bits: Mapping[str, int]) -> CompiledRule:
+        """NFTPuzzle.required_achievements: {"min_transactions", "min_spent_usd", "business_categories"}"""
+        return self._compile("requirements", requirements, category_bits)
+
+    def _compile(self, kind: str, rule: Any, category_bits: Mapping[str, int]) -> CompiledRule:
+        if isinstance(rule, str):
+            rule = json.loads(rule)
+        rule = rule or {}
+
+        categories = rule.get("categories" if kind == "condition" else "business_categories") or []
+        key = (kind, rule_hash(rule), tuple((category, category_bits.get(category)) for category in categories))
+
+        compiled = self._cache.get(key)
+        if compiled is None:
+            builder = self._condition_clauses if kind == "condition" else self._requirement_clauses
+            compiled = CompiledRule(builder(rule, category_bits), key[1])
+            with self._lock:
+                self._cache[key] = compiled
+
+        return compiled
+
+    @staticmethod
+    def _category_masks(categories: List[str], category_bits: Mapping[str, int]) -> List[int]:
+        masks = []
+        for category in categories:
+            bit = category_bits.get(category)
+            masks.append(1 << bit if bit is not None and bit < MAX_CATEGORY_BITS else 0)
+        return masks
+
+    def _condition_clauses(self, condition: Dict[str, Any], category_bits: Mapping[str, int]) -> List[Clause]:
+        """Условие достижения; некорректный порог или неизвестный тип - прогресс 0"""
+        condition_type = condition.get("type")
+
+        if condition_type == "transaction_count":
+            required = condition.get("value", 0)
+            return [TransactionCountClause(required) if required > 0 else ConstantClause(0)]
+
+        if condition_type == "spent_amount":
+            required = condition.get("value", 0)
+            return [SpentAmountClause(float(required)) if required > 0 else ConstantClause(0)]
+
+        if condition_type == "business_categories":
+            categories = condition.get("categories", [])
+            if not categories:
+                return [ConstantClause(0)]
+            return [CategoriesClause(self._category_masks(categories, category_bits))]
+
+        return [ConstantClause(0)]
+
+    def _requirement_clauses(self, requirements: Dict[str, Any], category_bits: Mapping[str, int]) -> List[Clause]:
+        """Требования пазла; отсутствующие или нулевые требования считаются выполненными"""
+        clauses: List[Clause] = []
+
+        min_transactions = requirements.get("min_transactions") or 0
+        if min_transactions > 0:
+            clauses.append(TransactionCountClause(min_transactions))
+
+        min_spent = requirements.get("min_spent_usd") or 0
+        if min_spent > 0:
+            clauses.append(SpentAmountClause(float(min_spent)))
+
+        categories = requirements.get("business_categories") or []
+        if categories:
+            clauses.append(CategoriesClause(self._category_masks(categories, category_bits)))
+
+        return clauses
+
+
+rule_compiler = RuleCompiler()
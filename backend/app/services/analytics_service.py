@@ -0,0 +1,194 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Any, Optional
+from sqlalchemy import select, delete, func, case, cast, Date, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.analytics import BusinessDailyStats, BusinessDailyCustomer
+from app.models.transaction import Transaction
+
+
+EARN = "EARN"
+REDEEM = "REDEEM"
+
+# Сегменты клиентов по количеству дней с покупками за период
+CUSTOMER_SEGMENTS = (
+    ("new", 1, 1),
+    ("returning", 2, 4),
+    ("loyal", 5, None),
+)
+
+
+class AnalyticsService:
+    """Аналитика бизнеса на дневных агрегатах вместо сканирования transactions"""
+
+    def apply_transaction(self, db: Session, transaction: Transaction) -> None:
+        """Инкрементальное обновление дневного агрегата (до db.commit())"""
+        if not transaction.business_id or transaction.transaction_type not in (EARN, REDEEM):
+            return
+
+        # created_at задан в record_transaction: день агрегата совпадает с днем строки
+        day = transaction.created_at.date()
+        is_earn = transaction.transaction_type == EARN
+        amount = Decimal(transaction.amount_usd or 0)
+
+        # Строка клиента за день; xmax = 0 означает, что строка только что вставлена
+        customer_stmt = insert(BusinessDailyCustomer).values(
+            business_id=transaction.business_id,
+            day=day,
+            customer_wallet=transaction.customer_wallet,
+            transaction_count=1
+        )
+        customer_stmt = customer_stmt.on_conflict_do_update(
+            index_elements=[
+                BusinessDailyCustomer.business_id,
+                BusinessDailyCustomer.day,
+                BusinessDailyCustomer.customer_wallet
+            ],
+            set_={"transaction_count": BusinessDailyCustomer.transaction_count + 1}
+        ).returning(literal_column("xmax = 0"))
+        new_customer = bool(db.execute(customer_stmt).scalar())
+
+        stmt = insert(BusinessDailyStats).values(
+            business_id=transaction.business_id,
+            day=day,
+            tokens_issued=transaction.tokens_amount if is_earn else 0,
+            tokens_redeemed=0 if is_earn else transaction.tokens_amount,
+            transaction_count=1,
+            distinct_customers=1,
+            volume_usd=amount if is_earn else 0,
+            redeemed_usd=0 if is_earn else amount
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BusinessDailyStats.business_id, BusinessDailyStats.day],
+            set_={
+                "tokens_issued": BusinessDailyStats.tokens_issued + stmt.excluded.tokens_issued,
+                "tokens_redeemed": BusinessDailyStats.tokens_redeemed + stmt.excluded.tokens_redeemed,
+                "transaction_count": BusinessDailyStats.transaction_count + 1,
+                "distinct_customers": BusinessDailyStats.distinct_customers + (1 if new_customer else 0),
+                "volume_usd": BusinessDailyStats.volume_usd + stmt.excluded.volume_usd,
+                "redeemed_usd": BusinessDailyStats.redeemed_usd + stmt.excluded.redeemed_usd,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def get_analytics(self, db: Session, business_id: str, days: int = 30) -> Dict[str, Any]:
+        """Аналитика за последние days дней из дневных агрегатов"""
+        since = date.today() - timedelta(days=days - 1)
+
+        rows = db.query(BusinessDailyStats).filter(
+            BusinessDailyStats.business_id == business_id,
+            BusinessDailyStats.day >= since
+        ).order_by(BusinessDailyStats.day).all()
+
+        # Количество дней с покупками по каждому клиенту за период
+        visits = db.query(
+            BusinessDailyCustomer.customer_wallet,
+            func.count().label("days")
+        ).filter(
+            BusinessDailyCustomer.business_id == business_id,
+            BusinessDailyCustomer.day >= since
+        ).group_by(BusinessDailyCustomer.customer_wallet).subquery()
+
+        segment_columns = []
+        for name, low, high in CUSTOMER_SEGMENTS:
+            condition = visits.c.days >= low
+            if high is not None:
+                condition = condition & (visits.c.days <= high)
+            segment_columns.append(func.count(case((condition, 1))).label(name))
+        segments = db.execute(select(func.count(), *segment_columns).select_from(visits)).one()
+
+        volume_usd = sum((row.volume_usd for row in rows), Decimal(0))
+        redeemed_usd = sum((row.redeemed_usd for row in rows), Decimal(0))
+
+        # ROI программы: выручка с покупок по программе относительно стоимости выданных скидок
+        roi_percentage = float((volume_usd - redeemed_usd) / redeemed_usd * 100) if redeemed_usd > 0 else 0.0
+
+        return {
+            "active_customers": segments[0],
+            "tokens_issued": sum(row.tokens_issued for row in rows),
+            "tokens_redeemed": sum(row.tokens_redeemed for row in rows),
+            "total_transactions": sum(row.transaction_count for row in rows),
+            "roi_percentage": round(roi_percentage, 2),
+            "transactions_chart": [
+                {
+                    "date": row.day.isoformat(),
+                    "transactions": row.transaction_count,
+                    "tokens_issued": row.tokens_issued,
+                    "tokens_redeemed": row.tokens_redeemed,
+                    "customers": row.distinct_customers,
+                    "volume_usd": float(row.volume_usd)
+                }
+                for row in rows
+            ],
+            "customer_segments": {
+                name: segments[index + 1] for index, (name, _, _) in enumerate(CUSTOMER_SEGMENTS)
+            }
+        }
+
+    def rebuild(self, db: Session, since: Optional[date] = None) -> int:
+        """Пересчет агрегатов из transactions (все дни или начиная с since).
+
+        Периодическая догоняющая задача: исправляет расхождения после ручных
+        правок и загрузок данных в обход API. Коммит остается за вызывающим.
+        """
+        # Конкурентные apply_transaction ждут коммита пересчета и применятся поверх него
+        db.execute(text(
+            "LOCK TABLE business_daily_stats, business_daily_customers IN SHARE ROW EXCLUSIVE MODE"
+        ))
+
+        day = cast(Transaction.created_at, Date)
+        is_earn = Transaction.transaction_type == EARN
+
+        base_filter = [
+            Transaction.business_id.isnot(None),
+            Transaction.created_at.isnot(None),
+            Transaction.transaction_type.in_((EARN, REDEEM))
+        ]
+        stats_delete = delete(BusinessDailyStats)
+        customers_delete = delete(BusinessDailyCustomer)
+
+        if since is not None:
+            base_filter.append(Transaction.created_at >= since)
+            stats_delete = stats_delete.where(BusinessDailyStats.day >= since)
+            customers_delete = customers_delete.where(BusinessDailyCustomer.day >= since)
+
+        db.execute(stats_delete)
+        db.execute(customers_delete)
+
+        db.execute(insert(BusinessDailyCustomer).from_select(
+            [
+                BusinessDailyCustomer.business_id,
+                BusinessDailyCustomer.day,
+                BusinessDailyCustomer.customer_wallet,
+                BusinessDailyCustomer.transaction_count
+            ],
+            select(
+                Transaction.business_id, day, Transaction.customer_wallet, func.count()
+            ).where(*base_filter).group_by(Transaction.business_id, day, Transaction.customer_wallet)
+        ))
+
+        result = db.execute(insert(BusinessDailyStats).from_select(
+            [
+                BusinessDailyStats.business_id,
+                BusinessDailyStats.day,
+                BusinessDailyStats.tokens_issued,
+                BusinessDailyStats.tokens_redeemed,
+                BusinessDailyStats.transaction_count,
+                BusinessDailyStats.distinct_customers,
+                BusinessDailyStats.volume_usd,
+                BusinessDailyStats.redeemed_usd
+            ],
+            select(
+                Transaction.business_id,
+                day,
+                func.coalesce(func.sum(case((is_earn, Transaction.tokens_amount), else_=0)), 0),
+                func.coalesce(func.sum(case((is_earn, 0), else_=Transaction.tokens_amount)), 0),
+                func.count(),
+                func.count(func.distinct(Transaction.customer_wallet)),
+                func.coalesce(func.sum(case((is_earn, Transaction.amount_usd), else_=0)), 0),
+                func.coalesce(func.sum(case((is_earn, 0), else_=Transaction.amount_usd)), 0)
+            ).where(*base_filter).group_by(Transaction.business_id, day)
+        ))
+        return result.rowcount
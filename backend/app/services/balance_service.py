@@ -0,0 +1,157 @@
+from typing import Dict, Any, Optional
+from sqlalchemy import select, delete, exists, func, case, literal, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.balance import WalletBalance
+from app.models.transaction import Transaction
+
+
+# Типы транзакций, которые влияют на баланс
+EARN = "EARN"
+REDEEM = "REDEEM"
+
+
+class BalanceService:
+    """Материализованный баланс кошелька вместо суммирования всех транзакций"""
+
+    def apply_transaction(self, db: Session, transaction: Transaction) -> None:
+        """Учет транзакции в балансе.
+
+        Выполняется в той же DB-транзакции, что и вставка Transaction,
+        поэтому вызывать нужно до db.commit().
+        """
+        if transaction.transaction_type not in (EARN, REDEEM):
+            return
+
+        earned = transaction.tokens_amount if transaction.transaction_type == EARN else 0
+        spent = transaction.tokens_amount if transaction.transaction_type == REDEEM else 0
+
+        stmt = insert(WalletBalance).values(
+            wallet=transaction.customer_wallet,
+            total_earned=earned,
+            total_spent=spent,
+            current_balance=earned - spent,
+            transactions_count=1,
+            version=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WalletBalance.wallet],
+            set_={
+                "total_earned": WalletBalance.total_earned + stmt.excluded.total_earned,
+                "total_spent": WalletBalance.total_spent + stmt.excluded.total_spent,
+                "current_balance": WalletBalance.current_balance + stmt.excluded.current_balance,
+                "transactions_count": WalletBalance.transactions_count + 1,
+                "version": WalletBalance.version + 1,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def try_spend(self, db: Session, wallet: str, amount: int) -> Optional[int]:
+        """Списание amount токенов, если их хватает; возвращает новый баланс или None.
+
+        Условный UPDATE блокирует строку баланса до конца DB-транзакции: конкурентные
+        списания того же кошелька ждут и заново проверяют условие по новому балансу.
+        Транзакцию REDEEM после этого записывать через record_transaction(..., balance_applied=True).
+        """
+        stmt = update(WalletBalance).where(
+            WalletBalance.wallet == wallet,
+            WalletBalance.current_balance >= amount
+        ).values(
+            total_spent=WalletBalance.total_spent + amount,
+            current_balance=WalletBalance.current_balance - amount,
+            transactions_count=WalletBalance.transactions_count + 1,
+            version=WalletBalance.version + 1,
+            updated_at=func.now()
+        ).returning(WalletBalance.current_balance)
+        return db.execute(stmt).scalar()
+
+    def get_balance(self, db: Session, wallet: str) -> Dict[str, Any]:
+        """Баланс кошелька одним чтением по первичному ключу"""
+        return self.to_dict(db.get(WalletBalance, wallet))
+
+    @staticmethod
+    def to_dict(balance: Optional[WalletBalance]) -> Dict[str, Any]:
+        """Преобразование строки баланса в ответ API (нет строки - нулевой баланс)"""
+        if balance is None:
+            return {
+                "total_earned": 0,
+                "total_spent": 0,
+                "current_balance": 0,
+                "transactions_count": 0,
+                "version": 0
+            }
+
+        return {
+            "total_earned": balance.total_earned,
+            "total_spent": balance.total_spent,
+            "current_balance": balance.current_balance,
+            "transactions_count": balance.transactions_count,
+            "version": balance.version
+        }
+
+    def rebuild(self, db: Session, wallet: Optional[str] = None) -> int:
+        """Пересчет балансов из таблицы transactions (для всех кошельков или одного).
+
+        Возвращает количество пересчитанных кошельков. Коммит остается за вызывающим.
+        """
+        # Блокируем конкурентные apply_transaction до коммита пересчета: их транзакции
+        # еще не видны в снимке и будут применены поверх пересчитанного значения
+        db.execute(text("LOCK TABLE wallet_balances IN SHARE ROW EXCLUSIVE MODE"))
+
+        earned = func.coalesce(func.sum(case(
+            (Transaction.transaction_type == EARN, Transaction.tokens_amount), else_=0
+        )), 0)
+        spent = func.coalesce(func.sum(case(
+            (Transaction.transaction_type == REDEEM, Transaction.tokens_amount), else_=0
+        )), 0)
+
+        source = select(
+            Transaction.customer_wallet,
+            earned,
+            spent,
+            earned - spent,
+            func.count(Transaction.id),
+            literal(1)
+        ).where(
+            Transaction.transaction_type.in_((EARN, REDEEM))
+        ).group_by(Transaction.customer_wallet)
+
+        # Кошельки, у которых больше нет транзакций
+        stale = delete(WalletBalance).where(
+            ~exists().where(
+                Transaction.customer_wallet == WalletBalance.wallet,
+                Transaction.transaction_type.in_((EARN, REDEEM))
+            )
+        )
+
+        if wallet is not None:
+            source = source.where(Transaction.customer_wallet == wallet)
+            stale = stale.where(WalletBalance.wallet == wallet)
+
+        stmt = insert(WalletBalance).from_select(
+            [
+                WalletBalance.wallet,
+                WalletBalance.total_earned,
+                WalletBalance.total_spent,
+                WalletBalance.current_balance,
+                WalletBalance.transactions_count,
+                WalletBalance.version
+            ],
+            source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WalletBalance.wallet],
+            set_={
+                "total_earned": stmt.excluded.total_earned,
+                "total_spent": stmt.excluded.total_spent,
+                "current_balance": stmt.excluded.current_balance,
+                "transactions_count": stmt.excluded.transactions_count,
+                "version": WalletBalance.version + 1,
+                "updated_at": func.now()
+            }
+        )
+
+        db.execute(stale)
+        result = db.execute(stmt)
+        return result.rowcount
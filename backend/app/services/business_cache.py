@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.business import Business
+
+
+REDIS_KEY_PREFIX = "business-cache:"
+
+# Таймаут Redis: при недоступности кеша идем в БД, а не ждем
+REDIS_TIMEOUT = 0.1
+
+
+@dataclass(frozen=True)
+class BusinessRecord:
+    """Неизменяемый снимок настроек бизнеса для горячего пути"""
+    id: str
+    owner_wallet: str
+    name: str
+    category: str
+    description: Optional[str]
+    tokens_per_dollar: int
+    max_discount_percent: int
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, business: Business) -> "BusinessRecord":
+        return cls(**{field.name: getattr(business, field.name) for field in fields(cls)})
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "BusinessRecord":
+        data = json.loads(raw)
+        if data["created_at"]:
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+class BusinessCache:
+    """Кеш бизнесов по id: LRU в памяти процесса перед Redis.
+
+    Локальные записи живут business_cache_local_ttl_seconds: инвалидация из другого
+    воркера удаляет ключ в Redis, а локальная копия там устаревает не дольше этого срока.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int, local_ttl_seconds: int, local_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(
+            redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
+        self._aioredis = aioredis.Redis.from_url(
+            redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
+
+    def get_business(
+        self,
+        db: Session,
+        business_id: str,
+        active_only: bool = True
+    ) -> Optional[BusinessRecord]:
+        """Бизнес из кеша; при промахе - из Redis, затем из БД"""
+        record = self._get_local(business_id)
+
+        if record is None:
+            try:
+                raw = self._redis.get(REDIS_KEY_PREFIX + business_id)
+            except redis.RedisError as e:
+                print(f"Ошибка чтения кеша бизнеса из Redis: {e}")
+                raw = None
+
+            if raw is not None:
+                record = BusinessRecord.from_json(raw)
+            else:
+                business = db.get(Business, business_id)
+                if business is None:
+                    return None
+                record = BusinessRecord.from_model(business)
+                self._store_redis(record)
+
+            self._put_local(record)
+
+        return self._filter(record, active_only)
+
+    async def get_business_async(
+        self,
+        db: AsyncSession,
+        business_id: str,
+        active_only: bool = True
+    ) -> Optional[BusinessRecord]:
+        """Асинхронный вариант get_business"""
+        record = self._get_local(business_id)
+
+        if record is None:
+            try:
+                raw = await self._aioredis.get(REDIS_KEY_PREFIX + business_id)
+            except redis.RedisError as e:
+                print(f"Ошибка чтения кеша бизнеса из Redis: {e}")
+                raw = None
+
+            if raw is not None:
+                record = BusinessRecord.from_json(raw)
+            else:
+                business = await db.get(Business, business_id)
+                if business is None:
+                    return None
+                record = BusinessRecord.from_model(business)
+                await self._store_redis_async(record)
+
+            self._put_local(record)
+
+        return self._filter(record, active_only)
+
+    def invalidate(self, business_id: str) -> None:
+        """Сброс бизнеса из обоих уровней; вызывать после коммита изменений"""
+        with self._lock:
+            self._local.pop(business_id, None)
+
+        try:
+            self._redis.delete(REDIS_KEY_PREFIX + business_id)
+        except redis.RedisError as e:
+            print(f"Ошибка инвалидации кеша бизнеса в Redis: {e}")
+
+    @staticmethod
+    def _filter(record: BusinessRecord, active_only: bool) -> Optional[BusinessRecord]:
+        if active_only and not record.is_active:
+            return None
+        return record
+
+    def _get_local(self, business_id: str) -> Optional[BusinessRecord]:
+        with self._lock:
+            entry = self._local.get(business_id)
+            if entry is None:
+                return None
+
+            expires, record = entry
+            if expires <= time.monotonic():
+                del self._local[business_id]
+                return None
+
+            self._local.move_to_end(business_id)
+            return record
+
+    def _put_local(self, record: BusinessRecord) -> None:
+        with self._lock:
+            self._local[record.id] = (time.monotonic() + self.local_ttl_seconds, record)
+            self._local.move_to_end(record.id)
+
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _store_redis(self, record: BusinessRecord) -> None:
+        try:
+            self._redis.set(REDIS_KEY_PREFIX + record.id, record.to_json(), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            print(f"Ошибка записи кеша бизнеса в Redis: {e}")
+
+    async def _store_redis_async(self, record: BusinessRecord) -> None:
+        try:
+            await self._aioredis.set(REDIS_KEY_PREFIX + record.id, record.to_json(), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            print(f"Ошибка записи кеша бизнеса в Redis: {e}")
+
+
+business_cache = BusinessCache(
+    settings.redis_url,
+    settings.business_cache_ttl_seconds,
+    settings.business_cache_local_ttl_seconds,
+    settings.business_cache_local_size
+)
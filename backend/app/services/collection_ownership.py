@@ -0,0 +1,184 @@
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.nft import CollectionOwnership
+from app.services.nft_catalog import PuzzleRecord
+
+
+# Коллекция из всех пазлов каталога
+ALL_COLLECTION = "all"
+
+# Размер пачки при потоковом чтении карт
+BITMAP_BATCH_SIZE = 10000
+
+
+def bitmap_to_int(bitmap: Optional[bytes]) -> int:
+    """Карта как целое: бит slot числа - бит slot карты"""
+    return int.from_bytes(bitmap or b"", "little")
+
+
+def slots_mask(puzzles: Iterable[PuzzleRecord]) -> int:
+    mask = 0
+    for puzzle in puzzles:
+        mask |= 1 << puzzle.slot
+    return mask
+
+
+class CollectionOwnershipService:
+    """Битовые карты полученных пазлов (collection_ownership) по кошельку и коллекции"""
+
+    def record_mint(self, db: Session, wallet: str, puzzle: PuzzleRecord) -> None:
+        """Установка бита пазла (до db.commit(), в той же DB-транзакции, что и UserNFT)"""
+        for collection in self.collections_of(puzzle):
+            self._set_bit(db, wallet, collection, puzzle.slot)
+
+    @staticmethod
+    def collections_of(puzzle: PuzzleRecord) -> List[str]:
+        """Карты, в которых отмечается пазл: "all" и его коллекция"""
+        if puzzle.collection_id is None:
+            return [ALL_COLLECTION]
+        return [ALL_COLLECTION, puzzle.collection_id]
+
+    @staticmethod
+    def _set_bit(db: Session, wallet: str, collection: str, slot: int) -> None:
+        size = slot // 8 + 1
+        current = CollectionOwnership.bitmap
+        # Карта дополняется нулевыми байтами до байта slot
+        padded = case(
+            (func.length(current) >= size, current),
+            else_=current.op("||")(func.decode(func.repeat("00", size - func.length(current)), "hex"))
+        )
+        bitmap = func.set_bit(padded, slot, 1)
+
+        stmt = insert(CollectionOwnership).values(
+            wallet=wallet,
+            collection=collection,
+            bitmap=func.set_bit(func.decode(func.repeat("00", size), "hex"), slot, 1),
+            owned_count=1,
+            version=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CollectionOwnership.wallet, CollectionOwnership.collection],
+            set_={
+                "bitmap": bitmap,
+                "owned_count": func.bit_count(bitmap),
+                "version": CollectionOwnership.version + 1,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def get_bitmap(self, db: Session, wallet: str, collection: str = ALL_COLLECTION) -> int:
+        return bitmap_to_int(db.execute(self._bitmap_query(wallet, collection)).scalar())
+
+    async def get_bitmap_async(self, db: AsyncSession, wallet: str, collection: str = ALL_COLLECTION) -> int:
+        return bitmap_to_int((await db.execute(self._bitmap_query(wallet, collection))).scalar())
+
+    @staticmethod
+    def _bitmap_query(wallet: str, collection: str):
+        return select(CollectionOwnership.bitmap).where(
+            CollectionOwnership.wallet == wallet,
+            CollectionOwnership.collection == collection
+        )
+
+    def count_near_completion(
+        self,
+        db: Session,
+        puzzles: Sequence[PuzzleRecord],
+        missing: int = 1,
+        collection: str = ALL_COLLECTION
+    ) -> int:
+        """Сколько кошельков собрали все пазлы puzzles, кроме ровно missing.
+
+        owned_count учитывает и пазлы вне puzzles (например, неактивные), поэтому индекс
+        отбирает кандидатов с owned_count >= нужного, а точный подсчет - по маске.
+        """
+        needed = len(puzzles) - missing
+        if needed < 0:
+            return 0
+
+        mask = slots_mask(puzzles)
+        query = select(CollectionOwnership.bitmap).where(
+            CollectionOwnership.collection == collection,
+            CollectionOwnership.owned_count >= needed
+        ).execution_options(yield_per=BITMAP_BATCH_SIZE)
+
+        return sum(
+            1 for bitmap in db.execute(query).scalars()
+            if (bitmap_to_int(bitmap) & mask).bit_count() == needed
+        )
+
+    def clear(self, db: Session) -> None:
+        """Удаление всех карт (вместе с удалением всех UserNFT)"""
+        db.execute(CollectionOwnership.__table__.delete())
+
+    def rebuild(self, db: Session, wallet: Optional[str] = None) -> int:
+        """Пересчет карт из user_nfts (для всех кошельков или одного): "all" и по коллекциям.
+
+        Возвращает количество пересчитанных карт. Коммит остается за вызывающим.
+        """
+        # Конкурентные record_mint ждут коммита пересчета и применяются поверх него
+        db.execute(text("LOCK TABLE collection_ownership IN SHARE ROW EXCLUSIVE MODE"))
+
+        wallet_filter = "AND n.user_wallet = :wallet" if wallet is not None else ""
+        params = {"all_collection": ALL_COLLECTION}
+        if wallet is not None:
+            params["wallet"] = wallet
+
+        # Карты, в которых у кошелька больше нет NFT
+        db.execute(text(f"""
+            DELETE FROM collection_ownership co
+            WHERE true {"AND co.wallet = :wallet" if wallet is not None else ""}
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM user_nfts n
+                  JOIN nft_puzzles p ON p.id = n.puzzle_id
+                  WHERE n.user_wallet = co.wallet
+                    AND (co.collection = :all_collection OR p.collection_id = co.collection)
+              )
+        """), params)
+
+        # Байт карты - bit_or битов его пазлов; отсутствующие байты до последнего - нули
+        result = db.execute(text(f"""
+            WITH owned AS (
+                SELECT n.user_wallet AS wallet, c.collection, p.slot
+                FROM user_nfts n
+                JOIN nft_puzzles p ON p.id = n.puzzle_id
+                CROSS JOIN LATERAL (VALUES (CAST(:all_collection AS varchar)), (p.collection_id)) AS c(collection)
+                WHERE c.collection IS NOT NULL {wallet_filter}
+            ),
+            bytes AS (
+                SELECT wallet, collection, slot / 8 AS byte_no, bit_or(1 << (slot % 8)) AS byte_value
+                FROM owned
+                GROUP BY wallet, collection, slot / 8
+            ),
+            sizes AS (
+                SELECT wallet, collection, max(byte_no) AS last_byte FROM bytes GROUP BY wallet, collection
+            ),
+            bitmaps AS (
+                SELECT
+                    s.wallet,
+                    s.collection,
+                    decode(string_agg(lpad(to_hex(coalesce(b.byte_value, 0)), 2, '0'), '' ORDER BY g.byte_no), 'hex') AS bitmap
+                FROM sizes s
+                CROSS JOIN LATERAL generate_series(0, s.last_byte) AS g(byte_no)
+                LEFT JOIN bytes b ON b.wallet = s.wallet AND b.collection = s.collection AND b.byte_no = g.byte_no
+                GROUP BY s.wallet, s.collection
+            )
+            INSERT INTO collection_ownership (wallet, collection, bitmap, owned_count, version, updated_at)
+            SELECT wallet, collection, bitmap, bit_count(bitmap), 1, now()
+            FROM bitmaps
+            ON CONFLICT (wallet, collection) DO UPDATE SET
+                bitmap = excluded.bitmap,
+                owned_count = excluded.owned_count,
+                version = collection_ownership.version + 1,
+                updated_at = now()
+        """), params)
+        return result.rowcount
+
+
+collection_ownership_service = CollectionOwnershipService()
@@ -0,0 +1,99 @@
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services.collection_ownership import (
+    ALL_COLLECTION, collection_ownership_service, slots_mask
+)
+from app.services.nft_catalog import CatalogSnapshot, PuzzleRecord, nft_catalog
+
+
+def puzzle_item(puzzle: PuzzleRecord) -> Dict[str, Any]:
+    """Пазл (картинка) в ответах коллекций"""
+    return {
+        "id": puzzle.id,
+        "name": puzzle.puzzle_name,
+        "image_url": puzzle.image_url,
+        "position_x": puzzle.position_x,
+        "position_y": puzzle.position_y,
+        "rarity": puzzle.rarity,
+        "price_tokens": puzzle.price_tokens
+    }
+
+
+class CollectionView:
+    """Коллекция пользователя по битовой карте: счетчики - popcount, списки - один проход"""
+
+    def __init__(self, user_wallet: str, bitmap: int, puzzles: Sequence[PuzzleRecord]):
+        self.user_wallet = user_wallet
+        self.total = len(puzzles)
+        self.owned_count = (bitmap & slots_mask(puzzles)).bit_count()
+        self.owned = [puzzle for puzzle in puzzles if bitmap >> puzzle.slot & 1]
+        self.missing = [puzzle for puzzle in puzzles if not bitmap >> puzzle.slot & 1]
+
+    @property
+    def missing_count(self) -> int:
+        return self.total - self.owned_count
+
+    @property
+    def completion_percentage(self) -> float:
+        return (self.owned_count / self.total * 100) if self.total > 0 else 0
+
+    @property
+    def is_complete(self) -> bool:
+        return self.owned_count == self.total
+
+    def as_dict(self, noun: str = "puzzles") -> Dict[str, Any]:
+        """Общая форма ответа; noun - "puzzles" или "pictures" в именах ключей"""
+        return {
+            "user_wallet": self.user_wallet,
+            f"owned_{noun}": [puzzle_item(puzzle) for puzzle in self.owned],
+            f"missing_{noun}": [puzzle_item(puzzle) for puzzle in self.missing],
+            f"total_{noun}": self.total,
+            "owned_count": self.owned_count,
+            "missing_count": self.missing_count,
+            "completion_percentage": self.completion_percentage
+        }
+
+
+class CollectionService:
+    """Единая точка для всех представлений коллекции: каталог в памяти + одна карта из БД"""
+
+    def get_view(
+        self,
+        db: Session,
+        user_wallet: str,
+        puzzles: Optional[Sequence[PuzzleRecord]] = None,
+        collection: str = ALL_COLLECTION
+    ) -> CollectionView:
+        """Коллекция пользователя по puzzles (по умолчанию - активные пазлы коллекции collection).
+
+        Каталог по умолчанию читается синхронно: асинхронные эндпоинты передают puzzles
+        из await nft_catalog.get_async().
+        """
+        if puzzles is None:
+            puzzles = self._collection_puzzles(nft_catalog.get(), collection)
+        bitmap = collection_ownership_service.get_bitmap(db, user_wallet, collection)
+        return CollectionView(user_wallet, bitmap, puzzles)
+
+    async def get_view_async(
+        self,
+        db: AsyncSession,
+        user_wallet: str,
+        puzzles: Optional[Sequence[PuzzleRecord]] = None,
+        collection: str = ALL_COLLECTION
+    ) -> CollectionView:
+        if puzzles is None:
+            puzzles = self._collection_puzzles(await nft_catalog.get_async(), collection)
+        bitmap = await collection_ownership_service.get_bitmap_async(db, user_wallet, collection)
+        return CollectionView(user_wallet, bitmap, puzzles)
+
+    @staticmethod
+    def _collection_puzzles(catalog: CatalogSnapshot, collection: str) -> Sequence[PuzzleRecord]:
+        if collection == ALL_COLLECTION:
+            return catalog.active
+        return catalog.collection_puzzles(collection)
+
+
+collection_service = CollectionService()
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+from app.db.session import open_read_session
+from app.models.transaction import Transaction
+
+
+# Сколько строк читаем с серверного курсора за один раз
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    "id",
+    "created_at",
+    "customer_wallet",
+    "transaction_type",
+    "amount_usd",
+    "tokens_amount",
+    "solana_signature"
+]
+
+
+class ExportService:
+    """Потоковая выгрузка транзакций бизнеса (память не зависит от размера выгрузки)"""
+
+    def iter_business_transactions(
+        self,
+        business_id: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Iterator[tuple]:
+        """Строки транзакций бизнеса с серверного курсора.
+
+        Использует собственную сессию (на реплике, если она есть): генератор читается
+        уже после выхода из зависимостей запроса, когда сессия get_db закрыта.
+        """
+        db = open_read_session()
+        try:
+            query = db.query(
+                *(getattr(Transaction, column) for column in EXPORT_COLUMNS)
+            ).filter(
+                Transaction.business_id == business_id
+            )
+
+            if date_from is not None:
+                query = query.filter(Transaction.created_at >= date_from)
+            if date_to is not None:
+                query = query.filter(Transaction.created_at < date_to)
+
+            # yield_per включает stream_results: psycopg2 читает через именованный курсор
+            query = query.order_by(
+                Transaction.created_at, Transaction.id
+            ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+            for row in query:
+                yield tuple(row)
+        finally:
+            db.close()
+
+    def to_csv(self, rows: Iterator[tuple]) -> Iterator[str]:
+        """CSV с заголовком; строки отдаются пачками по EXPORT_BATCH_SIZE"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(self._format_row(row))
+
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+    def to_ndjson(self, rows: Iterator[tuple]) -> Iterator[str]:
+        """NDJSON: один JSON-объект на строку"""
+        chunk = []
+
+        for row in rows:
+            chunk.append(json.dumps(dict(zip(EXPORT_COLUMNS, self._format_row(row))), ensure_ascii=False))
+
+            if len(chunk) == EXPORT_BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    @staticmethod
+    def _format_row(row: tuple) -> list:
+        """Даты в ISO 8601, суммы строкой без потери точности"""
+        return [
+            value.isoformat() if isinstance(value, datetime)
+            else str(value) if isinstance(value, Decimal)
+            else value
+            for value in row
+        ]
@@ -0,0 +1,263 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.nft import Collection, NFTPuzzle
+
+
+REDIS_VERSION_KEY = "nft-catalog:version"
+
+# Коллекции, создаваемые миграцией 0009 (пазлы сидеров и демо-эндпоинтов)
+ESPRESSO_DAY_COLLECTION = "espresso_day"
+COFFEE_SHOP_COLLECTION = "coffee_shop"
+
+# Таймаут Redis: при недоступности каталог перечитывается из БД, а не ждет
+REDIS_TIMEOUT = 0.1
+
+
+def parse_required_achievements(value: Any) -> Dict[str, Any]:
+    """required_achievements как dict: часть сидеров сохраняет JSON-строку"""
+    if not value:
+        return {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+@dataclass(frozen=True, slots=True)
+class PuzzleRecord:
+    """Неизменяемый снимок пазла с разобранными условиями и ценой"""
+    id: str
+    puzzle_name: str
+    image_url: str
+    position_x: int
+    position_y: int
+    rarity: str
+    required_achievements: Dict[str, Any]  # Общий для всех запросов: не изменять
+    price_tokens: int
+    collection_id: Optional[str]
+    slot: int  # Бит в CollectionOwnership.bitmap
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, puzzle: NFTPuzzle) -> "PuzzleRecord":
+        requirements = parse_required_achievements(puzzle.required_achievements)
+        try:
+            price_tokens = int(requirements.get("price_tokens") or 0)
+        except (TypeError, ValueError):
+            price_tokens = 0
+
+        return cls(
+            id=puzzle.id,
+            puzzle_name=puzzle.puzzle_name,
+            image_url=puzzle.image_url,
+            position_x=puzzle.position_x,
+            position_y=puzzle.position_y,
+            rarity=puzzle.rarity,
+            required_achievements=requirements,
+            price_tokens=price_tokens,
+            collection_id=puzzle.collection_id,
+            slot=puzzle.slot,
+            is_active=bool(puzzle.is_active),
+            created_at=puzzle.created_at
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CollectionRecord:
+    """Неизменяемый снимок коллекции"""
+    id: str
+    name: str
+    business_id: Optional[str]
+    grid_width: int
+    grid_height: int
+    completion_reward: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, collection: Collection) -> "CollectionRecord":
+        return cls(
+            id=collection.id,
+            name=collection.name,
+            business_id=collection.business_id,
+            grid_width=collection.grid_width,
+            grid_height=collection.grid_height,
+            completion_reward=collection.completion_reward,
+            is_active=bool(collection.is_active),
+            created_at=collection.created_at
+        )
+
+
+class CatalogSnapshot:
+    """Версия каталога: все пазлы, активные пазлы, коллекции и индексы по id"""
+
+    def __init__(
+        self,
+        version: Optional[int],
+        puzzles: Iterable[PuzzleRecord],
+        collections: Iterable[CollectionRecord] = ()
+    ):
+        self.version = version
+        self.puzzles: Tuple[PuzzleRecord, ...] = tuple(puzzles)
+        self.active: Tuple[PuzzleRecord, ...] = tuple(puzzle for puzzle in self.puzzles if puzzle.is_active)
+        self.collections: Tuple[CollectionRecord, ...] = tuple(collections)
+        self._by_id = {puzzle.id: puzzle for puzzle in self.puzzles}
+        self._collections_by_id = {collection.id: collection for collection in self.collections}
+
+        by_collection: Dict[str, List[PuzzleRecord]] = {}
+        for puzzle in self.active:
+            if puzzle.collection_id is not None:
+                by_collection.setdefault(puzzle.collection_id, []).append(puzzle)
+        self._active_by_collection = {key: tuple(value) for key, value in by_collection.items()}
+
+    def get(self, puzzle_id: str, active_only: bool = False) -> Optional[PuzzleRecord]:
+        puzzle = self._by_id.get(puzzle_id)
+        if puzzle is None or (active_only and not puzzle.is_active):
+            return None
+        return puzzle
+
+    def get_collection(self, collection_id: str) -> Optional[CollectionRecord]:
+        return self._collections_by_id.get(collection_id)
+
+    def collection_puzzles(self, collection_id: str) -> Tuple[PuzzleRecord, ...]:
+        """Активные пазлы коллекции"""
+        return self._active_by_collection.get(collection_id, ())
+
+
+class NFTCatalog:
+    """Каталог пазлов и коллекций в памяти процесса с версией в Redis.
+
+    Изменение пазлов увеличивает версию (invalidate после коммита); процессы сверяют
+    версию не чаще nft_catalog_version_check_seconds и перечитывают каталог из БД только
+    при ее изменении. Если Redis недоступен, каталог перечитывается с той же периодичностью.
+    """
+
+    def __init__(self, redis_url: str, check_seconds: int):
+        self.check_seconds = check_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(
+            redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
+        self._aioredis = aioredis.Redis.from_url(
+            redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
+
+    def get(self) -> CatalogSnapshot:
+        """Текущий каталог; БД читается только при смене версии.
+
+        Синхронный вариант для скриптов и синхронного кода; из асинхронных эндпоинтов - get_async.
+        Снимок всегда загружается с primary, а не с реплики: реплика могла еще не получить
+        изменение, и устаревший снимок сохранился бы с новой версией до следующей инвалидации.
+        """
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        version = self._read_version()
+        snapshot = self._same_version(version)
+        if snapshot is not None:
+            return snapshot
+
+        # Версия читается до БД: изменение после чтения вызовет повторную загрузку
+        primary = SessionLocal()
+        try:
+            puzzles = primary.query(NFTPuzzle).order_by(NFTPuzzle.created_at, NFTPuzzle.id).all()
+            collections = primary.query(Collection).order_by(Collection.created_at, Collection.id).all()
+            return self._store(version, puzzles, collections)
+        finally:
+            primary.close()
+
+    async def get_async(self) -> CatalogSnapshot:
+        """Асинхронный вариант get: версия из Redis и загрузка с primary без блокировки цикла событий"""
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        version = await self._read_version_async()
+        snapshot = self._same_version(version)
+        if snapshot is not None:
+            return snapshot
+
+        async with AsyncSessionLocal() as primary:
+            puzzles = (await primary.execute(
+                select(NFTPuzzle).order_by(NFTPuzzle.created_at, NFTPuzzle.id)
+            )).scalars().all()
+            collections = (await primary.execute(
+                select(Collection).order_by(Collection.created_at, Collection.id)
+            )).scalars().all()
+            return self._store(version, puzzles, collections)
+
+    def invalidate(self) -> None:
+        """Новая версия каталога для всех процессов; вызывать после коммита изменений пазлов и коллекций"""
+        with self._lock:
+            self._snapshot = None
+
+        try:
+            self._redis.incr(REDIS_VERSION_KEY)
+        except redis.RedisError as e:
+            print(f"Ошибка инвалидации каталога NFT в Redis: {e}")
+
+    def _fresh_snapshot(self) -> Optional[CatalogSnapshot]:
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._snapshot
+        return None
+
+    def _same_version(self, version: Optional[int]) -> Optional[CatalogSnapshot]:
+        """Текущий снимок, если версия в Redis не изменилась"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and version is not None and snapshot.version == version:
+                self._checked_at = time.monotonic()
+                return snapshot
+        return None
+
+    def _store(
+        self,
+        version: Optional[int],
+        puzzles: Iterable[NFTPuzzle],
+        collections: Iterable[Collection]
+    ) -> CatalogSnapshot:
+        snapshot = CatalogSnapshot(
+            version,
+            (PuzzleRecord.from_model(puzzle) for puzzle in puzzles),
+            (CollectionRecord.from_model(collection) for collection in collections)
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+        return snapshot
+
+    def _read_version(self) -> Optional[int]:
+        """Версия из Redis; None - Redis недоступен"""
+        try:
+            return int(self._redis.get(REDIS_VERSION_KEY) or 0)
+        except redis.RedisError as e:
+            print(f"Ошибка чтения версии каталога NFT из Redis: {e}")
+            return None
+
+    async def _read_version_async(self) -> Optional[int]:
+        try:
+            return int(await self._aioredis.get(REDIS_VERSION_KEY) or 0)
+        except redis.RedisError as e:
+            print(f"Ошибка чтения версии каталога NFT из Redis: {e}")
+            return None
+
+
+nft_catalog = NFTCatalog(settings.redis_url, settings.nft_catalog_version_check_seconds)
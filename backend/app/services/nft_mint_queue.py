@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.nft import UserNFT
+from app.services.solana_service import SolanaService
+
+
+MINT_PENDING = "pending"
+MINT_MINTED = "minted"
+MINT_FAILED = "failed"
+
+
+class NFTMintQueue:
+    """Очередь чеканки NFT поверх user_nfts (mint_status = "pending").
+
+    Воркеры забирают пачку ожидающих NFT через FOR UPDATE SKIP LOCKED, чеканят ее одной
+    отправкой в сеть и фиксируют результат в той же транзакции: при падении процесса
+    блокировки снимаются, и NFT остаются в очереди для следующего воркера.
+    """
+
+    def __init__(self, solana_service: SolanaService):
+        self.solana_service = solana_service
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        """Разбудить воркеры этого процесса (после коммита нового NFT в очередь)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_workers(self) -> None:
+        """Воркеры очереди; выполняются до отмены задачи"""
+        self._wakeup = asyncio.Event()
+        await asyncio.gather(*(self._run_worker() for _ in range(settings.nft_mint_workers)))
+
+    async def _run_worker(self) -> None:
+        while True:
+            try:
+                minted = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка воркера чеканки NFT: {e}")
+                minted = 0
+
+            # Полная пачка - в очереди, вероятно, есть еще; иначе ждем сигнала или таймаута
+            if minted < settings.nft_mint_batch_size:
+                await self._wait()
+
+    async def _wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.nft_mint_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def process_batch(self) -> int:
+        """Чеканка одной пачки ожидающих NFT; возвращает количество отчеканенных"""
+        async with AsyncSessionLocal() as db:
+            nfts: List[UserNFT] = (await db.execute(
+                select(UserNFT)
+                .where(UserNFT.mint_status == MINT_PENDING)
+                .order_by(UserNFT.minted_at)
+                .limit(settings.nft_mint_batch_size)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            if not nfts:
+                return 0
+
+            try:
+                signatures = await self.solana_service.mint_nfts_batch(
+                    [(nft.user_wallet, nft.nft_metadata or {}) for nft in nfts]
+                )
+            except Exception as e:
+                print(f"Ошибка чеканки пачки NFT: {e}")
+                for nft in nfts:
+                    nft.mint_attempts += 1
+                    nft.mint_error = str(e)
+                    if nft.mint_attempts >= settings.nft_mint_max_attempts:
+                        nft.mint_status = MINT_FAILED
+                await db.commit()
+                return 0
+
+            for nft, signature in zip(nfts, signatures):
+                nft.solana_signature = signature
+                nft.mint_status = MINT_MINTED
+                nft.mint_attempts += 1
+                nft.mint_error = None
+            await db.commit()
+            return len(nfts)
+
+
+nft_mint_queue = NFTMintQueue(SolanaService())
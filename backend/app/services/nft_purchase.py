@@ -0,0 +1,95 @@
+import json
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.nft import UserNFT
+from app.models.transaction import Transaction
+from app.services.collection_ownership import collection_ownership_service
+from app.services.nft_catalog import PuzzleRecord
+from app.services.transaction_events import balance_service, record_transaction
+
+
+# Результаты покупки
+PURCHASED = "purchased"
+ALREADY_OWNED = "already_owned"
+INSUFFICIENT_BALANCE = "insufficient_balance"
+
+
+@dataclass
+class PurchaseResult:
+    status: str
+    nft_id: Optional[str] = None
+    balance_after: Optional[int] = None
+
+
+class NFTPurchaseService:
+    """Покупка NFT картинки за токены одной DB-транзакцией.
+
+    Порядок: условное списание (блокирует строку баланса кошелька), вставка UserNFT
+    с ON CONFLICT DO NOTHING, транзакция REDEEM и бит в карте коллекции. Любой отказ
+    откатывает все; конкурентные покупки одного кошелька выполняются по очереди.
+    """
+
+    def purchase(self, db: Session, user_wallet: str, picture: PuzzleRecord) -> PurchaseResult:
+        """Покупка с коммитом; при отказе транзакция откатывается"""
+        price_tokens = picture.price_tokens
+
+        balance_after = balance_service.try_spend(db, user_wallet, price_tokens)
+        if balance_after is None:
+            db.rollback()
+            return PurchaseResult(INSUFFICIENT_BALANCE)
+
+        nft_metadata = {
+            "name": f"ESPRESSO DAY Picture - {picture.puzzle_name}",
+            "description": f"Картинка #{picture.position_x},{picture.position_y} коллекции ESPRESSO DAY",
+            "image": picture.image_url,
+            "attributes": [
+                {"trait_type": "Rarity", "value": picture.rarity},
+                {"trait_type": "Position", "value": f"{picture.position_x},{picture.position_y}"},
+                {"trait_type": "Collection", "value": "ESPRESSO DAY"},
+                {"trait_type": "Price", "value": f"{price_tokens} tokens"}
+            ]
+        }
+
+        stmt = insert(UserNFT).values(
+            id=str(uuid.uuid4()),
+            user_wallet=user_wallet,
+            puzzle_id=picture.id,
+            nft_metadata=json.dumps(nft_metadata),
+            solana_signature=f"nft_{uuid.uuid4().hex[:16]}"
+        ).on_conflict_do_nothing(
+            index_elements=[UserNFT.user_wallet, UserNFT.puzzle_id]
+        ).returning(UserNFT.id)
+
+        nft_id = db.execute(stmt).scalar()
+        if nft_id is None:
+            # Картинка уже есть: списание откатывается вместе с транзакцией
+            db.rollback()
+            return PurchaseResult(ALREADY_OWNED)
+
+        # Трата токенов; бизнеса у покупки нет, поэтому business_id пустой
+        spend_transaction = Transaction(
+            id=str(uuid.uuid4()),
+            customer_wallet=user_wallet,
+            business_id=None,
+            transaction_type="REDEEM",
+            amount_usd=Decimal("0.00"),
+            tokens_amount=price_tokens,
+            solana_signature=f"nft_purchase_{uuid.uuid4().hex[:16]}",
+            transaction_metadata={"nft_purchase": True, "picture_id": picture.id, "nft_id": nft_id}
+        )
+
+        db.add(spend_transaction)
+        record_transaction(db, spend_transaction, balance_applied=True)
+        collection_ownership_service.record_mint(db, user_wallet, picture)
+        db.commit()
+
+        return PurchaseResult(PURCHASED, nft_id, balance_after)
+
+
+nft_purchase_service = NFTPurchaseService()
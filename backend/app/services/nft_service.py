@@ -1,13 +1,18 @@
 from app.core.config import settings
-import asyncio
-import random
-import string
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Union
+from sqlalchemy import and_, case, exists, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import run_in_session, commit_session, rollback_session, mark_written
+from app.db.replicas import wallet_pin_key
 from app.models.nft import Achievement, UserAchievement, UserNFT, NFTPuzzle
-from app.models.transaction import Transaction
-from app.models.business import Business
+from app.services.transaction_events import wallet_stats_service
+from app.services.achievement_rules import rule_compiler
+from app.services.nft_catalog import COFFEE_SHOP_COLLECTION, ESPRESSO_DAY_COLLECTION, nft_catalog
+from app.services.collection_ownership import collection_ownership_service
+from app.services.nft_mint_queue import MINT_PENDING, nft_mint_queue
 
 
 class NFTService:
@@ -15,11 +20,6 @@ class NFTService:
         # Для MVP используем заглушки
         pass
 
-    async def mint_nft(self, user_wallet: str, metadata: Dict[str, Any]) -> str:
-        """Чеканка NFT (заглушка для MVP)"""
-        await asyncio.sleep(0.3)  # Имитируем время чеканки
-        return f"nft_{''.join(random.choices(string.ascii_lowercase + string.digits, k=44))}"
-
     async def check_achievement_requirements(
         self, 
         user_wallet: str, 
@@ -28,86 +28,107 @@ class NFTService:
     ) -> bool:
         """Проверка выполнения требований для получения пазла"""
         try:
-            # Проверяем различные типы требований
-            if "min_transactions" in requirements:
-                min_tx = requirements["min_transactions"]
-                tx_count = db.query(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).count()
-                
-                if tx_count < min_tx:
-                    return False
-            
-            if "min_spent_usd" in requirements:
-                min_spent = requirements["min_spent_usd"]
-                total_spent = db.query(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).with_entities(
-                    db.func.sum(Transaction.amount_usd)
-                ).scalar() or 0
-                
-                if total_spent < min_spent:
-                    return False
-            
-            if "business_categories" in requirements:
-                required_categories = requirements["business_categories"]
-                user_categories = db.query(Business.category).join(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).distinct().all()
-                
-                user_category_list = [cat[0] for cat in user_categories]
-                if not all(cat in user_category_list for cat in required_categories):
-                    return False
-            
-            return True
+            rule = rule_compiler.compile_requirements(requirements, wallet_stats_service.category_bits(db))
+            aggregates = wallet_stats_service.load_aggregates(db, [user_wallet])
+            return bool(rule.evaluate(aggregates)[0])
             
         except Exception as e:
             print(f"Error checking achievement requirements: {e}")
             return False
 
+    def find_eligible_wallets(
+        self,
+        db: Session,
+        requirements: Dict[str, Any],
+        limit: int
+    ) -> Tuple[int, List[str]]:
+        """Кошельки, выполняющие требования пазла: (количество, первые limit адресов).
+
+        Правило применяется сразу к пачке кошельков из wallet_stats; кошельки
+        без единой покупки в выборку не попадают.
+        """
+        rule = rule_compiler.compile_requirements(requirements, wallet_stats_service.category_bits(db))
+        
+        eligible_count = 0
+        wallets = []
+        
+        for aggregates in wallet_stats_service.iter_aggregates(db):
+            eligible = aggregates.wallets[rule.evaluate(aggregates)]
+            eligible_count += len(eligible)
+            
+            if len(wallets) < limit:
+                wallets.extend(eligible[:limit - len(wallets)].tolist())
+        
+        return eligible_count, wallets
+
     async def check_and_update_achievements(
         self, 
         user_wallet: str, 
-        db: Session
+        db: Union[Session, AsyncSession]
     ) -> List[str]:
         """Проверка и обновление достижений пользователя"""
-        updated_achievements = []
-        
+        return await run_in_session(db, self.update_achievements, user_wallet)
+
+    def update_achievements(self, db: Session, user_wallet: str) -> List[str]:
+        """Пересчет достижений пользователя (синхронная часть для Session/AsyncSession).
+
+        Агрегаты кошелька читаются из счетчиков wallet_stats, условия проверяются
+        скомпилированными правилами (achievement_rules), изменившиеся строки
+        UserAchievement записываются одним upsert и одним коммитом.
+        Возвращает названия достижений, завершенных этим пересчетом.
+        """
         try:
-            # Получаем все активные достижения
             achievements = db.query(Achievement).filter(Achievement.is_active == True).all()
+            if not achievements:
+                return []
+            
+            aggregates = wallet_stats_service.load_aggregates(db, [user_wallet])
+            category_bits = wallet_stats_service.category_bits(db)
+            
+            # Текущий прогресс пользователя по всем достижениям
+            previous = dict(db.query(UserAchievement.achievement_id, UserAchievement.progress).filter(
+                UserAchievement.user_wallet == user_wallet
+            ).all())
+            
+            rows = []
+            updated_achievements = []
             
             for achievement in achievements:
-                # Проверяем прогресс достижения
-                progress = await self._calculate_achievement_progress(
-                    user_wallet, achievement, db
-                )
+                rule = rule_compiler.compile_condition(achievement.required_condition, category_bits)
+                progress = int(rule.progress_batch(aggregates)[0])
+                old_progress = previous.get(achievement.id)
                 
-                # Получаем или создаем запись о достижении пользователя
-                user_achievement = db.query(UserAchievement).filter(
-                    UserAchievement.user_wallet == user_wallet,
-                    UserAchievement.achievement_id == achievement.id
-                ).first()
+                if progress == old_progress:
+                    continue
                 
-                if not user_achievement:
-                    user_achievement = UserAchievement(
-                        id=str(uuid.uuid4()),
-                        user_wallet=user_wallet,
-                        achievement_id=achievement.id,
-                        progress=progress
-                    )
-                    db.add(user_achievement)
-                else:
-                    user_achievement.progress = progress
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "user_wallet": user_wallet,
+                    "achievement_id": achievement.id,
+                    "progress": progress
+                })
                 
                 # Если достижение завершено и раньше не было завершено
-                if progress >= 100 and user_achievement.progress < 100:
+                if progress >= 100 and (old_progress or 0) < 100:
                     updated_achievements.append(achievement.name)
-                
-                db.commit()
+            
+            if not rows:
+                return []
+            
+            stmt = insert(UserAchievement).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserAchievement.user_wallet, UserAchievement.achievement_id],
+                set_={
+                    "progress": stmt.excluded.progress,
+                    "completed_at": case(
+                        (and_(stmt.excluded.progress >= 100, UserAchievement.progress < 100), func.now()),
+                        else_=UserAchievement.completed_at
+                    )
+                }
+            )
+            db.execute(stmt)
+            mark_written(db, wallet_pin_key(user_wallet))
+            db.commit()
             
             return updated_achievements
             
@@ -116,52 +137,6 @@ class NFTService:
             db.rollback()
             return []
 
-    async def _calculate_achievement_progress(
-        self, 
-        user_wallet: str, 
-        achievement: Achievement, 
-        db: Session
-    ) -> int:
-        """Расчет прогресса конкретного достижения"""
-        try:
-            condition = achievement.required_condition
-            progress = 0
-            
-            if condition.get("type") == "transaction_count":
-                required = condition.get("value", 0)
-                actual = db.query(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).count()
-                progress = min(100, int((actual / required) * 100)) if required > 0 else 0
-            
-            elif condition.get("type") == "spent_amount":
-                required = condition.get("value", 0)
-                actual = db.query(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).with_entities(
-                    db.func.sum(Transaction.amount_usd)
-                ).scalar() or 0
-                progress = min(100, int((actual / required) * 100)) if required > 0 else 0
-            
-            elif condition.get("type") == "business_categories":
-                required_categories = condition.get("categories", [])
-                user_categories = db.query(Business.category).join(Transaction).filter(
-                    Transaction.customer_wallet == user_wallet,
-                    Transaction.transaction_type == "EARN"
-                ).distinct().all()
-                
-                user_category_list = [cat[0] for cat in user_categories]
-                completed_categories = sum(1 for cat in required_categories if cat in user_category_list)
-                progress = int((completed_categories / len(required_categories)) * 100) if required_categories else 0
-            
-            return max(0, min(100, progress))
-            
-        except Exception as e:
-            print(f"Error calculating achievement progress: {e}")
-            return 0
-
     def create_espresso_day_puzzles(self, db: Session) -> List[str]:
         """Создание пазлов для картинки ESPRESSO DAY"""
         puzzle_ids = []
@@ -234,6 +209,7 @@ class NFTService:
                     position_x=puzzle_data["position_x"],
                     position_y=puzzle_data["position_y"],
                     rarity=puzzle_data["rarity"],
+                    collection_id=ESPRESSO_DAY_COLLECTION,
                     required_achievements=puzzle_data["required_achievements"]
                 )
                 
@@ -241,6 +217,7 @@ class NFTService:
                 puzzle_ids.append(puzzle.id)
             
             db.commit()
+            nft_catalog.invalidate()
             return puzzle_ids
             
         except Exception as e:
@@ -253,9 +230,13 @@ class NFTService:
         user_wallet: str, 
         business_id: str, 
         tokens_amount: int,
-        db: Session
-    ) -> str:
-        """Проверка достижений и чеканка NFT после покупки"""
+        db: Union[Session, AsyncSession]
+    ) -> Optional[str]:
+        """Проверка достижений и выдача NFT после покупки.
+
+        NFT записывается со статусом "pending" и чеканится в фоне (nft_mint_queue);
+        возвращается id записи UserNFT, статус - GET /nft/mints/{nft_id}.
+        """
         try:
             # Проверяем достижения
             updated_achievements = await self.check_and_update_achievements(user_wallet, db)
@@ -263,59 +244,56 @@ class NFTService:
             if not updated_achievements:
                 return None
             
-            # Получаем все завершенные достижения
-            completed_achievements = db.query(UserAchievement).filter(
-                UserAchievement.user_wallet == user_wallet,
-                UserAchievement.progress >= 100
-            ).all()
-            
             # Ищем подходящий пазл для чеканки
-            for achievement in completed_achievements:
-                achievement_obj = db.query(Achievement).filter(
-                    Achievement.id == achievement.achievement_id
-                ).first()
-                
-                if achievement_obj and achievement_obj.reward_puzzle_id:
-                    # Проверяем, не получил ли пользователь уже этот пазл
-                    existing_nft = db.query(UserNFT).filter(
-                        UserNFT.user_wallet == user_wallet,
-                        UserNFT.puzzle_id == achievement_obj.reward_puzzle_id
-                    ).first()
-                    
-                    if not existing_nft:
-                        # Чеканим NFT
-                        nft_id = await self.mint_nft(user_wallet, {
-                            "puzzle_id": achievement_obj.reward_puzzle_id,
-                            "achievement_id": achievement_obj.id,
-                            "business_id": business_id,
-                            "tokens_earned": tokens_amount
-                        })
-                        
-                        # Сохраняем NFT в БД
-                        user_nft = UserNFT(
-                            id=str(uuid.uuid4()),
-                            user_wallet=user_wallet,
-                            puzzle_id=achievement_obj.reward_puzzle_id,
-                            nft_metadata={
-                                "achievement": achievement_obj.name,
-                                "minted_at": str(uuid.uuid4()),
-                                "business_id": business_id
-                            },
-                            solana_signature=nft_id
-                        )
-                        
-                        db.add(user_nft)
-                        db.commit()
-                        
-                        return nft_id
+            achievement_obj = await run_in_session(db, self._find_unclaimed_reward, user_wallet)
             
-            return None
+            if achievement_obj is None:
+                return None
+            
+            # Сохраняем NFT в очередь чеканки
+            user_nft = UserNFT(
+                id=str(uuid.uuid4()),
+                user_wallet=user_wallet,
+                puzzle_id=achievement_obj.reward_puzzle_id,
+                nft_metadata={
+                    "achievement": achievement_obj.name,
+                    "achievement_id": achievement_obj.id,
+                    "business_id": business_id,
+                    "tokens_earned": tokens_amount
+                },
+                mint_status=MINT_PENDING
+            )
+            
+            db.add(user_nft)
+            # Каталог читается до run_sync: внутри него синхронный Redis/БД блокировал бы цикл событий
+            puzzle = (await nft_catalog.get_async()).get(achievement_obj.reward_puzzle_id)
+            if puzzle is not None:
+                await run_in_session(db, collection_ownership_service.record_mint, user_wallet, puzzle)
+            mark_written(db, wallet_pin_key(user_wallet))
+            await commit_session(db)
+            nft_mint_queue.notify()
+            
+            return user_nft.id
             
         except Exception as e:
             print(f"Error checking achievements and minting NFT: {e}")
-            db.rollback()
+            await rollback_session(db)
             return None
 
+    def _find_unclaimed_reward(self, db: Session, user_wallet: str) -> Optional[Achievement]:
+        """Первое завершенное достижение, пазл-награду за которое пользователь еще не получил"""
+        return db.query(Achievement).join(
+            UserAchievement, UserAchievement.achievement_id == Achievement.id
+        ).filter(
+            UserAchievement.user_wallet == user_wallet,
+            UserAchievement.progress >= 100,
+            Achievement.reward_puzzle_id.isnot(None),
+            ~exists().where(
+                UserNFT.user_wallet == user_wallet,
+                UserNFT.puzzle_id == Achievement.reward_puzzle_id
+            )
+        ).first()
+
     def create_coffee_collection_puzzles(self, db: Session) -> List[str]:
         """Создание пазлов для коллекции кофейни (3 картинки)"""
         puzzle_ids = []
@@ -406,6 +384,7 @@ class NFTService:
                     position_x=puzzle_data["position_x"],
                     position_y=puzzle_data["position_y"],
                     rarity=puzzle_data["rarity"],
+                    collection_id=COFFEE_SHOP_COLLECTION,
                     required_achievements=puzzle_data["required_achievements"]
                 )
                 
@@ -413,6 +392,7 @@ class NFTService:
                 puzzle_ids.append(puzzle.id)
             
             db.commit()
+            nft_catalog.invalidate()
             return puzzle_ids
             
         except Exception as e:
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+
+REDIS_KEY_PREFIX = "qr-cache:"
+
+# Таймаут Redis: при недоступности QR рендерится заново, а не ждет
+REDIS_TIMEOUT = 0.1
+
+
+def cache_key(data: Dict[str, Any], options: Dict[str, Any]) -> str:
+    """Хеш канонического JSON данных и параметров рендера"""
+    canonical = json.dumps(
+        {"data": data, "options": options},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class QRImageCache:
+    """Кеш готовых QR-изображений (base64 PNG) по хешу содержимого.
+
+    LRU в памяти процесса на qr_cache_local_size записей; при qr_cache_redis_ttl_seconds > 0
+    изображения также пишутся в Redis и при локальном промахе берутся оттуда.
+    Записи не инвалидируются: одинаковый ключ всегда дает одинаковое изображение.
+    """
+
+    def __init__(self, redis_url: str, local_size: int, redis_ttl_seconds: int):
+        self.local_size = local_size
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        # Асинхронный клиент: обращения к Redis не блокируют event loop
+        self._redis = aioredis.Redis.from_url(
+            redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        ) if redis_ttl_seconds > 0 else None
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.encodes = 0
+        self.encode_seconds = 0.0
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            image = self._local.get(key)
+            if image is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return image
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(REDIS_KEY_PREFIX + key)
+            except redis.RedisError as e:
+                print(f"Ошибка чтения кеша QR из Redis: {e}")
+                raw = None
+
+            if raw is not None:
+                image = raw.decode()
+                self._put_local(key, image)
+                with self._lock:
+                    self.redis_hits += 1
+                return image
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key: str, image: str, encode_seconds: float) -> None:
+        """Сохранение только что отрендеренного изображения и времени рендера"""
+        self._put_local(key, image)
+        with self._lock:
+            self.encodes += 1
+            self.encode_seconds += encode_seconds
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(REDIS_KEY_PREFIX + key, image, ex=self.redis_ttl_seconds)
+            except redis.RedisError as e:
+                print(f"Ошибка записи кеша QR в Redis: {e}")
+
+    def _put_local(self, key: str, image: str) -> None:
+        with self._lock:
+            self._local[key] = image
+            self._local.move_to_end(key)
+
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            hits = self.local_hits + self.redis_hits
+            return {
+                "size": len(self._local),
+                "max_size": self.local_size,
+                "redis_enabled": self._redis is not None,
+                "lookups": lookups,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "encodes": self.encodes,
+                "encode_seconds_total": round(self.encode_seconds, 6),
+                "avg_encode_ms": round(self.encode_seconds / self.encodes * 1000, 3) if self.encodes else 0.0
+            }
+
+
+qr_image_cache = QRImageCache(
+    settings.redis_url,
+    settings.qr_cache_local_size,
+    settings.qr_cache_redis_ttl_seconds
+)
@@ -0,0 +1,215 @@
+import hashlib
+import hmac
+import struct
+import time
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Компактный формат: префикс + base45(версия, вид, поля, HMAC). Все символы из алфавита
+# alphanumeric-режима QR, поэтому код занимает ~5.5 бит на символ вместо 8 у JSON
+PAYLOAD_PREFIX = "LP1:"
+FORMAT_VERSION = 1
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_INDEX = {char: index for index, char in enumerate(BASE45_ALPHABET)}
+
+SIGNATURE_BYTES = 10  # Усеченный HMAC-SHA256, 80 бит
+
+# Поля по виду кода: (имя в JSON, тип). Порядок полей - часть формата
+KIND_PURCHASE = 1
+KIND_RECEIPT = 2
+
+PAYLOAD_FIELDS: Dict[int, List[Tuple[str, str]]] = {
+    # QRCodeData из /qr/generate
+    KIND_PURCHASE: [
+        ("user_wallet", "str"),
+        ("amount_usd", "float_cents"),
+        ("business_id", "str"),
+        ("timestamp", "timestamp"),
+        ("transaction_type", "str"),
+    ],
+    # QR-код чека (type = "receipt_scan")
+    KIND_RECEIPT: [
+        ("receipt_id", "str"),
+        ("transaction_id", "str"),
+        ("business_id", "str"),
+        ("customer_wallet", "str"),
+        ("amount_usd", "decimal_cents"),
+        ("timestamp", "timestamp"),
+    ],
+}
+
+# Строка-UUID кодируется 16 байтами, остальные - длиной и UTF-8
+STRING_RAW = 0
+STRING_UUID = 1
+
+
+class QRPayloadError(ValueError):
+    """Поддельный, поврежденный или истекший QR-код"""
+
+
+def base45_encode(data: bytes) -> str:
+    """Base45 (RFC 9285)"""
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars.extend((BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e]))
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars.extend((BASE45_ALPHABET[c], BASE45_ALPHABET[d]))
+    return "".join(chars)
+
+
+def base45_decode(text: str) -> bytes:
+    try:
+        values = [BASE45_INDEX[char] for char in text]
+    except KeyError:
+        raise QRPayloadError("Недопустимый символ в QR-коде")
+    if len(values) % 3 == 1:
+        raise QRPayloadError("Неверная длина QR-кода")
+
+    result = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if value > 0xFFFF:
+                raise QRPayloadError("Неверные данные QR-кода")
+            result.extend(divmod(value, 256))
+        else:
+            value = chunk[0] + chunk[1] * 45
+            if value > 0xFF:
+                raise QRPayloadError("Неверные данные QR-кода")
+            result.append(value)
+    return bytes(result)
+
+
+class QRPayloadCodec:
+    """Компактные подписанные QR-коды: упакованные поля + HMAC, ключ выводится из jwt_secret.
+
+    decode проверяет подпись и срок действия без обращения к БД и возвращает dict в том же
+    виде, что и JSON старого формата, поэтому обработчики сканирования не меняются.
+    """
+
+    def __init__(self, secret: str):
+        self._key = hmac.new(secret.encode(), b"qr-payload-v1", hashlib.sha256).digest()
+
+    @staticmethod
+    def is_compact(text: str) -> bool:
+        return text.startswith(PAYLOAD_PREFIX)
+
+    def encode_purchase(self, data: Dict[str, Any]) -> str:
+        return self._encode(KIND_PURCHASE, data)
+
+    def encode_receipt(self, data: Dict[str, Any]) -> str:
+        return self._encode(KIND_RECEIPT, data)
+
+    def decode(self, text: str, kind: int, max_age_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """Проверка подписи, вида и срока действия; QRPayloadError при любой ошибке"""
+        if not self.is_compact(text):
+            raise QRPayloadError("Неизвестный формат QR-кода")
+
+        raw = base45_decode(text[len(PAYLOAD_PREFIX):])
+        if len(raw) < 2 + SIGNATURE_BYTES:
+            raise QRPayloadError("Неверная длина QR-кода")
+
+        body, signature = raw[:-SIGNATURE_BYTES], raw[-SIGNATURE_BYTES:]
+        if not hmac.compare_digest(signature, self._sign(body)):
+            raise QRPayloadError("Неверная подпись QR-кода")
+
+        version, payload_kind = body[0], body[1]
+        if version != FORMAT_VERSION or payload_kind != kind:
+            raise QRPayloadError("Неверный тип QR-кода")
+
+        data = self._unpack(kind, body[2:])
+        if max_age_seconds is not None and time.time() - data["timestamp"] > max_age_seconds:
+            raise QRPayloadError("QR код истек")
+
+        if kind == KIND_RECEIPT:
+            data["type"] = "receipt_scan"
+        return data
+
+    def _encode(self, kind: int, data: Dict[str, Any]) -> str:
+        body = bytes((FORMAT_VERSION, kind)) + self._pack(kind, data)
+        return PAYLOAD_PREFIX + base45_encode(body + self._sign(body))
+
+    def _sign(self, body: bytes) -> bytes:
+        return hmac.new(self._key, body, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def _pack(self, kind: int, data: Dict[str, Any]) -> bytes:
+        """Упаковка полей; QRPayloadError, если значение не помещается в формат"""
+        parts = []
+        for name, field_type in PAYLOAD_FIELDS[kind]:
+            value = data[name]
+            if field_type == "str":
+                parts.append(self._pack_string(str(value)))
+            elif field_type == "timestamp":
+                parts.append(self._pack_unsigned(">I", int(value), name))
+            else:
+                try:
+                    cents = (Decimal(str(value)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+                except ArithmeticError:
+                    raise QRPayloadError(f"Неверная сумма для QR-кода: {value}")
+                parts.append(self._pack_unsigned(">Q", int(cents), name))
+        return b"".join(parts)
+
+    @staticmethod
+    def _pack_unsigned(fmt: str, value: int, name: str) -> bytes:
+        # Отрицательные и слишком большие значения: struct.error не является ValueError
+        try:
+            return struct.pack(fmt, value)
+        except struct.error:
+            raise QRPayloadError(f"Значение {name} не помещается в QR-код: {value}")
+
+    @staticmethod
+    def _pack_string(value: str) -> bytes:
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            parsed = None
+
+        # UUID только в канонической записи, иначе декодирование вернет другую строку
+        if parsed is not None and str(parsed) == value:
+            return bytes((STRING_UUID,)) + parsed.bytes
+
+        encoded = value.encode()
+        if len(encoded) > 0xFF:
+            raise QRPayloadError("Слишком длинное поле для QR-кода")
+        return bytes((STRING_RAW, len(encoded))) + encoded
+
+    def _unpack(self, kind: int, raw: bytes) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        offset = 0
+        try:
+            for name, field_type in PAYLOAD_FIELDS[kind]:
+                if field_type == "str":
+                    if raw[offset] == STRING_UUID:
+                        data[name] = str(uuid.UUID(bytes=raw[offset + 1:offset + 17]))
+                        offset += 17
+                    else:
+                        length = raw[offset + 1]
+                        data[name] = raw[offset + 2:offset + 2 + length].decode()
+                        offset += 2 + length
+                elif field_type == "timestamp":
+                    data[name] = struct.unpack_from(">I", raw, offset)[0]
+                    offset += 4
+                else:
+                    cents = struct.unpack_from(">Q", raw, offset)[0]
+                    amount = Decimal(cents) / 100
+                    data[name] = float(amount) if field_type == "float_cents" else str(amount.quantize(Decimal("0.01")))
+                    offset += 8
+        except (IndexError, ValueError, struct.error):
+            raise QRPayloadError("Неверные данные QR-кода")
+
+        if offset != len(raw):
+            raise QRPayloadError("Неверные данные QR-кода")
+        return data
+
+
+qr_payload_codec = QRPayloadCodec(settings.jwt_secret)
@@ -1,68 +1,226 @@
 import qrcode
+from qrcode.image.svg import SvgPathImage
 import io
 import base64
-from typing import Dict, Any
+import json
+import time
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Union
+from app.core.config import settings
+from app.services.qr_cache import cache_key, qr_image_cache
+
+
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Формат -> media type
+QR_FORMATS = {
+    "png": "image/png",
+    "png-1bit": "image/png",
+    "svg": "image/svg+xml",
+}
+
+MAX_BOX_SIZE = 40
+MAX_BORDER = 10
+
+
+def render_qr_image(json_data: str, options: Dict[str, Any]) -> Tuple[str, float]:
+    """Рендер QR в base64 (PNG или SVG) новым QRCode; возвращает (изображение, секунды рендера).
+
+    Функция модуля без общего состояния: выполняется в процессе или потоке пула рендера.
+    """
+    started = time.perf_counter()
+    
+    # version=None: make(fit=True) подбирает наименьшую версию, вмещающую данные
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=ERROR_CORRECTION_LEVELS[options["error_correction"]],
+        box_size=options["box_size"],
+        border=options["border"],
+    )
+    qr.add_data(json_data)
+    qr.make(fit=True)
+    
+    if options["format"] == "svg":
+        # Один <path> вместо прямоугольника на каждый модуль
+        content = qr.make_image(image_factory=SvgPathImage).to_string()
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffer = io.BytesIO()
+        if options["format"] == "png-1bit":
+            # Для термопринтеров: 1 бит на пиксель, сжатие с оптимизацией
+            img.get_image().convert("1").save(buffer, format='PNG', optimize=True)
+        else:
+            img.save(buffer, format='PNG')
+        content = buffer.getvalue()
+    
+    # Конвертируем в base64
+    img_str = base64.b64encode(content).decode()
+    
+    return img_str, time.perf_counter() - started
+
+
+class QRRenderPool:
+    """Пул рендера QR вне event loop.
+
+    qr_render_executor: "process" (по умолчанию) или "thread"; qr_render_workers - размер пула,
+    qr_render_concurrency - сколько рендеров одного процесса API могут быть в работе
+    одновременно, остальные ждут на семафоре, не занимая очередь пула.
+    """
+
+    def __init__(self, executor_kind: str, workers: int, concurrency: int):
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.concurrency = concurrency
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def render(self, json_data: str, options: Dict[str, Any]) -> Tuple[str, float]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), render_qr_image, json_data, options)
+
+    def shutdown(self) -> None:
+        """Остановка пула при завершении приложения"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        # Пул создается при первом рендере, а не при импорте (импорт идет и в процессах пула)
+        if self._executor is None:
+            if self.executor_kind == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qr-render")
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+
+qr_render_pool = QRRenderPool(
+    settings.qr_render_executor,
+    settings.qr_render_workers,
+    settings.qr_render_concurrency
+)
 
 
 class QRService:
     def __init__(self):
-        self.qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
+        # Параметры рендера по умолчанию
+        self.default_options = {
+            "format": "png",
+            "error_correction": "L",
+            "box_size": 10,
+            "border": 4
+        }
     
-    def generate_qr_code(self, data: Dict[str, Any]) -> str:
-        """Генерация QR кода и возврат base64 строки"""
-        import json
+    def render_options(
+        self,
+        format: Optional[str] = None,
+        box_size: Optional[int] = None,
+        border: Optional[int] = None,
+        error_correction: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Параметры рендера: значения по умолчанию с учетом переданных; входят в ключ кеша"""
+        options = dict(self.default_options)
+        for name, value in (
+            ("format", format),
+            ("box_size", box_size),
+            ("border", border),
+            ("error_correction", error_correction)
+        ):
+            if value is not None:
+                options[name] = value
         
-        # Конвертируем данные в JSON строку
-        json_data = json.dumps(data, ensure_ascii=False)
+        if options["format"] not in QR_FORMATS:
+            raise ValueError(f"Неизвестный формат QR: {options['format']}")
+        if options["error_correction"] not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Неизвестный уровень коррекции ошибок: {options['error_correction']}")
+        if not 1 <= options["box_size"] <= MAX_BOX_SIZE:
+            raise ValueError(f"Размер модуля должен быть от 1 до {MAX_BOX_SIZE}")
+        if not 0 <= options["border"] <= MAX_BORDER:
+            raise ValueError(f"Рамка должна быть от 0 до {MAX_BORDER}")
         
-        # Создаем QR код
-        self.qr.clear()
-        self.qr.add_data(json_data)
-        self.qr.make(fit=True)
-        
-        # Создаем изображение
-        img = self.qr.make_image(fill_color="black", back_color="white")
+        return options
+    
+    async def generate_qr_code(self, data: Union[Dict[str, Any], str], **options) -> str:
+        """Генерация QR кода и возврат base64 строки (одинаковые данные - из кеша).
+
+        data - dict (кодируется как JSON) или готовая строка (компактный код из qr_payload)
+
+        options - format ("png", "png-1bit", "svg"), box_size, border, error_correction ("L"/"M"/"Q"/"H")
+        """
+        render_options = self.render_options(**options)
+        key = cache_key(data, render_options)
+        img_str = await qr_image_cache.get(key)
+        if img_str is not None:
+            return img_str
         
-        # Конвертируем в base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        # Компактный JSON: меньше данных - меньше версия QR и быстрее рендер
+        if isinstance(data, str):
+            json_data = data
+        else:
+            json_data = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        img_str, encode_seconds = await qr_render_pool.render(json_data, render_options)
+        await qr_image_cache.put(key, img_str, encode_seconds)
         
         return img_str
     
-    def generate_qr_code_for_purchase(
+    async def generate_qr_image(self, data: Union[Dict[str, Any], str], **options) -> bytes:
+        """QR код в виде байтов изображения (для отдачи как файл)"""
+        return base64.b64decode(await self.generate_qr_code(data, **options))
+    
+    def media_type(self, **options) -> str:
+        return QR_FORMATS[self.render_options(**options)["format"]]
+    
+    def image_key(self, data: Union[Dict[str, Any], str], **options) -> str:
+        """Хеш данных и параметров рендера: одинаков для одинаковых изображений (для ETag)"""
+        return cache_key(data, self.render_options(**options))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Доля попаданий в кеш QR и время рендера"""
+        return qr_image_cache.stats()
+    
+    async def generate_qr_code_for_purchase(
         self, 
         business_id: str, 
         amount_usd: float, 
-        user_wallet: str
+        user_wallet: str,
+        timestamp: int
     ) -> str:
-        """Генерация QR кода для покупки"""
+        """Генерация QR кода для покупки.
+
+        timestamp - время создания покупки: повторный запрос того же QR дает те же данные и берется из кеша
+        """
         data = {
             "type": "purchase",
             "business_id": business_id,
             "amount_usd": amount_usd,
             "user_wallet": user_wallet,
-            "timestamp": int(__import__('time').time())
+            "timestamp": timestamp
         }
-        return self.generate_qr_code(data)
+        return await self.generate_qr_code(data)
     
-    def generate_qr_code_for_redemption(
+    async def generate_qr_code_for_redemption(
         self, 
         business_id: str, 
         discount_percentage: int, 
-        user_wallet: str
+        user_wallet: str,
+        timestamp: int
     ) -> str:
-        """Генерация QR кода для скидки"""
+        """Генерация QR кода для скидки (timestamp - время создания, как у покупки)"""
         data = {
             "type": "redemption",
             "business_id": business_id,
             "discount_percentage": discount_percentage,
             "user_wallet": user_wallet,
-            "timestamp": int(__import__('time').time())
+            "timestamp": timestamp
         }
-        return self.generate_qr_code(data)
+        return await self.generate_qr_code(data)
@@ -0,0 +1,164 @@
+import asyncio
+import csv
+import io
+import json
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.transaction import Receipt, Transaction
+from app.services.qr_payload import qr_payload_codec
+from app.services.qr_service import QRService
+
+
+MANIFEST_COLUMNS = [
+    "file",
+    "receipt_id",
+    "transaction_id",
+    "customer_wallet",
+    "amount_usd",
+    "expires_at",
+    "error"  # Не удалось отрендерить: изображение доступно через GET /receipts/{id}/qr.png
+]
+
+
+class _ZipChunks:
+    """Файл для zipfile без seek/tell: записанное забирается кусками через take()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ReceiptBundleService:
+    """Пакетное создание чеков для печати и выгрузка их QR-кодов одним ZIP"""
+
+    def __init__(self, qr_service: QRService):
+        self.qr_service = qr_service
+
+    def create_receipts(
+        self,
+        db: Session,
+        business_id: str,
+        items: Sequence[Any]
+    ) -> Tuple[List[Dict[str, Any]], datetime]:
+        """Чеки одной многострочной вставкой и одним коммитом.
+
+        items - объекты с transaction_id, customer_wallet, amount_usd; возвращает данные
+        QR-кодов (с подписанной строкой в qr_payload) в порядке items и срок действия чеков.
+        Все строки кодируются до вставки: QRPayloadError для недопустимых данных и ValueError,
+        если транзакция не найдена у бизнеса, - и ничего не записано.
+        """
+        transaction_ids = {item.transaction_id for item in items}
+        found = {
+            row.id for row in db.query(Transaction.id).filter(
+                Transaction.id.in_(transaction_ids),
+                Transaction.business_id == business_id
+            )
+        }
+        missing = transaction_ids - found
+        if missing:
+            raise ValueError(f"Транзакции не найдены: {', '.join(sorted(missing)[:10])}")
+
+        now = datetime.now()
+        expires_at = now + timedelta(days=settings.receipt_ttl_days)
+        qr_datas = []
+        rows = []
+        for item in items:
+            qr_data = {
+                "receipt_id": str(uuid.uuid4()),
+                "transaction_id": item.transaction_id,
+                "business_id": business_id,
+                "customer_wallet": item.customer_wallet,
+                "amount_usd": str(item.amount_usd),
+                "timestamp": int(now.timestamp()),
+                "type": "receipt_scan"
+            }
+            qr_datas.append({**qr_data, "qr_payload": qr_payload_codec.encode_receipt(qr_data)})
+            rows.append({
+                "id": qr_data["receipt_id"],
+                "transaction_id": item.transaction_id,
+                "business_id": business_id,
+                "customer_wallet": item.customer_wallet,
+                "amount_usd": item.amount_usd,
+                "qr_code_data": json.dumps(qr_data),
+                "is_scanned": False,
+                "expires_at": expires_at,
+                "created_at": now
+            })
+
+        db.execute(insert(Receipt).values(rows))
+        db.commit()
+
+        return qr_datas, expires_at
+
+    async def iter_zip(
+        self,
+        qr_datas: List[Dict[str, Any]],
+        expires_at: datetime,
+        **options
+    ) -> AsyncIterator[bytes]:
+        """ZIP с QR-кодами чеков (0001_<receipt_id>.png ...) и manifest.csv в порядке печати.
+
+        QR-коды рендерятся в пуле пачками по qr_render_concurrency; каждая готовая пачка
+        сразу уходит клиенту, поэтому память не зависит от размера выгрузки. Чеки к этому
+        моменту уже сохранены: если рендер отдельного кода не удался, архив все равно
+        завершается корректно, а строка manifest.csv без файла содержит ошибку.
+        """
+        extension = "svg" if options.get("format") == "svg" else "png"
+
+        output = _ZipChunks()
+        manifest = io.StringIO()
+        writer = csv.writer(manifest)
+        writer.writerow(MANIFEST_COLUMNS)
+
+        step = max(settings.qr_render_concurrency, 1)
+        with zipfile.ZipFile(output, "w") as archive:
+            for start in range(0, len(qr_datas), step):
+                chunk = qr_datas[start:start + step]
+                images = await asyncio.gather(*(
+                    self.qr_service.generate_qr_image(qr_data["qr_payload"], **options)
+                    for qr_data in chunk
+                ), return_exceptions=True)
+
+                for number, (qr_data, image) in enumerate(zip(chunk, images), start=start + 1):
+                    name = f"{number:04d}_{qr_data['receipt_id']}.{extension}"
+                    error = ""
+                    if isinstance(image, BaseException):
+                        print(f"Ошибка рендера QR чека {qr_data['receipt_id']}: {image}")
+                        name, error = "", str(image)
+                    else:
+                        # PNG уже сжат; SVG сжимается хорошо
+                        compression = zipfile.ZIP_DEFLATED if extension == "svg" else zipfile.ZIP_STORED
+                        archive.writestr(name, image, compress_type=compression)
+                    writer.writerow([
+                        name,
+                        qr_data["receipt_id"],
+                        qr_data["transaction_id"],
+                        qr_data["customer_wallet"],
+                        qr_data["amount_usd"],
+                        expires_at.isoformat(),
+                        error
+                    ])
+
+                yield output.take()
+
+            archive.writestr("manifest.csv", manifest.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+
+        yield output.take()
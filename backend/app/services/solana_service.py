@@ -2,6 +2,7 @@ from app.core.config import settings
 import asyncio
 import random
 import string
+from typing import Any, Dict, List, Tuple
 
 
 class SolanaService:
@@ -21,6 +22,15 @@ class SolanaService:
         await asyncio.sleep(0.2)  # Имитируем время обработки
         return f"mint_{''.join(random.choices(string.ascii_lowercase + string.digits, k=44))}"
 
+    async def mint_nfts_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Чеканка нескольких NFT одной отправкой в сеть (заглушка): адрес NFT на каждую пару (кошелек, метаданные)"""
+        # В MVP одна задержка на всю пачку вместо задержки на каждый NFT
+        await asyncio.sleep(0.3)  # Имитируем время чеканки
+        return [
+            f"nft_{''.join(random.choices(string.ascii_lowercase + string.digits, k=44))}"
+            for _ in items
+        ]
+
     async def burn_tokens_for_discount(self, user_wallet: str, amount: int) -> str:
         """Сжигание токенов для получения скидки (заглушка)"""
         # В MVP просто возвращаем поддельную подпись транзакции
@@ -37,4 +47,4 @@ class SolanaService:
         """Получение баланса SOL кошелька (заглушка)"""
         # В MVP возвращаем случайный баланс для демонстрации
         await asyncio.sleep(0.1)
-        return round(random.uniform(0.1, 5.0), 2)
\ No newline at end of file
+        return round(random.uniform(0.1, 5.0), 2)
\ No newline at end of file
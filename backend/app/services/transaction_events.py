@@ -0,0 +1,34 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.db.replicas import wallet_pin_key, business_pin_key
+from app.db.session import mark_written
+from app.models.transaction import Transaction
+from app.services.balance_service import BalanceService
+from app.services.analytics_service import AnalyticsService
+from app.services.wallet_stats_service import WalletStatsService
+
+
+balance_service = BalanceService()
+analytics_service = AnalyticsService()
+wallet_stats_service = WalletStatsService()
+
+
+def record_transaction(db: Session, transaction: Transaction, balance_applied: bool = False) -> None:
+    """Обновление производных данных по новой транзакции.
+
+    Вызывается сразу после db.add(transaction) и до db.commit(): баланс кошелька,
+    счетчики достижений и дневные агрегаты бизнеса фиксируются в той же DB-транзакции.
+    Из асинхронных эндпоинтов - через run_in_session.
+    balance_applied=True - баланс уже изменен (balance_service.try_spend).
+    После коммита чтения этого кошелька и бизнеса временно идут на primary.
+    created_at проставляется здесь, если не задан, и по нему же считается день агрегата.
+    """
+    # Время задается здесь, до первого запроса (autoflush): иначе строка получит func.now()
+    # с часов БД, а дневной агрегат - день по часам приложения
+    if transaction.created_at is None:
+        transaction.created_at = datetime.now()
+    if not balance_applied:
+        balance_service.apply_transaction(db, transaction)
+    wallet_stats_service.apply_transaction(db, transaction)
+    analytics_service.apply_transaction(db, transaction)
+    mark_written(db, wallet_pin_key(transaction.customer_wallet), business_pin_key(transaction.business_id))
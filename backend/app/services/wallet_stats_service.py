@@ -0,0 +1,214 @@
+import time
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import select, delete, exists, func, cast, literal, text, BigInteger
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.business import Business
+from app.models.transaction import Transaction
+from app.models.wallet_stats import WalletStats, CategoryBit
+from app.services.business_cache import business_cache
+from app.services.achievement_rules import WalletAggregates, MAX_CATEGORY_BITS
+
+
+EARN = "EARN"
+
+# Как часто перечитывать category_bits (новые категории из других процессов)
+CATEGORY_BITS_REFRESH_SECONDS = 30
+
+# Размер пачки при потоковом чтении wallet_stats
+AGGREGATES_BATCH_SIZE = 50000
+
+
+class WalletStatsService:
+    """Счетчики покупок кошелька: прогресс достижений за O(1) вместо агрегации истории"""
+
+    def __init__(self):
+        # Назначенные биты не меняются, поэтому кешируются на время жизни процесса
+        self._bits: Dict[str, int] = {}
+        self._bits_loaded_at = float("-inf")
+
+    def apply_transaction(self, db: Session, transaction: Transaction) -> None:
+        """Учет покупки в счетчиках (до db.commit(), в той же DB-транзакции)"""
+        if transaction.transaction_type != EARN:
+            return
+
+        mask = 0
+        if transaction.business_id:
+            business = business_cache.get_business(db, transaction.business_id, active_only=False)
+            if business is not None:
+                mask = self.category_mask(db, business.category)
+
+        stmt = insert(WalletStats).values(
+            wallet=transaction.customer_wallet,
+            earn_count=1,
+            spent_usd=Decimal(transaction.amount_usd or 0),
+            category_mask=mask,
+            version=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WalletStats.wallet],
+            set_={
+                "earn_count": WalletStats.earn_count + 1,
+                "spent_usd": WalletStats.spent_usd + stmt.excluded.spent_usd,
+                "category_mask": WalletStats.category_mask.op("|")(stmt.excluded.category_mask),
+                "version": WalletStats.version + 1,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def load_aggregates(self, db: Session, wallets: List[str]) -> WalletAggregates:
+        """Колоночные агрегаты указанных кошельков (кошелек без покупок - нули)"""
+        rows = {
+            row[0]: row for row in db.execute(
+                select(
+                    WalletStats.wallet,
+                    WalletStats.earn_count,
+                    WalletStats.spent_usd,
+                    WalletStats.category_mask
+                ).where(WalletStats.wallet.in_(wallets))
+            )
+        }
+        return WalletAggregates.from_rows([rows.get(wallet, (wallet, 0, 0, 0)) for wallet in wallets])
+
+    def iter_aggregates(self, db: Session, batch_size: int = AGGREGATES_BATCH_SIZE) -> Iterator[WalletAggregates]:
+        """Агрегаты всех кошельков с покупками пачками по batch_size (серверный курсор)"""
+        query = select(
+            WalletStats.wallet,
+            WalletStats.earn_count,
+            WalletStats.spent_usd,
+            WalletStats.category_mask
+        ).execution_options(yield_per=batch_size)
+
+        for partition in db.execute(query).partitions():
+            yield WalletAggregates.from_rows(partition)
+
+    def category_bits(self, db: Session) -> Dict[str, int]:
+        """Назначенные биты категорий; перечитываются не чаще CATEGORY_BITS_REFRESH_SECONDS"""
+        now = time.monotonic()
+        if now - self._bits_loaded_at > CATEGORY_BITS_REFRESH_SECONDS:
+            for category, bit in db.execute(select(CategoryBit.category, CategoryBit.bit)):
+                self._remember(category, bit)
+            self._bits_loaded_at = now
+
+        return dict(self._bits)
+
+    def category_mask(self, db: Session, category: str) -> int:
+        """Маска категории; бит назначается при первой встрече категории"""
+        bit = self._bits.get(category)
+
+        if bit is None:
+            bit = self._find_bit(db, category)
+
+            if bit is None:
+                bit = self._assign_bit(db, category)
+            else:
+                self._remember(category, bit)
+
+        if bit >= MAX_CATEGORY_BITS:
+            print(f"Категория {category} не помещается в category_mask (бит {bit})")
+            return 0
+
+        return 1 << bit
+
+    @staticmethod
+    def _find_bit(db: Session, category: str) -> Optional[int]:
+        return db.execute(select(CategoryBit.bit).where(CategoryBit.category == category)).scalar()
+
+    def _assign_bit(self, db: Session, category: str) -> int:
+        """Назначение следующего свободного бита.
+
+        При гонке двух новых категорий за один бит вставка проигравшей пропускается
+        (ON CONFLICT DO NOTHING) и повторяется со следующим битом. Назначенный здесь бит
+        не кешируется: DB-транзакция еще может откатиться.
+        """
+        for _ in range(MAX_CATEGORY_BITS):
+            db.execute(
+                insert(CategoryBit).from_select(
+                    [CategoryBit.category, CategoryBit.bit],
+                    select(literal(category), func.coalesce(func.max(CategoryBit.bit) + 1, 0))
+                ).on_conflict_do_nothing()
+            )
+            bit = self._find_bit(db, category)
+            if bit is not None:
+                return bit
+
+        raise RuntimeError(f"Не удалось назначить бит категории {category}")
+
+    def _remember(self, category: str, bit: int) -> None:
+        self._bits[category] = bit
+
+    def rebuild(self, db: Session, wallet: Optional[str] = None) -> int:
+        """Пересчет счетчиков из таблицы transactions (для всех кошельков или одного).
+
+        Возвращает количество пересчитанных кошельков. Коммит остается за вызывающим.
+        """
+        # Конкурентные apply_transaction ждут коммита пересчета и применяются поверх него
+        db.execute(text("LOCK TABLE wallet_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+        # Биты для категорий, которых еще нет в category_bits
+        db.execute(text("""
+            INSERT INTO category_bits (category, bit)
+            SELECT category,
+                   (SELECT coalesce(max(bit) + 1, 0) FROM category_bits) + row_number() OVER (ORDER BY category) - 1
+            FROM (SELECT DISTINCT category FROM businesses) AS missing
+            WHERE NOT EXISTS (SELECT 1 FROM category_bits WHERE category_bits.category = missing.category)
+            ON CONFLICT DO NOTHING
+        """))
+
+        mask = func.coalesce(
+            func.bit_or(cast(literal(1), BigInteger).op("<<")(CategoryBit.bit)), 0
+        )
+
+        source = select(
+            Transaction.customer_wallet,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(Transaction.amount_usd), 0),
+            mask,
+            literal(1)
+        ).select_from(Transaction).outerjoin(
+            Business, Business.id == Transaction.business_id
+        ).outerjoin(
+            CategoryBit,
+            (CategoryBit.category == Business.category) & (CategoryBit.bit < MAX_CATEGORY_BITS)
+        ).where(
+            Transaction.transaction_type == EARN
+        ).group_by(Transaction.customer_wallet)
+
+        # Кошельки, у которых больше нет покупок
+        stale = delete(WalletStats).where(
+            ~exists().where(
+                Transaction.customer_wallet == WalletStats.wallet,
+                Transaction.transaction_type == EARN
+            )
+        )
+
+        if wallet is not None:
+            source = source.where(Transaction.customer_wallet == wallet)
+            stale = stale.where(WalletStats.wallet == wallet)
+
+        stmt = insert(WalletStats).from_select(
+            [
+                WalletStats.wallet,
+                WalletStats.earn_count,
+                WalletStats.spent_usd,
+                WalletStats.category_mask,
+                WalletStats.version
+            ],
+            source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WalletStats.wallet],
+            set_={
+                "earn_count": stmt.excluded.earn_count,
+                "spent_usd": stmt.excluded.spent_usd,
+                "category_mask": stmt.excluded.category_mask,
+                "version": WalletStats.version + 1,
+                "updated_at": func.now()
+            }
+        )
+
+        db.execute(stale)
+        result = db.execute(stmt)
+        return result.rowcount
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Пересчет достижений (user_achievements) для всех кошельков после добавления
+или изменения достижения. Диапазоны кошельков обрабатываются пулом процессов;
+прерванное задание продолжается с невыполненных диапазонов (--job или --resume)
+"""
+import argparse
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.achievement_backfill import (
+    achievement_backfill_service, BACKFILL_CHUNK_SIZE, BACKFILL_WORKERS
+)
+
+
+def print_progress(job):
+    percent = job.done_chunks * 100 / job.total_chunks if job.total_chunks else 100
+    print(f"⏳ Диапазонов: {job.done_chunks}/{job.total_chunks} ({percent:.1f}%), записано строк: {job.rows_written}")
+
+
+def backfill_achievements(job_id=None, resume=False, achievement_ids=None, chunk_size=BACKFILL_CHUNK_SIZE, workers=BACKFILL_WORKERS):
+    """Создание (или выбор) задания и его выполнение"""
+    db = SessionLocal()
+    
+    try:
+        if job_id is None and resume:
+            job = achievement_backfill_service.latest_unfinished_job(db)
+            if job is None:
+                print("✅ Незавершенных заданий нет")
+                return
+            job_id = job.id
+            print(f"🔄 Продолжение задания {job_id}")
+        
+        if job_id is None:
+            job = achievement_backfill_service.create_job(db, achievement_ids, chunk_size)
+            db.commit()
+            job_id = job.id
+            print(f"🆕 Задание {job_id}: диапазонов {job.total_chunks}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка создания задания: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+    
+    try:
+        job = achievement_backfill_service.run_job(job_id, workers, print_progress)
+        print(f"✅ Задание {job_id} выполнено, записано строк: {job.rows_written}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка пересчета достижений (продолжить: --job {job_id}): {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет user_achievements для всех кошельков")
+    parser.add_argument("--job", help="Выполнить или продолжить задание с указанным id")
+    parser.add_argument("--resume", action="store_true", help="Продолжить последнее незавершенное задание")
+    parser.add_argument("--achievement", action="append", dest="achievement_ids",
+                        help="Пересчитать только это достижение (можно указать несколько раз)")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE, help="Кошельков в диапазоне")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Количество процессов")
+    args = parser.parse_args()
+    
+    backfill_achievements(args.job, args.resume, args.achievement_ids, args.chunk_size, args.workers)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Замер представлений коллекции: общий путь collection_service (каталог в памяти + битовая
+карта) против прежнего чтения всех NFT кошелька и пазлов из БД.
+Только чтение; запускается вручную на базе с данными
+"""
+import argparse
+import sys
+import os
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func
+
+from app.db.session import SessionLocal
+from app.models.nft import NFTPuzzle, UserNFT
+from app.services.collection_ownership import ALL_COLLECTION
+from app.services.collection_service import collection_service
+from app.services.nft_catalog import nft_catalog
+
+
+def rows_view(db, wallet, collection):
+    """Прежний путь: все NFT кошелька и активные пазлы из БД, разбор в Python"""
+    owned_ids = {
+        row.puzzle_id for row in db.query(UserNFT.puzzle_id).filter(UserNFT.user_wallet == wallet)
+    }
+    query = db.query(NFTPuzzle).filter(NFTPuzzle.is_active == True)
+    if collection != ALL_COLLECTION:
+        query = query.filter(NFTPuzzle.collection_id == collection)
+    puzzles = query.all()
+    missing = [puzzle for puzzle in puzzles if puzzle.id not in owned_ids]
+    return len(puzzles) - len(missing)
+
+
+def bitmap_view(db, wallet, collection):
+    return collection_service.get_view(db, wallet, collection=collection).owned_count
+
+
+def measure(fn, db, wallet, collection, iterations):
+    """Среднее время вызова в миллисекундах и результат (число собранных пазлов)"""
+    result = fn(db, wallet, collection)  # Прогрев: каталог, план запроса
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(db, wallet, collection)
+    return (time.perf_counter() - started) / iterations * 1000, result
+
+
+def benchmark_collection_views(wallet=None, iterations=500):
+    db = SessionLocal()
+    ok = True
+
+    try:
+        if wallet is None:
+            # Кошелек с наибольшим числом NFT
+            row = db.query(UserNFT.user_wallet).group_by(UserNFT.user_wallet).order_by(
+                func.count().desc()
+            ).first()
+            if row is None:
+                print("❌ Нет NFT ни у одного кошелька: укажите --wallet или заполните базу")
+                sys.exit(1)
+            wallet = row.user_wallet
+
+        collections = [ALL_COLLECTION] + [collection.id for collection in nft_catalog.get().collections]
+        print(f"Кошелек {wallet}, {iterations} итераций")
+
+        for collection in collections:
+            rows_ms, rows_owned = measure(rows_view, db, wallet, collection, iterations)
+            bitmap_ms, bitmap_owned = measure(bitmap_view, db, wallet, collection, iterations)
+            same = rows_owned == bitmap_owned
+            ok &= same
+            speedup = rows_ms / bitmap_ms if bitmap_ms > 0 else 0
+            print(
+                f"{'✅' if same else '❌'} {collection}: строки {rows_ms:.3f} мс, "
+                f"битовая карта {bitmap_ms:.3f} мс (x{speedup:.1f}), собрано {bitmap_owned}"
+                + ("" if same else f" (по строкам {rows_owned}: пересоберите карты rebuild_collection_ownership.py)")
+            )
+
+    except Exception as e:
+        print(f"❌ Ошибка замера: {e}")
+        ok = False
+    finally:
+        db.close()
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер представлений коллекции: битовая карта против строк user_nfts")
+    parser.add_argument("--wallet", help="Кошелек (по умолчанию - с наибольшим числом NFT)")
+    parser.add_argument("--iterations", type=int, default=500, help="Вызовов на каждый путь и коллекцию")
+    args = parser.parse_args()
+
+    benchmark_collection_views(args.wallet, args.iterations)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Нагрузочная проверка покупки NFT картинок (nft_purchase_service) параллельными покупателями.
+Запускается вручную на тестовой базе: создает временные кошельки bench_*, начисляет им токены,
+проверяет отсутствие двойных списаний и удаляет свои данные в конце
+"""
+import argparse
+import sys
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.balance import WalletBalance
+from app.models.nft import CollectionOwnership, UserNFT
+from app.models.transaction import Transaction
+from app.models.wallet_stats import WalletStats
+from app.services.nft_catalog import nft_catalog
+from app.services.nft_purchase import nft_purchase_service, PURCHASED
+from app.services.transaction_events import balance_service, record_transaction
+
+
+def fund_wallet(Session, wallet, tokens):
+    """Начисление токенов тестовому кошельку транзакцией EARN без бизнеса"""
+    db = Session()
+    try:
+        transaction = Transaction(
+            id=str(uuid.uuid4()),
+            customer_wallet=wallet,
+            business_id=None,
+            transaction_type="EARN",
+            amount_usd=Decimal("0.00"),
+            tokens_amount=tokens,
+            solana_signature=f"bench_{uuid.uuid4().hex[:16]}",
+            transaction_metadata={"benchmark": True}
+        )
+        db.add(transaction)
+        record_transaction(db, transaction)
+        db.commit()
+    finally:
+        db.close()
+
+
+def buy(Session, wallet, picture):
+    db = Session()
+    try:
+        return nft_purchase_service.purchase(db, wallet, picture).status
+    except Exception as e:
+        db.rollback()
+        return f"error: {e}"
+    finally:
+        db.close()
+
+
+def run_parallel(Session, buyers, jobs):
+    """Параллельные покупки; возвращает (счетчик результатов, секунды)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as executor:
+        statuses = list(executor.map(lambda job: buy(Session, *job), jobs))
+    return Counter(statuses), time.perf_counter() - started
+
+
+def check_wallet(Session, wallet, expected_nfts, expected_balance):
+    """Сверка: число NFT, материализованный баланс и баланс из transactions"""
+    db = Session()
+    try:
+        nfts = db.query(UserNFT).filter(UserNFT.user_wallet == wallet).count()
+        balance = balance_service.get_balance(db, wallet)["current_balance"]
+        ledger = sum(
+            t.tokens_amount if t.transaction_type == "EARN" else -t.tokens_amount
+            for t in db.query(Transaction).filter(Transaction.customer_wallet == wallet).all()
+        )
+        return nfts == expected_nfts and balance == expected_balance and ledger == balance
+    finally:
+        db.close()
+
+
+def cleanup(Session, wallets):
+    db = Session()
+    try:
+        db.query(UserNFT).filter(UserNFT.user_wallet.in_(wallets)).delete(synchronize_session=False)
+        db.query(CollectionOwnership).filter(CollectionOwnership.wallet.in_(wallets)).delete(synchronize_session=False)
+        db.query(Transaction).filter(Transaction.customer_wallet.in_(wallets)).delete(synchronize_session=False)
+        db.query(WalletBalance).filter(WalletBalance.wallet.in_(wallets)).delete(synchronize_session=False)
+        db.query(WalletStats).filter(WalletStats.wallet.in_(wallets)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def report(name, statuses, elapsed, ok):
+    throughput = sum(statuses.values()) / elapsed if elapsed > 0 else 0
+    print(f"{'✅' if ok else '❌'} {name}: {dict(statuses)} за {elapsed:.2f} с ({throughput:.0f} покупок/с)")
+    return ok
+
+
+def benchmark_nft_purchase(buyers):
+    """Три сценария с buyers параллельными покупателями"""
+    engine = create_engine(settings.database_url, pool_size=buyers, max_overflow=0, pool_pre_ping=True)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    try:
+        pictures = [picture for picture in nft_catalog.get().active if picture.price_tokens > 0]
+    finally:
+        db.close()
+
+    if not pictures:
+        print("❌ Нет картинок с ценой: сначала создайте коллекцию (POST /api/v1/nft-pictures/create-pictures)")
+        sys.exit(1)
+
+    run_id = uuid.uuid4().hex[:8]
+    wallets = []
+    ok = True
+
+    try:
+        # 1. Один кошелек, одна картинка, buyers одновременных нажатий: ровно одна покупка
+        picture = pictures[0]
+        wallet = f"bench_{run_id}_same"
+        wallets.append(wallet)
+        fund_wallet(Session, wallet, picture.price_tokens * buyers)
+        statuses, elapsed = run_parallel(Session, buyers, [(wallet, picture)] * buyers)
+        ok &= report(
+            "Один кошелек, одна картинка",
+            statuses,
+            elapsed,
+            statuses[PURCHASED] == 1
+            and check_wallet(Session, wallet, 1, picture.price_tokens * (buyers - 1))
+        )
+
+        # 2. Один кошелек, все картинки, токенов на две самые дешевые: ни одного ухода в минус
+        cheapest = sorted(picture.price_tokens for picture in pictures)
+        budget = sum(cheapest[:2])
+        wallet = f"bench_{run_id}_budget"
+        wallets.append(wallet)
+        fund_wallet(Session, wallet, budget)
+        jobs = [(wallet, pictures[i % len(pictures)]) for i in range(buyers)]
+        statuses, elapsed = run_parallel(Session, buyers, jobs)
+        db = Session()
+        try:
+            balance = balance_service.get_balance(db, wallet)["current_balance"]
+        finally:
+            db.close()
+        ok &= report(
+            "Один кошелек, ограниченный баланс",
+            statuses,
+            elapsed,
+            balance >= 0
+            and statuses[PURCHASED] >= 1
+            and check_wallet(Session, wallet, statuses[PURCHASED], balance)
+        )
+
+        # 3. buyers разных кошельков, каждый покупает одну картинку дважды: пропускная способность
+        buyer_wallets = [f"bench_{run_id}_{i}" for i in range(buyers)]
+        wallets.extend(buyer_wallets)
+        for buyer_wallet in buyer_wallets:
+            fund_wallet(Session, buyer_wallet, picture.price_tokens)
+        jobs = [(buyer_wallet, picture) for buyer_wallet in buyer_wallets] * 2
+        statuses, elapsed = run_parallel(Session, buyers, jobs)
+        ok &= report(
+            "Разные кошельки",
+            statuses,
+            elapsed,
+            statuses[PURCHASED] == buyers
+            and all(check_wallet(Session, buyer_wallet, 1, 0) for buyer_wallet in buyer_wallets)
+        )
+
+    except Exception as e:
+        print(f"❌ Ошибка нагрузочной проверки: {e}")
+        ok = False
+    finally:
+        cleanup(Session, wallets)
+        engine.dispose()
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Параллельные покупки NFT: пропускная способность и отсутствие двойных списаний")
+    parser.add_argument("--buyers", type=int, default=100, help="Число параллельных покупателей")
+    args = parser.parse_args()
+
+    benchmark_nft_purchase(args.buyers)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Обслуживание помесячных секций transactions и receipts:
+создание будущих секций и отсоединение старых в схему archive.
+Запускается периодически (например, раз в сутки по cron)
+"""
+import argparse
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.db.partitions import ensure_partitions, detach_old_partitions
+
+
+def maintain_partitions(months_ahead=3, receipts_retention=None, transactions_retention=None):
+    """Создание секций на months_ahead месяцев вперед и архивация старых"""
+    db = SessionLocal()
+    
+    try:
+        created = ensure_partitions(db, months_ahead=months_ahead)
+        
+        detached = []
+        if receipts_retention is not None:
+            detached += detach_old_partitions(db, "receipts", receipts_retention)
+        if transactions_retention is not None:
+            detached += detach_old_partitions(db, "transactions", transactions_retention)
+        
+        db.commit()
+        
+        print(f"✅ Создано секций: {len(created)} {created}")
+        print(f"✅ Перенесено в архив: {len(detached)} {detached}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка обслуживания секций: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Создание и архивация помесячных секций")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Сколько будущих месяцев держать созданными")
+    parser.add_argument("--receipts-retention-months", type=int, help="Архивировать секции receipts старше N месяцев")
+    parser.add_argument(
+        "--transactions-retention-months", type=int,
+        help="Архивировать секции transactions старше N месяцев (пересчет балансов и аналитики их уже не увидит)"
+    )
+    args = parser.parse_args()
+    
+    maintain_partitions(args.months_ahead, args.receipts_retention_months, args.transactions_retention_months)
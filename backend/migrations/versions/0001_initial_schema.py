@@ -0,0 +1,127 @@
+"""initial schema
+
+Схема, которую раньше создавал Base.metadata.create_all при старте.
+Существующие базы помечаются этой ревизией: alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=True, unique=True),
+        sa.Column("username", sa.String(), unique=True),
+        sa.Column("wallet_address", sa.String(), nullable=False, unique=True),
+        sa.Column("token_account", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "businesses",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("owner_wallet", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("tokens_per_dollar", sa.Integer()),
+        sa.Column("max_discount_percent", sa.Integer()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("customer_wallet", sa.String(), nullable=False),
+        sa.Column("business_id", sa.String(), sa.ForeignKey("businesses.id")),
+        sa.Column("transaction_type", sa.String(), nullable=False),
+        sa.Column("amount_usd", sa.Numeric(10, 2), nullable=False),
+        sa.Column("tokens_amount", sa.Integer(), nullable=False),
+        sa.Column("solana_signature", sa.String(), unique=True),
+        sa.Column("transaction_metadata", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "receipts",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("transaction_id", sa.String(), sa.ForeignKey("transactions.id"), nullable=False),
+        sa.Column("business_id", sa.String(), sa.ForeignKey("businesses.id"), nullable=False),
+        sa.Column("customer_wallet", sa.String(), nullable=False),
+        sa.Column("amount_usd", sa.Numeric(10, 2), nullable=False),
+        sa.Column("qr_code_data", sa.String(), nullable=False),
+        sa.Column("qr_code_image", sa.String(), nullable=True),
+        sa.Column("is_scanned", sa.Boolean()),
+        sa.Column("scanned_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "nft_puzzles",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("puzzle_name", sa.String(), nullable=False),
+        sa.Column("image_url", sa.String(), nullable=False),
+        sa.Column("position_x", sa.Integer(), nullable=False),
+        sa.Column("position_y", sa.Integer(), nullable=False),
+        sa.Column("rarity", sa.String(), nullable=False),
+        sa.Column("required_achievements", sa.JSON(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "user_nfts",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_wallet", sa.String(), nullable=False),
+        sa.Column("puzzle_id", sa.String(), sa.ForeignKey("nft_puzzles.id"), nullable=False),
+        sa.Column("nft_metadata", sa.JSON(), nullable=True),
+        sa.Column("minted_at", sa.DateTime()),
+        sa.Column("solana_signature", sa.String(), nullable=True, unique=True),
+    )
+
+    op.create_table(
+        "achievements",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("icon", sa.String(), nullable=True),
+        sa.Column("required_condition", sa.JSON(), nullable=False),
+        sa.Column("reward_puzzle_id", sa.String(), sa.ForeignKey("nft_puzzles.id"), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "user_achievements",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_wallet", sa.String(), sa.ForeignKey("users.wallet_address"), nullable=False),
+        sa.Column("achievement_id", sa.String(), sa.ForeignKey("achievements.id"), nullable=False),
+        sa.Column("completed_at", sa.DateTime()),
+        sa.Column("progress", sa.Integer()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_achievements")
+    op.drop_table("achievements")
+    op.drop_table("user_nfts")
+    op.drop_table("nft_puzzles")
+    op.drop_table("receipts")
+    op.drop_table("transactions")
+    op.drop_table("businesses")
+    op.drop_table("users")
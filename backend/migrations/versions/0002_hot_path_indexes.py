@@ -0,0 +1,79 @@
+"""hot path indexes
+
+Индексы для горячих фильтров: баланс и достижения кошелька, история чеков,
+коллекция кошелька, бизнесы владельца. Уникальные индексы на user_nfts и
+user_achievements создаются после удаления накопившихся дубликатов.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_transactions_wallet_type", "transactions", ["customer_wallet", "transaction_type"])
+    op.create_index("ix_transactions_business_created", "transactions", ["business_id", "created_at"])
+    # Агрегаты достижений (количество и сумма покупок) читаются только из индекса
+    op.create_index(
+        "ix_transactions_wallet_earn", "transactions", ["customer_wallet"],
+        postgresql_where=sa.text("transaction_type = 'EARN'"),
+        postgresql_include=["amount_usd", "business_id"]
+    )
+
+    op.create_index("ix_receipts_wallet_created", "receipts", ["customer_wallet", "created_at"])
+    op.create_index("ix_receipts_business_created", "receipts", ["business_id", "created_at"])
+    op.create_index(
+        "ix_receipts_pending_expires", "receipts", ["expires_at"],
+        postgresql_where=sa.text("NOT is_scanned")
+    )
+
+    op.create_index("ix_businesses_owner_wallet", "businesses", ["owner_wallet"])
+    op.create_index(
+        "ix_businesses_active_category", "businesses", ["category"],
+        postgresql_where=sa.text("is_active")
+    )
+
+    # Оставляем самую раннюю запись для каждой пары (кошелек, пазл)
+    op.execute("""
+        DELETE FROM user_nfts u
+        USING user_nfts d
+        WHERE u.user_wallet = d.user_wallet
+          AND u.puzzle_id = d.puzzle_id
+          AND (coalesce(u.minted_at, 'epoch'), u.id) > (coalesce(d.minted_at, 'epoch'), d.id)
+    """)
+    op.create_index("uq_user_nfts_wallet_puzzle", "user_nfts", ["user_wallet", "puzzle_id"], unique=True)
+
+    # Для достижений сохраняем запись с наибольшим прогрессом
+    op.execute("""
+        DELETE FROM user_achievements u
+        USING user_achievements d
+        WHERE u.user_wallet = d.user_wallet
+          AND u.achievement_id = d.achievement_id
+          AND (coalesce(u.progress, 0) < coalesce(d.progress, 0)
+               OR (coalesce(u.progress, 0) = coalesce(d.progress, 0) AND u.id > d.id))
+    """)
+    op.create_index(
+        "uq_user_achievements_wallet_achievement", "user_achievements",
+        ["user_wallet", "achievement_id"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_user_achievements_wallet_achievement", table_name="user_achievements")
+    op.drop_index("uq_user_nfts_wallet_puzzle", table_name="user_nfts")
+    op.drop_index("ix_businesses_active_category", table_name="businesses")
+    op.drop_index("ix_businesses_owner_wallet", table_name="businesses")
+    op.drop_index("ix_receipts_pending_expires", table_name="receipts")
+    op.drop_index("ix_receipts_business_created", table_name="receipts")
+    op.drop_index("ix_receipts_wallet_created", table_name="receipts")
+    op.drop_index("ix_transactions_wallet_earn", table_name="transactions")
+    op.drop_index("ix_transactions_business_created", table_name="transactions")
+    op.drop_index("ix_transactions_wallet_type", table_name="transactions")
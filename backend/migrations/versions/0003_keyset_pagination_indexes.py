@@ -0,0 +1,56 @@
+"""keyset pagination indexes
+
+Индексы под keyset-пагинацию списков по (created_at, id): история транзакций
+и чеков кошелька/бизнеса и каталог активных бизнесов.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_transactions_business_created", table_name="transactions")
+    op.create_index("ix_transactions_business_created", "transactions", ["business_id", "created_at", "id"])
+    op.create_index("ix_transactions_wallet_created", "transactions", ["customer_wallet", "created_at", "id"])
+
+    op.drop_index("ix_receipts_wallet_created", table_name="receipts")
+    op.drop_index("ix_receipts_business_created", table_name="receipts")
+    op.create_index("ix_receipts_wallet_created", "receipts", ["customer_wallet", "created_at", "id"])
+    op.create_index("ix_receipts_business_created", "receipts", ["business_id", "created_at", "id"])
+
+    op.drop_index("ix_businesses_active_category", table_name="businesses")
+    op.create_index(
+        "ix_businesses_active_category", "businesses", ["category", "created_at", "id"],
+        postgresql_where=sa.text("is_active")
+    )
+    op.create_index(
+        "ix_businesses_active_created", "businesses", ["created_at", "id"],
+        postgresql_where=sa.text("is_active")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_businesses_active_created", table_name="businesses")
+    op.drop_index("ix_businesses_active_category", table_name="businesses")
+    op.create_index(
+        "ix_businesses_active_category", "businesses", ["category"],
+        postgresql_where=sa.text("is_active")
+    )
+
+    op.drop_index("ix_receipts_business_created", table_name="receipts")
+    op.drop_index("ix_receipts_wallet_created", table_name="receipts")
+    op.create_index("ix_receipts_wallet_created", "receipts", ["customer_wallet", "created_at"])
+    op.create_index("ix_receipts_business_created", "receipts", ["business_id", "created_at"])
+
+    op.drop_index("ix_transactions_wallet_created", table_name="transactions")
+    op.drop_index("ix_transactions_business_created", table_name="transactions")
+    op.create_index("ix_transactions_business_created", "transactions", ["business_id", "created_at"])
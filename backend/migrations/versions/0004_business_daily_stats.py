@@ -0,0 +1,75 @@
+"""business daily stats
+
+Дневные агрегаты по бизнесу и дневные списки клиентов для аналитики.
+Таблицы заполняются из существующих транзакций.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "business_daily_stats",
+        sa.Column("business_id", sa.String(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("tokens_issued", sa.Integer(), nullable=False),
+        sa.Column("tokens_redeemed", sa.Integer(), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.Column("distinct_customers", sa.Integer(), nullable=False),
+        sa.Column("volume_usd", sa.Numeric(14, 2), nullable=False),
+        sa.Column("redeemed_usd", sa.Numeric(14, 2), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.create_table(
+        "business_daily_customers",
+        sa.Column("business_id", sa.String(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("customer_wallet", sa.String(), primary_key=True),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+    )
+
+    op.execute("""
+        INSERT INTO business_daily_customers (business_id, day, customer_wallet, transaction_count)
+        SELECT business_id, created_at::date, customer_wallet, count(*)
+        FROM transactions
+        WHERE business_id IS NOT NULL AND created_at IS NOT NULL
+          AND transaction_type IN ('EARN', 'REDEEM')
+        GROUP BY business_id, created_at::date, customer_wallet
+    """)
+
+    op.execute("""
+        INSERT INTO business_daily_stats (
+            business_id, day, tokens_issued, tokens_redeemed, transaction_count,
+            distinct_customers, volume_usd, redeemed_usd, updated_at
+        )
+        SELECT
+            business_id,
+            created_at::date,
+            coalesce(sum(tokens_amount) FILTER (WHERE transaction_type = 'EARN'), 0),
+            coalesce(sum(tokens_amount) FILTER (WHERE transaction_type = 'REDEEM'), 0),
+            count(*),
+            count(DISTINCT customer_wallet),
+            coalesce(sum(amount_usd) FILTER (WHERE transaction_type = 'EARN'), 0),
+            coalesce(sum(amount_usd) FILTER (WHERE transaction_type = 'REDEEM'), 0),
+            now()
+        FROM transactions
+        WHERE business_id IS NOT NULL AND created_at IS NOT NULL
+          AND transaction_type IN ('EARN', 'REDEEM')
+        GROUP BY business_id, created_at::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("business_daily_customers")
+    op.drop_table("business_daily_stats")
@@ -0,0 +1,163 @@
+"""monthly partitions
+
+transactions и receipts пересоздаются как секционированные по месяцам (RANGE по created_at).
+created_at входит в первичный ключ, внешний ключ receipts.transaction_id удален,
+уникальность solana_signature заменена обычным индексом. Данные переносятся в секции.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+# Сколько будущих месяцев создать сразу (дальше - maintain_partitions.py)
+MONTHS_AHEAD = 3
+
+TRANSACTION_COLUMNS = [
+    "id", "customer_wallet", "business_id", "transaction_type", "amount_usd",
+    "tokens_amount", "solana_signature", "transaction_metadata", "created_at"
+]
+
+RECEIPT_COLUMNS = [
+    "id", "transaction_id", "business_id", "customer_wallet", "amount_usd", "qr_code_data",
+    "qr_code_image", "is_scanned", "scanned_at", "expires_at", "created_at"
+]
+
+COMMON_INDEXES = {
+    "transactions": [
+        ("ix_transactions_wallet_type", ["customer_wallet", "transaction_type"], {}),
+        ("ix_transactions_wallet_created", ["customer_wallet", "created_at", "id"], {}),
+        ("ix_transactions_business_created", ["business_id", "created_at", "id"], {}),
+        ("ix_transactions_wallet_earn", ["customer_wallet"], {
+            "postgresql_where": sa.text("transaction_type = 'EARN'"),
+            "postgresql_include": ["amount_usd", "business_id"]
+        }),
+    ],
+    "receipts": [
+        ("ix_receipts_wallet_created", ["customer_wallet", "created_at", "id"], {}),
+        ("ix_receipts_business_created", ["business_id", "created_at", "id"], {}),
+        ("ix_receipts_pending_expires", ["expires_at"], {
+            "postgresql_where": sa.text("NOT is_scanned")
+        }),
+    ],
+}
+
+PARTITIONED_INDEXES = {
+    "transactions": [("ix_transactions_signature", ["solana_signature"], {})],
+    "receipts": [],
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _transactions_table(partitioned: bool) -> list:
+    return [
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("customer_wallet", sa.String(), nullable=False),
+        sa.Column("business_id", sa.String(), sa.ForeignKey("businesses.id")),
+        sa.Column("transaction_type", sa.String(), nullable=False),
+        sa.Column("amount_usd", sa.Numeric(10, 2), nullable=False),
+        sa.Column("tokens_amount", sa.Integer(), nullable=False),
+        sa.Column("solana_signature", sa.String(), unique=not partitioned),
+        sa.Column("transaction_metadata", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=not partitioned),
+        sa.PrimaryKeyConstraint(
+            *(("id", "created_at") if partitioned else ("id",)), name="transactions_pkey"
+        ),
+    ]
+
+
+def _receipts_table(partitioned: bool) -> list:
+    columns = [
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("transaction_id", sa.String(), nullable=False),
+        sa.Column("business_id", sa.String(), sa.ForeignKey("businesses.id"), nullable=False),
+        sa.Column("customer_wallet", sa.String(), nullable=False),
+        sa.Column("amount_usd", sa.Numeric(10, 2), nullable=False),
+        sa.Column("qr_code_data", sa.String(), nullable=False),
+        sa.Column("qr_code_image", sa.String(), nullable=True),
+        sa.Column("is_scanned", sa.Boolean()),
+        sa.Column("scanned_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=not partitioned),
+        sa.PrimaryKeyConstraint(
+            *(("id", "created_at") if partitioned else ("id",)), name="receipts_pkey"
+        ),
+    ]
+    if not partitioned:
+        columns.append(sa.ForeignKeyConstraint(["transaction_id"], ["transactions.id"]))
+    return columns
+
+
+def _create_month_partitions(table: str, source: str) -> None:
+    """Секции за все месяцы с данными и MONTHS_AHEAD месяцев вперед"""
+    first, last = op.get_bind().execute(
+        sa.text(f"SELECT min(created_at), max(created_at) FROM {source}")
+    ).one()
+
+    current = date.today().replace(day=1)
+    month = min(first.date().replace(day=1), current) if first else current
+    end = max(last.date().replace(day=1), current) if last else current
+    end = _add_months(end, MONTHS_AHEAD)
+
+    while month <= end:
+        op.execute(
+            f"CREATE TABLE {table}_y{month.year:04d}m{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+
+def _recreate_table(name: str, columns: list, table_args: list, partitioned: bool) -> None:
+    """Пересоздание таблицы с переносом данных через name_legacy"""
+    legacy = f"{name}_legacy"
+    if partitioned:
+        old_indexes, new_indexes = COMMON_INDEXES[name], COMMON_INDEXES[name] + PARTITIONED_INDEXES[name]
+    else:
+        old_indexes, new_indexes = COMMON_INDEXES[name] + PARTITIONED_INDEXES[name], COMMON_INDEXES[name]
+
+    op.rename_table(name, legacy)
+    op.execute(f"ALTER INDEX {name}_pkey RENAME TO {legacy}_pkey")
+    for index_name, _, _ in old_indexes:
+        op.drop_index(index_name, table_name=legacy)
+
+    if partitioned:
+        op.create_table(name, *table_args, postgresql_partition_by="RANGE (created_at)")
+        _create_month_partitions(name, legacy)
+    else:
+        op.create_table(name, *table_args)
+
+    select = ", ".join(
+        "coalesce(created_at, now())" if column == "created_at" else column
+        for column in columns
+    )
+    op.execute(f"INSERT INTO {name} ({', '.join(columns)}) SELECT {select} FROM {legacy}")
+    op.drop_table(legacy)
+
+    for index_name, index_columns, kwargs in new_indexes:
+        op.create_index(index_name, name, index_columns, **kwargs)
+
+
+def upgrade() -> None:
+    op.drop_constraint("receipts_transaction_id_fkey", "receipts", type_="foreignkey")
+    _recreate_table("transactions", TRANSACTION_COLUMNS, _transactions_table(True), True)
+    _recreate_table("receipts", RECEIPT_COLUMNS, _receipts_table(True), True)
+
+
+def downgrade() -> None:
+    # Архивные секции (схема archive) обратно не присоединяются
+    _recreate_table("transactions", TRANSACTION_COLUMNS, _transactions_table(False), False)
+    _recreate_table("receipts", RECEIPT_COLUMNS, _receipts_table(False), False)
@@ -0,0 +1,62 @@
+"""wallet stats
+
+Счетчики покупок кошелька (wallet_stats) и биты категорий бизнеса (category_bits)
+для инкрементального прогресса достижений. Заполняются из существующих транзакций.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_bits",
+        sa.Column("category", sa.String(), primary_key=True),
+        sa.Column("bit", sa.Integer(), nullable=False, unique=True),
+    )
+
+    op.create_table(
+        "wallet_stats",
+        sa.Column("wallet", sa.String(), primary_key=True),
+        sa.Column("earn_count", sa.Integer(), nullable=False),
+        sa.Column("spent_usd", sa.Numeric(14, 2), nullable=False),
+        sa.Column("category_mask", sa.BigInteger(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.execute("""
+        INSERT INTO category_bits (category, bit)
+        SELECT category, row_number() OVER (ORDER BY category) - 1
+        FROM (SELECT DISTINCT category FROM businesses) AS categories
+    """)
+
+    op.execute("""
+        INSERT INTO wallet_stats (wallet, earn_count, spent_usd, category_mask, version, updated_at)
+        SELECT
+            t.customer_wallet,
+            count(*),
+            coalesce(sum(t.amount_usd), 0),
+            coalesce(bit_or(1::bigint << cb.bit), 0),
+            1,
+            now()
+        FROM transactions t
+        LEFT JOIN businesses b ON b.id = t.business_id
+        LEFT JOIN category_bits cb ON cb.category = b.category AND cb.bit < 63
+        WHERE t.transaction_type = 'EARN'
+        GROUP BY t.customer_wallet
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("wallet_stats")
+    op.drop_table("category_bits")
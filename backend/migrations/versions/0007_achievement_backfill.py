@@ -0,0 +1,56 @@
+"""achievement backfill
+
+Задания пересчета достижений (achievement_backfill_jobs) и их диапазоны кошельков
+(achievement_backfill_chunks) для возобновления после сбоя.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "achievement_backfill_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("achievement_ids", sa.JSON(), nullable=True),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("total_chunks", sa.Integer(), nullable=False),
+        sa.Column("done_chunks", sa.Integer(), nullable=False),
+        sa.Column("rows_written", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "achievement_backfill_chunks",
+        sa.Column(
+            "job_id",
+            sa.String(),
+            sa.ForeignKey("achievement_backfill_jobs.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("chunk_no", sa.Integer(), primary_key=True),
+        sa.Column("wallet_from", sa.String(), nullable=True),
+        sa.Column("wallet_to", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("rows_written", sa.Integer(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("achievement_backfill_chunks")
+    op.drop_table("achievement_backfill_jobs")
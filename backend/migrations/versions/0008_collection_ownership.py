@@ -0,0 +1,91 @@
+"""collection ownership
+
+Номер бита пазла (nft_puzzles.slot) и битовые карты полученных пазлов по кошельку
+и коллекции (collection_ownership). Карты коллекции "all" заполняются из user_nfts.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE nft_puzzles_slot_seq MINVALUE 0 START 0")
+    op.add_column("nft_puzzles", sa.Column("slot", sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE nft_puzzles
+        SET slot = numbered.slot
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY created_at, id) - 1 AS slot
+            FROM nft_puzzles
+        ) AS numbered
+        WHERE nft_puzzles.id = numbered.id
+    """)
+    op.execute("""
+        SELECT setval('nft_puzzles_slot_seq', coalesce((SELECT max(slot) + 1 FROM nft_puzzles), 0), false)
+    """)
+    op.execute("ALTER SEQUENCE nft_puzzles_slot_seq OWNED BY nft_puzzles.slot")
+    op.alter_column(
+        "nft_puzzles",
+        "slot",
+        nullable=False,
+        server_default=sa.text("nextval('nft_puzzles_slot_seq')"),
+    )
+    op.create_unique_constraint("uq_nft_puzzles_slot", "nft_puzzles", ["slot"])
+
+    op.create_table(
+        "collection_ownership",
+        sa.Column("wallet", sa.String(), primary_key=True),
+        sa.Column("collection", sa.String(), primary_key=True),
+        sa.Column("bitmap", sa.LargeBinary(), nullable=False),
+        sa.Column("owned_count", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index(
+        "ix_collection_ownership_collection_count",
+        "collection_ownership",
+        ["collection", "owned_count"],
+    )
+
+    # Байт карты - bit_or битов его пазлов; отсутствующие байты до последнего - нули
+    op.execute("""
+        WITH bytes AS (
+            SELECT n.user_wallet AS wallet, p.slot / 8 AS byte_no, bit_or(1 << (p.slot % 8)) AS byte_value
+            FROM user_nfts n
+            JOIN nft_puzzles p ON p.id = n.puzzle_id
+            GROUP BY n.user_wallet, p.slot / 8
+        ),
+        sizes AS (
+            SELECT wallet, max(byte_no) AS last_byte FROM bytes GROUP BY wallet
+        )
+        INSERT INTO collection_ownership (wallet, collection, bitmap, owned_count, version, updated_at)
+        SELECT
+            s.wallet,
+            'all',
+            decode(string_agg(lpad(to_hex(coalesce(b.byte_value, 0)), 2, '0'), '' ORDER BY g.byte_no), 'hex'),
+            0,
+            1,
+            now()
+        FROM sizes s
+        CROSS JOIN LATERAL generate_series(0, s.last_byte) AS g(byte_no)
+        LEFT JOIN bytes b ON b.wallet = s.wallet AND b.byte_no = g.byte_no
+        GROUP BY s.wallet
+    """)
+    op.execute("UPDATE collection_ownership SET owned_count = bit_count(bitmap)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_collection_ownership_collection_count", table_name="collection_ownership")
+    op.drop_table("collection_ownership")
+    op.drop_constraint("uq_nft_puzzles_slot", "nft_puzzles", type_="unique")
+    op.drop_column("nft_puzzles", "slot")
+    op.execute("DROP SEQUENCE IF EXISTS nft_puzzles_slot_seq")
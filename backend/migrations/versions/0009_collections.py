@@ -0,0 +1,92 @@
+"""collections
+
+Коллекции пазлов (collections) и индексированная ссылка nft_puzzles.collection_id вместо
+выборки пазлов по префиксу puzzle_name. Существующие пазлы распределяются по префиксам,
+карты collection_ownership по коллекциям заполняются из user_nfts.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "collections",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("business_id", sa.String(), sa.ForeignKey("businesses.id"), nullable=True),
+        sa.Column("grid_width", sa.Integer(), nullable=False),
+        sa.Column("grid_height", sa.Integer(), nullable=False),
+        sa.Column("completion_reward", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.execute("""
+        INSERT INTO collections (id, name, grid_width, grid_height, completion_reward, is_active, created_at)
+        VALUES
+            ('espresso_day', 'ESPRESSO DAY', 3, 3,
+             'Бесплатный кофе в любой кофейне партнера', true, now()),
+            ('coffee_shop', 'Коллекция кофейни', 3, 3,
+             'Бесплатный напиток в кофейне', true, now())
+    """)
+
+    op.add_column(
+        "nft_puzzles",
+        sa.Column("collection_id", sa.String(), sa.ForeignKey("collections.id"), nullable=True),
+    )
+    op.create_index("ix_nft_puzzles_collection_id", "nft_puzzles", ["collection_id"])
+
+    # Последняя выборка по префиксам: espresso_day_* - отдельная коллекция
+    op.execute("""
+        UPDATE nft_puzzles
+        SET collection_id = CASE
+            WHEN puzzle_name LIKE 'espresso\\_day\\_%' THEN 'espresso_day'
+            WHEN puzzle_name LIKE 'coffee\\_%'
+              OR puzzle_name LIKE 'espresso\\_%'
+              OR puzzle_name LIKE 'latte\\_%' THEN 'coffee_shop'
+        END
+    """)
+
+    # Карты по коллекциям, как у коллекции "all" в 0008
+    op.execute("""
+        WITH bytes AS (
+            SELECT n.user_wallet AS wallet, p.collection_id AS collection, p.slot / 8 AS byte_no,
+                   bit_or(1 << (p.slot % 8)) AS byte_value
+            FROM user_nfts n
+            JOIN nft_puzzles p ON p.id = n.puzzle_id
+            WHERE p.collection_id IS NOT NULL
+            GROUP BY n.user_wallet, p.collection_id, p.slot / 8
+        ),
+        sizes AS (
+            SELECT wallet, collection, max(byte_no) AS last_byte FROM bytes GROUP BY wallet, collection
+        )
+        INSERT INTO collection_ownership (wallet, collection, bitmap, owned_count, version, updated_at)
+        SELECT
+            s.wallet,
+            s.collection,
+            decode(string_agg(lpad(to_hex(coalesce(b.byte_value, 0)), 2, '0'), '' ORDER BY g.byte_no), 'hex'),
+            0,
+            1,
+            now()
+        FROM sizes s
+        CROSS JOIN LATERAL generate_series(0, s.last_byte) AS g(byte_no)
+        LEFT JOIN bytes b ON b.wallet = s.wallet AND b.collection = s.collection AND b.byte_no = g.byte_no
+        GROUP BY s.wallet, s.collection
+    """)
+    op.execute("UPDATE collection_ownership SET owned_count = bit_count(bitmap) WHERE collection <> 'all'")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM collection_ownership WHERE collection <> 'all'")
+    op.drop_index("ix_nft_puzzles_collection_id", table_name="nft_puzzles")
+    op.drop_column("nft_puzzles", "collection_id")
+    op.drop_table("collections")
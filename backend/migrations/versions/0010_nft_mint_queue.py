@@ -0,0 +1,42 @@
+"""nft mint queue
+
+Статус чеканки NFT (user_nfts.mint_status): новые NFT из сканирования чеков записываются
+со статусом "pending" и чеканятся фоновыми воркерами. Существующие NFT уже отчеканены.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_nfts",
+        sa.Column("mint_status", sa.String(), nullable=False, server_default="minted"),
+    )
+    op.add_column(
+        "user_nfts",
+        sa.Column("mint_attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("user_nfts", sa.Column("mint_error", sa.String(), nullable=True))
+    op.create_index(
+        "ix_user_nfts_mint_pending",
+        "user_nfts",
+        ["minted_at"],
+        postgresql_where=sa.text("mint_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_nfts_mint_pending", table_name="user_nfts")
+    op.drop_column("user_nfts", "mint_error")
+    op.drop_column("user_nfts", "mint_attempts")
+    op.drop_column("user_nfts", "mint_status")
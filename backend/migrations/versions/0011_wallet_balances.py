@@ -0,0 +1,61 @@
+"""wallet balances
+
+Материализованные балансы кошельков (wallet_balances), заполняются из существующих
+транзакций. Раньше таблица создавалась в 0001, поэтому в базах, уже прошедших ту
+версию 0001, она не пересоздается.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("wallet_balances"):
+        return
+
+    op.create_table(
+        "wallet_balances",
+        sa.Column("wallet", sa.String(), primary_key=True),
+        sa.Column("total_earned", sa.Integer(), nullable=False),
+        sa.Column("total_spent", sa.Integer(), nullable=False),
+        sa.Column("current_balance", sa.Integer(), nullable=False),
+        sa.Column("transactions_count", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    op.execute("""
+        INSERT INTO wallet_balances
+            (wallet, total_earned, total_spent, current_balance, transactions_count, version, updated_at)
+        SELECT
+            customer_wallet,
+            earned,
+            spent,
+            earned - spent,
+            transactions_count,
+            1,
+            now()
+        FROM (
+            SELECT
+                customer_wallet,
+                coalesce(sum(tokens_amount) FILTER (WHERE transaction_type = 'EARN'), 0) AS earned,
+                coalesce(sum(tokens_amount) FILTER (WHERE transaction_type = 'REDEEM'), 0) AS spent,
+                count(*) AS transactions_count
+            FROM transactions
+            WHERE transaction_type IN ('EARN', 'REDEEM')
+            GROUP BY customer_wallet
+        ) AS totals
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("wallet_balances")
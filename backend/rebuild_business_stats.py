@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Догоняющий пересчет дневных агрегатов бизнеса (business_daily_stats) из transactions.
+Запускается периодически (например, раз в сутки по cron)
+"""
+import argparse
+import sys
+import os
+from datetime import date, timedelta
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.analytics_service import AnalyticsService
+
+
+def rebuild_business_stats(since=None):
+    """Пересчет агрегатов начиная с даты since (по умолчанию - за все время)"""
+    db = SessionLocal()
+    
+    try:
+        rebuilt = AnalyticsService().rebuild(db, since)
+        db.commit()
+        
+        print(f"✅ Пересчитано дневных агрегатов: {rebuilt}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка пересчета агрегатов: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет business_daily_stats из transactions")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--since", type=date.fromisoformat, help="Пересчитать начиная с даты (YYYY-MM-DD)")
+    group.add_argument("--days", type=int, help="Пересчитать последние N дней")
+    args = parser.parse_args()
+    
+    since = args.since
+    if args.days:
+        since = date.today() - timedelta(days=args.days - 1)
+    
+    rebuild_business_stats(since)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Пересчет битовых карт коллекций (collection_ownership) из таблицы user_nfts.
+Запускается после ручных правок user_nfts или при подозрении на расхождение
+"""
+import argparse
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.collection_ownership import collection_ownership_service
+
+
+def rebuild_collection_ownership(wallet=None):
+    """Пересчет карт всех кошельков или одного кошелька"""
+    db = SessionLocal()
+    
+    try:
+        rebuilt = collection_ownership_service.rebuild(db, wallet)
+        db.commit()
+        
+        print(f"✅ Пересчитано карт коллекций: {rebuilt}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка пересчета карт коллекций: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет collection_ownership из user_nfts")
+    parser.add_argument("--wallet", help="Пересчитать только указанный кошелек")
+    args = parser.parse_args()
+    
+    rebuild_collection_ownership(args.wallet)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Пересчет материализованных балансов (wallet_balances) из таблицы transactions
+"""
+import argparse
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.balance_service import BalanceService
+
+
+def rebuild_wallet_balances(wallet=None):
+    """Пересчет балансов всех кошельков или одного кошелька"""
+    db = SessionLocal()
+    
+    try:
+        rebuilt = BalanceService().rebuild(db, wallet)
+        db.commit()
+        
+        print(f"✅ Пересчитано балансов: {rebuilt}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка пересчета балансов: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет wallet_balances из transactions")
+    parser.add_argument("--wallet", help="Пересчитать только указанный кошелек")
+    args = parser.parse_args()
+    
+    rebuild_wallet_balances(args.wallet)
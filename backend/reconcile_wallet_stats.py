@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Сверка счетчиков достижений (wallet_stats) с таблицей transactions.
+Запускается периодически (например, раз в сутки по cron) или после ручных правок транзакций
+"""
+import argparse
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.wallet_stats_service import WalletStatsService
+
+
+def reconcile_wallet_stats(wallet=None):
+    """Пересчет счетчиков всех кошельков или одного кошелька"""
+    db = SessionLocal()
+    
+    try:
+        rebuilt = WalletStatsService().rebuild(db, wallet)
+        db.commit()
+        
+        print(f"✅ Пересчитано счетчиков: {rebuilt}")
+        
+    except Exception as e:
+        print(f"❌ Ошибка пересчета счетчиков: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет wallet_stats из transactions")
+    parser.add_argument("--wallet", help="Пересчитать только указанный кошелек")
+    args = parser.parse_args()
+    
+    reconcile_wallet_stats(args.wallet)
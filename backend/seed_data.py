@@ -13,6 +13,10 @@ from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.business import Business
 from app.models.transaction import Transaction
+from app.services.balance_service import BalanceService
+from app.services.analytics_service import AnalyticsService
+from app.services.wallet_stats_service import WalletStatsService
+from app.db.partitions import ensure_partitions
 from decimal import Decimal
 import uuid
 from datetime import datetime, timedelta
@@ -103,6 +107,9 @@ def create_demo_data():
         created_users = db.query(User).all()
         created_businesses = db.query(Business).all()
         
+        # Демо-транзакции датированы до 30 дней назад: нужна секция прошлого месяца
+        ensure_partitions(db, months_back=1)
+        
         # Создаем демо-транзакции
         transactions = []
         
@@ -184,6 +191,12 @@ def create_demo_data():
         
         for transaction in transactions:
             db.add(transaction)
+        db.flush()
+        
+        # Балансы, счетчики достижений и дневные агрегаты пересчитываем по вставленным транзакциям
+        BalanceService().rebuild(db)
+        WalletStatsService().rebuild(db)
+        AnalyticsService().rebuild(db)
         
         db.commit()
         